@@ -5,17 +5,69 @@
 # 1. Asegúrate de tener Python instalado en tu sistema.
 # 2. Instala las librerías necesarias ejecutando en la terminal:
 #    >>> pip install pillow
+#    (opcional, para leer fotos HEIC/AVIF directamente) >>> pip install pillow-heif
 # 3. Ejecuta el script:
 #    >>> python redimensionar_imagenes.py
 # 4. Selecciona la carpeta donde están tus imágenes o usa la carpeta por defecto
 # 5. El programa recorrerá todas las subcarpetas y redimensionará todas las imágenes al 25%
 # 6. Una vez finalizado, verás un resumen del total de imágenes procesadas
+#
+# USO SIN MENÚS (cron, tareas programadas):
+#    >>> python Cambiar_dimenciones.py RUTA [--escala 0.3 0.5 0.75] [--lado-maximo 1024]
+#                                      [--trabajadores N]
+#                                      [--eliminar-originales si|no] [--manifiesto] [--yes]
+#                                      [--metricas ARCHIVO.jsonl|ARCHIVO.prom]
+#                                      [--consola barra|detalle|silencio] [-q] [--memoria-mb MB]
+#                                      [--formato png|webp|webp_perdida|avif|jpeg|intermedio] [--calidad N]
+#                                      [--lecturas K] [--escrituras N] [--sincronizar] [--papelera CARPETA]
+#                                      [--reparto RONDA] [--nodo NOMBRE] [--vencimiento SEGUNDOS]
+#                                      [--duplicados informe|representante] [--distancia-duplicados N]
+#                                      [--huella phash|dhash] [--informe-duplicados ARCHIVO.json] [--planificar]
+#                                      [--remuestreo calidad|equilibrado|rapido]
+#    Con una ruta o con --yes no se hace ninguna pregunta ni pausa final.
+#    Código de salida: 0 si todo fue bien, 1 si hubo errores, 130 si se canceló.
 
+import io
 import os
 import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from PIL import Image
-import tkinter as tk
-from tkinter import filedialog, messagebox
+from manifiesto import Manifiesto
+from pipeline import procesar_en_pipeline, leer_bytes, escribir_bytes, SincronizacionEnGrupo
+from escaner import recorrer_carpetas, existe
+from metricas import Metricas, cronometrar
+from progreso import Progreso, MODOS as MODOS_CONSOLA
+from memoria import pixeles_en_cabecera, presupuesto_pixeles
+from decodificadores import (EXTENSIONES_IMAGEN, abrir_imagen, extension_salida,
+                             registrar_decodificadores, tiene_convertida)
+from formatos_salida import FORMATOS_SALIDA, comprobar_formato, opciones_formato, codificar
+from retiro_originales import RetiroOriginales, comprobar_papelera
+from reparto import Reparto, MAX_INTENTOS, VENCIMIENTO as VENCIMIENTO_REPARTO
+from planificador import planificar as planificar_tareas
+from remuestreo import (POLITICAS as POLITICAS_REMUESTREO, elegir_remuestreador, remuestrear,
+                        describir as describir_remuestreo)
+from duplicados import (Duplicados, MODOS as MODOS_DUPLICADOS, MINIATURAS, DISTANCIA_POR_DEFECTO,
+                        comprobar_duplicados)
+
+# Carpeta usada por la opción "por defecto" del menú y por --yes sin ruta
+RUTA_POR_DEFECTO = os.path.join(os.path.expanduser("~"), "Downloads", "IMAGENES")
+
+# Factor usado sin menú cuando no se indica --escala (el recomendado)
+FACTOR_POR_DEFECTO = 0.3
+
+# Margen de la reducción rápida: la imagen se reduce barato (escalado DCT del JPEG
+# y reduce() por bloques) solo hasta este múltiplo del tamaño final, y el resto lo
+# hace LANCZOS. Es el mismo criterio de Image.thumbnail(); la diferencia con el
+# LANCZOS completo se mide con benchmarks/benchmark_redimensionado.py (PSNR)
+MARGEN_REDUCCION = 2.0
+
+# Imágenes de más píxeles que esto se redimensionan por franjas horizontales: así
+# el intermedio de LANCZOS (ancho nuevo x alto original) solo existe franja a franja
+PIXELES_FRANJAS = 24_000_000
+
+# Filas de salida por franja
+FILAS_POR_FRANJA = 256
 
 def verificar_dependencias():
     """Verifica que las librerías necesarias estén instaladas"""
@@ -30,7 +82,7 @@ def verificar_dependencias():
 def obtener_ruta_base():
     """Obtiene la ruta base donde buscar imágenes"""
     # Opción 1: Carpeta por defecto en Descargas
-    ruta_por_defecto = os.path.join(os.path.expanduser("~"), "Downloads", "IMAGENES")
+    ruta_por_defecto = RUTA_POR_DEFECTO
     
     print("🔍 Opciones para seleccionar carpeta:")
     print("1. Usar carpeta por defecto (Descargas/IMAGENES)")
@@ -60,6 +112,10 @@ def obtener_ruta_base():
         
         elif opcion == "2":
             try:
+                # tkinter solo se importa cuando de verdad se abre el diálogo
+                import tkinter as tk
+                from tkinter import filedialog
+                
                 # Crear ventana de diálogo para seleccionar carpeta
                 root = tk.Tk()
                 root.withdraw()  # Ocultar ventana principal
@@ -90,16 +146,17 @@ def obtener_ruta_base():
             print("❌ Opción inválida. Elige 1, 2, 3 o 4.")
 
 def obtener_factor_escala():
-    """Permite al usuario elegir el factor de escala"""
+    """Permite al usuario elegir el factor de escala (o varios a la vez)"""
     print("\n📏 Opciones de redimensionamiento:")
     print("1. 30% del tamaño original (recomendado) ")
     print("2. 50% del tamaño original")
     print("3. 75% del tamaño original")
     print("4. Personalizado")
+    print("5. 30%, 50% y 75% a la vez (una sola lectura por imagen)")
     print("Recomendado Ejemplo: 3024×4032 A 756×1008 ")
     
     while True:
-        opcion = input("\nElige una opción (1-4): ").strip()
+        opcion = input("\nElige una opción (1-5): ").strip()
         
         if opcion == "1":
             return 0.3
@@ -117,74 +174,384 @@ def obtener_factor_escala():
                         print("❌ El factor debe estar entre 0.1 y 1.0")
                 except ValueError:
                     print("❌ Ingresa un número válido")
+        elif opcion == "5":
+            return [0.3, 0.5, 0.75]
         else:
-            print("❌ Opción inválida. Elige 1, 2, 3 o 4.")
+            print("❌ Opción inválida. Elige 1, 2, 3, 4 o 5.")
+
+def preparar_variantes(factores_escala=(), lados_maximos=()):
+    """Describe cada tamaño de salida pedido: sufijo del archivo, texto y parámetros
+    
+    factores_escala: proporciones del original (0.3 → '_30pcmarkett').
+    lados_maximos: lado mayor en píxeles, sin ampliar nunca (1024 → '_1024pxmarkett').
+    Los tamaños repetidos (o que darían el mismo archivo, como 0.3 y 0.305) se
+    generan una sola vez, con el primero que se indicó.
+    """
+    variantes = []
+    for factor in factores_escala:
+        variantes.append({"sufijo": f"{int(factor * 100)}pcmarkett", "texto": f"{int(factor * 100)}%",
+                          "parametros": {"factor_escala": factor}})
+    for lado in lados_maximos:
+        variantes.append({"sufijo": f"{lado}pxmarkett", "texto": f"{lado}px",
+                          "parametros": {"lado_maximo": lado}})
+    # Dos variantes con el mismo sufijo escribirían dos veces la misma salida
+    unicas = {}
+    for variante in variantes:
+        unicas.setdefault(variante["sufijo"], variante)
+    return list(unicas.values())
+
+def tamano_variante(variante, ancho, alto):
+    """Calcula el tamaño final de una variante para una imagen de ancho x alto"""
+    parametros = variante["parametros"]
+    if "factor_escala" in parametros:
+        factor = parametros["factor_escala"]
+    else:
+        factor = min(1.0, parametros["lado_maximo"] / max(ancho, alto))
+    return max(1, int(ancho * factor)), max(1, int(alto * factor))
+
+def redimensionar_por_franjas(img, tamano, reducing_gap=None, filas=FILAS_POR_FRANJA, remuestreador="lanczos"):
+    """Redimensiona por franjas horizontales; el resultado es el mismo que con un solo resize()
+    
+    Cada franja usa 'box' sobre la imagen completa, así los píxeles vecinos de la
+    franja siguen entrando en el filtro y no quedan costuras.
+    """
+    nuevo_ancho, nuevo_alto = tamano
+    escala_vertical = img.height / nuevo_alto
+    resultado = Image.new(img.mode, tamano)
+    for fila in range(0, nuevo_alto, filas):
+        fila_final = min(fila + filas, nuevo_alto)
+        caja = (0, fila * escala_vertical, img.width, fila_final * escala_vertical)
+        franja = remuestrear(img, (nuevo_ancho, fila_final - fila), remuestreador, reducing_gap, caja)
+        resultado.paste(franja, (0, fila))
+    return resultado
+
+def redimensionar_variante(fuente, tamano, reducing_gap=None, remuestreador="lanczos"):
+    """Redimensiona una variante (ver remuestreo.py); por franjas si la fuente supera PIXELES_FRANJAS"""
+    if fuente.width * fuente.height > PIXELES_FRANJAS and fuente.mode in ("L", "RGB", "RGBA"):
+        return redimensionar_por_franjas(fuente, tamano, reducing_gap, remuestreador=remuestreador)
+    return remuestrear(fuente, tamano, remuestreador, reducing_gap)
+
+def redimensionar_bytes(tarea, datos):
+    """Decodifica una vez y genera todas las variantes pendientes de una imagen (etapa de CPU)
+    
+    Las variantes se generan en cascada de la más grande a la más pequeña: cada
+    una parte de la anterior en lugar de volver a la imagen original.
+    Con 'reduccion_rapida' los JPEG se decodifican ya reducidos (1/2, 1/4 u 1/8)
+    y las reducciones grandes se hacen primero con reduce() antes de LANCZOS.
+    'remuestreo' es la política que elige el filtro de cada variante (ver remuestreo.py).
+    Sin 'formato_salida' cada variante se guarda en el formato de su extensión.
+    Devuelve (tamaño original, [(ruta de salida, bytes codificados, tamaño nuevo), ...],
+    métricas: tiempos por etapa, bytes y píxeles).
+    """
+    ruta_completa, pendientes, reduccion_rapida, formato_salida, opciones, remuestreo = tarea
+    tiempos = {"bytes_entrada": len(datos)}
+    
+    # Abrir imagen (el formato se reconoce por el contenido, también HEIC/AVIF)
+    with abrir_imagen(datos) as img:
+        # Obtener dimensiones originales
+        ancho_original, alto_original = img.size
+        
+        # Calcular nuevas dimensiones, de la variante más grande a la más pequeña
+        objetivos = sorted(
+            ((tamano_variante(variante, ancho_original, alto_original), salida)
+             for variante, salida in pendientes),
+            key=lambda objetivo: objetivo[0][0] * objetivo[0][1], reverse=True
+        )
+        (ancho_mayor, alto_mayor), _ = objetivos[0]
+        
+        if reduccion_rapida:
+            # Solo JPEG: decodificar menos píxeles, sin bajar de MARGEN_REDUCCION veces el final
+            img.draft(None, (int(ancho_mayor * MARGEN_REDUCCION), int(alto_mayor * MARGEN_REDUCCION)))
+            margen = MARGEN_REDUCCION
+        else:
+            margen = None
+        
+        # Decodificar aquí (Pillow lo haría en el primer resize) para medirlo aparte
+        with cronometrar(tiempos, "decodificacion"):
+            img.load()
+        tiempos["pixeles"] = img.width * img.height
+        
+        formato_original = img.format
+        fuente = img
+        resultados = []
+        for (nuevo_ancho, nuevo_alto), salida_redimensionada in objetivos:
+            # Redimensionar a partir de la variante anterior (cascada)
+            remuestreador = elegir_remuestreador(remuestreo, fuente.size, (nuevo_ancho, nuevo_alto),
+                                                 en_cascada=fuente is not img)
+            with cronometrar(tiempos, "transformacion"):
+                img_redimensionada = redimensionar_variante(fuente, (nuevo_ancho, nuevo_alto), margen,
+                                                            remuestreador)
+            
+            if formato_salida is not None:
+                with cronometrar(tiempos, "codificacion"):
+                    codificada = codificar(img_redimensionada, formato_salida, opciones)
+            else:
+                # Codificar en el formato que indica la extensión de salida
+                extension = os.path.splitext(salida_redimensionada)[1]
+                formato = Image.registered_extensions().get(extension.lower(), formato_original)
+                salida = io.BytesIO()
+                with cronometrar(tiempos, "codificacion"):
+                    img_redimensionada.save(salida, formato, optimize=True, quality=95)
+                codificada = salida.getvalue()
+            tiempos["bytes_salida"] = tiempos.get("bytes_salida", 0) + len(codificada)
+            resultados.append((salida_redimensionada, codificada, (nuevo_ancho, nuevo_alto)))
+            fuente = img_redimensionada
+    
+    return (ancho_original, alto_original), resultados, tiempos
+
+def escribir_redimensionada(tarea, salida, sincronizacion=None):
+    """Guarda todas las variantes de una imagen y devuelve sus tamaños y métricas (etapa de escritura)"""
+    tamano_original, resultados, tiempos = salida
+    for salida_redimensionada, datos, _ in resultados:
+        escribir_bytes(salida_redimensionada, datos, sincronizacion)
+    return tamano_original, [(ruta, tamano) for ruta, _, tamano in resultados], tiempos
 
-def redimensionar_imagenes(ruta_base, factor_escala=0.25):
-    """Redimensiona todas las imágenes en la ruta especificada"""
+def redimensionar_imagenes(ruta_base, factor_escala=0.25, eliminar_originales=None,
+                           usar_manifiesto=False, trabajadores=None, reduccion_rapida=True,
+                           lados_maximos=(), ruta_metricas=None, consola="barra", memoria_mb=None,
+                           formato=None, calidad=None, lecturas=4, escrituras=2, sincronizar=False,
+                           papelera=None, reparto=None, duplicados=None, informe_duplicados=None,
+                           planificar=False, remuestreo="calidad"):
+    """Redimensiona todas las imágenes en la ruta especificada
     
-    # Extensiones de imagen soportadas
-    extensiones_validas = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'}
+    factor_escala: un factor o una lista de factores; todos los tamaños (y los
+    de lados_maximos, en píxeles del lado mayor) salen de una sola lectura por imagen.
+    eliminar_originales: None pregunta al usuario, True/False decide sin preguntar.
+    Cada original se retira en cuanto sus salidas están escritas y verificadas; con
+    'papelera' se mueve a esa carpeta (conservando las subcarpetas) en vez de borrarse.
+    reparto: Reparto opcional (ver reparto.py) para repartir el árbol entre varios
+    nodos; este nodo solo procesa las carpetas que alquila. Se cierra al terminar.
+    duplicados: Duplicados opcional (ver duplicados.py) que agrupa las casi
+    duplicadas de cada carpeta; en modo "representante" solo se procesa la primera
+    de cada grupo. informe_duplicados: archivo JSON donde guardar los grupos.
+    planificar: recorre todo el árbol y lee las cabeceras antes de empezar (ver
+    planificador.py) y procesa de la imagen más grande a la más pequeña. No se
+    combina con reparto.
+    trabajadores: procesos que decodifican y redimensionan a la vez (por defecto,
+    uno por núcleo); la lectura y escritura van en hilos aparte.
+    reduccion_rapida: decodifica/reduce a menor resolución antes de LANCZOS
+    (mucho más rápido en reducciones grandes); False usa LANCZOS sobre la imagen completa.
+    remuestreo: "calidad" (siempre LANCZOS), "equilibrado" o "rapido": filtros más
+    baratos donde la diferencia con LANCZOS no se ve (ver remuestreo.py).
+    usar_manifiesto: decide qué procesar según el manifiesto de la carpeta
+    (archivos nuevos o modificados) en lugar de mirar si ya existe la salida.
+    ruta_metricas: archivo donde exportar los tiempos por etapa (.prom para
+    Prometheus, cualquier otro nombre para líneas JSON).
+    consola: "barra" (progreso en una línea), "detalle" (una línea por archivo)
+    o "silencio" (solo el resumen).
+    memoria_mb: si se indica, limita los píxeles que se decodifican a la vez
+    (ver memoria.py) para que el pico de memoria no dependa del tamaño de las fotos.
+    formato: formato de salida de todas las variantes (ver formatos_salida.py);
+    None guarda cada una en el formato de su original. calidad: la del codificador.
+    lecturas, escrituras: archivos que se leen y se escriben a la vez (súbelos en
+    carpetas de red con mucha latencia). sincronizar: confirma cada salida en disco
+    (fsync) antes de darla por hecha.
+    Devuelve un diccionario con los contadores del proceso.
+    """
     
     # Contadores para estadísticas
     contador_procesadas = 0
     contador_errores = 0
     contador_omitidas = 0
+    contador_duplicadas = 0
     errores_detallados = []
+    metricas = Metricas("Cambiar_dimenciones", ruta_metricas)
+    
+    # Tamaños a generar y texto para mostrar
+    if factor_escala is None:
+        factores = []
+    elif isinstance(factor_escala, (list, tuple)):
+        factores = list(factor_escala)
+    else:
+        factores = [factor_escala]
+    variantes = preparar_variantes(factores, lados_maximos or ())
+    opciones = None
+    if formato is not None:
+        # El formato entra en los parámetros de cada variante (manifiesto)
+        opciones = opciones_formato(formato, calidad)
+        for variante in variantes:
+            variante["parametros"] = dict(variante["parametros"], formato=formato, opciones=opciones)
+    # El filtro y la reducción rápida cambian los píxeles; solo entran si no son los de
+    # siempre, así los registros hechos con los valores por defecto siguen valiendo
+    if remuestreo != "calidad":
+        for variante in variantes:
+            variante["parametros"] = dict(variante["parametros"], remuestreo=remuestreo)
+    if not reduccion_rapida:
+        for variante in variantes:
+            variante["parametros"] = dict(variante["parametros"], reduccion_rapida=False)
+    texto_variantes = ", ".join(variante["texto"] for variante in variantes)
+    
+    # Por defecto, un proceso por núcleo
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
     
-    # Calcular porcentaje para mostrar
-    porcentaje = int(factor_escala * 100)
+    # Manifiesto opcional para re-ejecuciones incrementales (un registro por variante)
+    manifiesto = Manifiesto(ruta_base, "Cambiar_dimenciones", reparto is not None) if usar_manifiesto else None
     
-    print(f"\n🔄 Iniciando redimensionamiento al {porcentaje}% en: {ruta_base}")
+    # Preguntar antes de empezar si eliminar los originales (solo en modo interactivo)
+    if eliminar_originales is None:
+        eliminar = input("\n¿Deseas eliminar las imágenes originales a medida que se procesen? (s/n): ").strip().lower()
+        eliminar_originales = eliminar in ['s', 'sí', 'si', 'SI', 'Si', 'Sí', 'yes', 'y']
+    
+    print(f"\n🔄 Iniciando redimensionamiento a {texto_variantes} en: {ruta_base}")
     print("=" * 60)
     
-    # Recorrer todas las carpetas y subcarpetas
-    for carpeta_actual, subcarpetas, archivos in os.walk(ruta_base):
-        
-        # Filtrar solo archivos de imagen
-        archivos_imagen = [archivo for archivo in archivos 
-            if os.path.splitext(archivo.lower())[1] in extensiones_validas]
-        
-        if archivos_imagen:
-            print(f"\n📁 Procesando carpeta: {carpeta_actual}")
-            print(f"   Imágenes encontradas: {len(archivos_imagen)}")
+    progreso = Progreso(consola)
+    retiro = RetiroOriginales(ruta_base, papelera, progreso.detalle) if eliminar_originales else None
+    # Un original solo se retira cuando sus salidas ya están en disco
+    sincronizacion = SincronizacionEnGrupo() if sincronizar or retiro is not None else None
+    
+    def buscar_tareas():
+        """Genera las imágenes pendientes a medida que se recorre el árbol"""
+        nonlocal contador_omitidas, contador_duplicadas
         
-        for archivo in archivos_imagen:
-            ruta_completa = os.path.join(carpeta_actual, archivo)
-            nombre_base, extension = os.path.splitext(archivo)
-            salida_redimensionada = os.path.join(carpeta_actual, f"{nombre_base}_{porcentaje}pcmarkett{extension}")
+        # Recorrer todas las carpetas y subcarpetas
+        carpetas = recorrer_carpetas(ruta_base) if reparto is None else reparto.recorrer()
+        if reparto is None and not planificar:
+            # Con reparto este nodo solo hace una parte: el total del árbol no serviría
+            carpetas = progreso.contar(carpetas, lambda nombre, nombres: os.path.splitext(nombre.lower())[1]
+                                       in EXTENSIONES_IMAGEN and "markett" not in nombre
+                                       and not tiene_convertida(nombres, nombre))
+        for carpeta_actual, archivos, nombres in metricas.escaneo(carpetas):
             
-            # Verificar si ya existe el archivo redimensionado
-            if os.path.exists(salida_redimensionada):
-                print(f"⚠️  Ya existe: {nombre_base}_{porcentaje}pcmarkett{extension} (omitiendo)")
-                contador_omitidas += 1
-                continue
+            # Filtrar solo archivos de imagen
+            archivos_imagen = [entrada for entrada in archivos 
+                if os.path.splitext(entrada.name.lower())[1] in EXTENSIONES_IMAGEN]
             
-            try:
-                # Abrir imagen
-                with Image.open(ruta_completa) as img:
-                    # Obtener dimensiones originales
-                    ancho_original, alto_original = img.size
-                    
-                    # Calcular nuevas dimensiones
-                    nuevo_ancho = int(ancho_original * factor_escala)
-                    nuevo_alto = int(alto_original * factor_escala)
-                    
-                    # Redimensionar la imagen
-                    img_redimensionada = img.resize((nuevo_ancho, nuevo_alto), Image.Resampling.LANCZOS)
-                    
-                    # Guardar la imagen redimensionada
-                    img_redimensionada.save(salida_redimensionada, optimize=True, quality=95)
-                    
-                    contador_procesadas += 1
-                    print(f"✅ {archivo} → {nombre_base}_{porcentaje}pcmarkett{extension}")
-                    print(f"   Tamaño: {ancho_original}x{alto_original} → {nuevo_ancho}x{nuevo_alto}")
+            if archivos_imagen:
+                progreso.detalle(f"\n📁 Procesando carpeta: {carpeta_actual}")
+                progreso.detalle(f"   Imágenes encontradas: {len(archivos_imagen)}")
+            
+            candidatas = []
+            tareas_carpeta = []
+            for entrada in archivos_imagen:
+                archivo = entrada.name
+                nombre_base, extension = os.path.splitext(archivo)
+                
+                # Las salidas de ejecuciones anteriores no son imágenes a procesar
+                if "markett" in nombre_base:
+                    continue
+                
+                # Un HEIC ya convertido se procesa a través de su versión convertida
+                if tiene_convertida(nombres, archivo):
+                    continue
+                candidatas.append(entrada.path)
+                
+                # Solo las variantes que faltan o cuyo origen cambió
+                pendientes = []
+                for variante in variantes:
+                    if formato is not None:
+                        nombre_salida = f"{nombre_base}_{variante['sufijo']}{FORMATOS_SALIDA[formato].extension}"
+                    else:
+                        nombre_salida = f"{nombre_base}_{variante['sufijo']}{extension_salida(extension)}"
+                    if manifiesto is not None:
+                        # Omitir solo si el manifiesto dice que no cambió
+                        if not manifiesto.necesita_proceso(entrada.path, variante["parametros"], entrada, nombres):
+                            continue
                     
-            except Exception as e:
+                    # Verificar si ya existe el archivo redimensionado (sin consultar al disco)
+                    elif existe(nombres, nombre_salida):
+                        continue
+                    pendientes.append((variante, os.path.join(carpeta_actual, nombre_salida)))
+                
+                if not pendientes:
+                    progreso.detalle(f"⚠️  Ya existe: {archivo} en {texto_variantes} (omitiendo)")
+                    progreso.avanzar()
+                    contador_omitidas += 1
+                    continue
+                
+                tareas_carpeta.append((entrada.path, pendientes, reduccion_rapida, formato, opciones, remuestreo))
+            
+            # Huellas de toda la carpeta (también de las ya hechas, para que los grupos no cambien)
+            copias = duplicados.agrupar(candidatas, ejecutor) if duplicados is not None and tareas_carpeta else {}
+            for tarea in tareas_carpeta:
+                if tarea[0] in copias:
+                    progreso.detalle(f"🔁 {os.path.basename(tarea[0])} es casi igual a "
+                                     f"{os.path.basename(copias[tarea[0]])}")
+                    if duplicados.solo_representantes:
+                        progreso.avanzar()
+                        contador_duplicadas += 1
+                        continue
+                yield tarea
+    
+    # Lectura, redimensionado y escritura solapadas (resultados en orden del recorrido, salvo con plan)
+    if trabajadores > 1:
+        # Cada proceso registra los decodificadores opcionales (HEIC/AVIF)
+        ejecutor = ProcessPoolExecutor(max_workers=trabajadores, initializer=registrar_decodificadores)
+    else:
+        ejecutor = ThreadPoolExecutor(max_workers=1)
+    plan = None
+    if planificar:
+        # Todo el recorrido y las cabeceras primero; luego de la imagen más cara a la más barata
+        plan = planificar_tareas(buscar_tareas(), lambda tarea: tarea[0], max(lecturas, 8))
+        progreso.planificar(plan.costos)
+        tareas = plan.tareas
+    elif reparto is not None:
+        tareas = reparto.tareas(buscar_tareas())
+    else:
+        # Las tareas se generan mientras se recorre: el proceso empieza de inmediato
+        tareas = buscar_tareas()
+    resultados = procesar_en_pipeline(
+        tareas,
+        # Con manifiesto la lectura también calcula el hash de lo que se procesa
+        leer=lambda tarea: leer_bytes(tarea[0]) if manifiesto is None else manifiesto.leer_origen(tarea[0]),
+        transformar=redimensionar_bytes,
+        escribir=lambda tarea, salida: escribir_redimensionada(tarea, salida, sincronizacion),
+        ejecutor_cpu=ejecutor,
+        hilos_lectura=lecturas,
+        hilos_escritura=escrituras,
+        max_en_vuelo=max(trabajadores * 2 + 4, lecturas + trabajadores),
+        con_tiempos=True,
+        costo=lambda tarea, datos: pixeles_en_cabecera(datos),
+        presupuesto=presupuesto_pixeles(memoria_mb, "Cambiar_dimenciones") if memoria_mb else None,
+        # Con plan el orden ya no es el del recorrido: cada resultado sale en cuanto termina
+        en_orden=not planificar,
+    )
+    try:
+        for (ruta_completa, pendientes, *_), tamanos, error, tiempos in resultados:
+            archivo = os.path.basename(ruta_completa)
+            metricas.registrar(ruta_completa, dict(tiempos, **(tamanos[2] if tamanos else {})))
+            if manifiesto is not None:
+                estado, hash_origen = manifiesto.tomar_lectura(ruta_completa)
+            if error is None:
+                if manifiesto is not None:
+                    # Un solo hash por imagen, el mismo para todas sus variantes
+                    for variante, salida_redimensionada in pendientes:
+                        manifiesto.registrar(ruta_completa, salida_redimensionada,
+                                             variante["parametros"], hash_origen, estado)
+
+                (ancho_original, alto_original), generadas, _ = tamanos
+                contador_procesadas += 1
+                for salida_redimensionada, (nuevo_ancho, nuevo_alto) in generadas:
+                    progreso.detalle(f"✅ {archivo} → {os.path.basename(salida_redimensionada)}")
+                    progreso.detalle(f"   Tamaño: {ancho_original}x{alto_original} → {nuevo_ancho}x{nuevo_alto}")
+                if retiro is not None:
+                    retiro.retirar(ruta_completa, [salida for salida, _ in generadas])
+            else:
                 contador_errores += 1
-                error_msg = f"❌ Error con {archivo}: {str(e)}"
-                print(error_msg)
+                error_msg = f"❌ Error con {archivo}: {str(error)}"
+                progreso.detalle(error_msg)
                 errores_detallados.append(error_msg)
+            if reparto is not None:
+                reparto.procesado()
+            progreso.avanzar(costo=plan.costo_de(ruta_completa) if plan is not None else 0.0)
+    finally:
+        progreso.terminar()
+        resultados.close()
+        ejecutor.shutdown(cancel_futures=True)
+        if retiro is not None:
+            retiro.vaciar()
+        if reparto is not None:
+            reparto.cerrar()
+            for carpeta in reparto.carpetas_con_error:
+                contador_errores += 1
+                errores_detallados.append(f"❌ Carpeta abandonada en el reparto tras {MAX_INTENTOS} intentos: {carpeta}")
+        if duplicados is not None:
+            duplicados.cerrar()
+        metricas.cerrar()
+    
+    if manifiesto is not None:
+        manifiesto.cerrar()
     
     # Mostrar resumen final
     print("\n" + "=" * 60)
@@ -194,7 +561,22 @@ def redimensionar_imagenes(ruta_base, factor_escala=0.25):
     print(f"⚠️  Imágenes omitidas (ya existían): {contador_omitidas}")
     print(f"❌ Errores encontrados: {contador_errores}")
     print(f"📁 Carpeta procesada: {ruta_base}")
-    print(f"📏 Factor de escala usado: {porcentaje}%")
+    if retiro is not None:
+        retiro.imprimir_resumen()
+    if reparto is not None:
+        print(f"🖧  Nodo {reparto.nodo}: {reparto.lotes_tomados} carpetas de la ronda '{reparto.ronda}'")
+    if plan is not None:
+        plan.imprimir_resumen()
+    if duplicados is not None:
+        duplicados.imprimir_resumen(ruta_base)
+        if informe_duplicados:
+            duplicados.guardar_informe(informe_duplicados, ruta_base)
+            print(f"📝 Grupos guardados en: {informe_duplicados}")
+    print(f"📏 Tamaños generados: {texto_variantes}")
+    if remuestreo != "calidad":
+        print(f"🔬 Remuestreo: {describir_remuestreo(remuestreo)}")
+    if contador_procesadas > 0:
+        metricas.imprimir_resumen()
     
     if errores_detallados:
         print("\n📋 DETALLES DE ERRORES:")
@@ -203,68 +585,260 @@ def redimensionar_imagenes(ruta_base, factor_escala=0.25):
     
     if contador_procesadas > 0:
         print(f"\n🎉 ¡Proceso completado exitosamente!")
-        
-        # Preguntar si eliminar archivos originales
-        eliminar = input("\n¿Deseas eliminar las imágenes originales? (s/n): ").strip().lower()
-        if eliminar in ['s', 'sí', 'si', 'SI', 'Si', 'Sí', 'yes', 'y']:
-            eliminar_imagenes_originales(ruta_base, factor_escala)
     else:
         print("\n🤷 No se encontraron imágenes para procesar.")
-
-def eliminar_imagenes_originales(ruta_base, factor_escala):
-    """Elimina todas las imágenes originales después del redimensionamiento"""
-    contador_eliminadas = 0
-    porcentaje = int(factor_escala * 100)
-    extensiones_validas = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'}
     
-    print(f"\n🗑️  Eliminando imágenes originales...")
+    return {"procesadas": contador_procesadas, "omitidas": contador_omitidas,
+            "duplicadas": contador_duplicadas, "errores": contador_errores}
+
+def factor_valido(texto):
+    """Valida el factor de escala recibido por línea de comandos"""
+    try:
+        factor = float(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError("Ingresa un número válido")
+    if not 0.1 <= factor <= 1.0:
+        raise argparse.ArgumentTypeError("El factor debe estar entre 0.1 y 1.0")
+    return factor
+
+def lado_valido(texto):
+    """Valida un lado máximo en píxeles recibido por línea de comandos"""
+    try:
+        lado = int(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError("Ingresa un número entero de píxeles")
+    if lado < 1:
+        raise argparse.ArgumentTypeError("El lado máximo debe ser de al menos 1 píxel")
+    return lado
+
+def construir_parser():
+    """Define los argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Redimensiona masivamente imágenes (incluye subcarpetas)."
+    )
+    parser.add_argument(
+        "ruta", nargs="?",
+        help="Carpeta raíz a procesar. Si se omite (y no se usa --yes) se muestra el menú."
+    )
+    parser.add_argument(
+        "-e", "--escala", type=factor_valido, nargs="+", default=None,
+        help=f"Uno o varios factores entre 0.1 y 1.0 (por defecto sin menú: {FACTOR_POR_DEFECTO})."
+    )
+    parser.add_argument(
+        "--lado-maximo", type=lado_valido, nargs="+", default=None, metavar="PX",
+        help="Uno o varios tamaños por lado mayor en píxeles (nunca amplía la imagen)."
+    )
+    parser.add_argument(
+        "-t", "--trabajadores", type=int, default=None,
+        help="Número de procesos en paralelo (por defecto: uno por núcleo)."
+    )
+    parser.add_argument(
+        "--sin-reduccion-rapida", action="store_true",
+        help="Decodificar siempre a resolución completa antes de LANCZOS (más lento)."
+    )
+    parser.add_argument(
+        "--remuestreo", choices=POLITICAS_REMUESTREO, default="calidad",
+        help="Filtro de reducción: 'calidad' (siempre LANCZOS), 'equilibrado' o 'rapido' (filtros más baratos donde apenas se nota)."
+    )
+    parser.add_argument(
+        "--formato", choices=sorted(FORMATOS_SALIDA), default=None,
+        help="Formato de todas las variantes (por defecto, el de cada original)."
+    )
+    parser.add_argument(
+        "--calidad", type=int, choices=range(0, 101), default=None, metavar="0-100",
+        help="Calidad del codificador en webp_perdida, avif y jpeg (en webp sin pérdida, el esfuerzo)."
+    )
+    parser.add_argument(
+        "--eliminar-originales", choices=["si", "no", "preguntar"], default=None,
+        help="Eliminar cada original en cuanto sus salidas están escritas y verificadas (por defecto: 'no' sin menú, 'preguntar' con menú)."
+    )
+    parser.add_argument(
+        "--papelera", metavar="CARPETA", default=None,
+        help="Con --eliminar-originales, mueve los originales a esta carpeta (fuera de RUTA) en lugar de borrarlos."
+    )
+    parser.add_argument(
+        "--manifiesto", action="store_true",
+        help="Usa el manifiesto de la carpeta para procesar solo imágenes nuevas o modificadas."
+    )
+    parser.add_argument(
+        "--metricas", metavar="ARCHIVO", default=None,
+        help="Exporta los tiempos por etapa: ARCHIVO.prom para Prometheus, otro nombre para líneas JSON."
+    )
+    parser.add_argument(
+        "--memoria-mb", type=int, default=None,
+        help="Memoria aproximada para imágenes en curso; limita cuántas fotos grandes se procesan a la vez."
+    )
+    parser.add_argument(
+        "--lecturas", type=int, default=4,
+        help="Archivos que se leen por adelantado a la vez; súbelo (16-64) en carpetas de red con mucha latencia."
+    )
+    parser.add_argument(
+        "--escrituras", type=int, default=2,
+        help="Salidas que se escriben a la vez; súbelo en carpetas de red con mucha latencia."
+    )
+    parser.add_argument(
+        "--sincronizar", action="store_true",
+        help="Confirma cada salida en disco (fsync) antes de darla por hecha; los fsync de carpeta se agrupan."
+    )
+    parser.add_argument(
+        "--reparto", metavar="RONDA", default=None,
+        help="Reparte el árbol entre varias máquinas: las que usan la misma RONDA sobre la misma carpeta se dividen las carpetas."
+    )
+    parser.add_argument(
+        "--nodo", default=None,
+        help="Nombre de esta máquina en el reparto (por defecto: nombre del equipo y número de proceso)."
+    )
+    parser.add_argument(
+        "--vencimiento", type=int, default=VENCIMIENTO_REPARTO, metavar="SEGUNDOS",
+        help="Segundos sin noticias tras los que las carpetas de una máquina caída pasan a otra."
+    )
+    parser.add_argument(
+        "--planificar", action="store_true",
+        help="Lee antes todas las cabeceras y procesa primero las fotos más grandes."
+    )
+    parser.add_argument(
+        "--duplicados", choices=MODOS_DUPLICADOS, default=None,
+        help="Agrupa las fotos casi iguales de cada carpeta: 'informe' solo las cuenta, 'representante' procesa una por grupo."
+    )
+    parser.add_argument(
+        "--distancia-duplicados", type=int, choices=range(0, 33), default=DISTANCIA_POR_DEFECTO, metavar="0-32",
+        help=f"Bits distintos (de 64) hasta los que dos fotos son casi iguales (por defecto: {DISTANCIA_POR_DEFECTO})."
+    )
+    parser.add_argument(
+        "--huella", choices=sorted(MINIATURAS), default="phash",
+        help="Huella perceptual: 'phash' (más robusta) o 'dhash' (más barata)."
+    )
+    parser.add_argument(
+        "--informe-duplicados", metavar="ARCHIVO", default=None,
+        help="Con --duplicados, guarda los grupos encontrados en este archivo JSON."
+    )
+    parser.add_argument(
+        "--consola", choices=MODOS_CONSOLA, default="barra",
+        help="Salida por archivo: 'barra' (progreso y tiempo restante), 'detalle' (una línea por archivo) o 'silencio'."
+    )
+    parser.add_argument(
+        "-q", "--silencioso", dest="consola", action="store_const", const="silencio",
+        help="Igual que --consola silencio: sin barra ni líneas por archivo, solo el resumen."
+    )
+    parser.add_argument(
+        "-y", "--yes", action="store_true",
+        help="No preguntar nada: usa la carpeta por defecto si no hay ruta y la crea si no existe."
+    )
+    return parser
+
+def main(argv=None):
+    """Función principal; devuelve el código de salida"""
+    args = construir_parser().parse_args(argv)
     
-    for carpeta_actual, subcarpetas, archivos in os.walk(ruta_base):
-        for archivo in archivos:
-            if os.path.splitext(archivo.lower())[1] in extensiones_validas:
-                # Verificar que NO sea una imagen ya redimensionada
-                if f"_{porcentaje}pcmarkett" not in archivo:
-                    ruta_completa = os.path.join(carpeta_actual, archivo)
-                    try:
-                        os.remove(ruta_completa)
-                        contador_eliminadas += 1
-                        print(f"🗑️  Eliminado: {archivo}")
-                    except Exception as e:
-                        print(f"❌ Error al eliminar {archivo}: {e}")
+    # Sin ruta ni --yes se mantiene el comportamiento interactivo de siempre
+    interactivo = args.ruta is None and not args.yes
+    if args.trabajadores is not None and args.trabajadores < 1:
+        print("❌ --trabajadores debe ser 1 o mayor")
+        return 2
+    if args.memoria_mb is not None and args.memoria_mb < 1:
+        print("❌ --memoria-mb debe ser 1 o mayor")
+        return 2
+    if args.lecturas < 1 or args.escrituras < 1:
+        print("❌ --lecturas y --escrituras deben ser 1 o mayor")
+        return 2
+    if args.vencimiento < 10:
+        print("❌ --vencimiento debe ser de al menos 10 segundos")
+        return 2
+    if args.planificar and args.reparto:
+        # Cada nodo solo conoce sus carpetas, y el reparto cuenta las tareas en el orden del recorrido
+        print("❌ --planificar no se puede combinar con --reparto")
+        return 2
+    if args.formato is not None:
+        error_formato = comprobar_formato(args.formato)
+        if error_formato:
+            print(f"❌ {error_formato}")
+            return 2
+    if args.duplicados is not None:
+        error_duplicados = comprobar_duplicados()
+        if error_duplicados:
+            print(f"❌ {error_duplicados}")
+            return 2
     
-    print(f"\n✅ Imágenes originales eliminadas: {contador_eliminadas}")
-
-def main():
-    """Función principal"""
     print("🖼️  REDIMENSIONADOR DE IMÁGENES")
     print("=" * 40)
+    codigo_salida = 0
     
     # Verificar dependencias
     if not verificar_dependencias():
-        input("\nPresiona Enter para salir...")
-        return
+        if interactivo:
+            input("\nPresiona Enter para salir...")
+        return 1
     
     try:
         # Obtener ruta base
-        ruta_base = obtener_ruta_base()
+        if interactivo:
+            ruta_base = obtener_ruta_base()
+        else:
+            ruta_base = args.ruta or RUTA_POR_DEFECTO
+            if args.yes and not os.path.exists(ruta_base):
+                os.makedirs(ruta_base, exist_ok=True)
+                print(f"✅ Carpeta creada: {ruta_base}")
         
         # Verificar que la ruta existe
         if not os.path.exists(ruta_base):
             print(f"❌ La ruta especificada no existe: {ruta_base}")
-            return
+            return 1
+        error_papelera = comprobar_papelera(ruta_base, args.papelera) if args.papelera else None
+        if error_papelera:
+            print(f"❌ {error_papelera}")
+            return 2
+        reparto = None
+        if args.reparto:
+            reparto = Reparto(ruta_base, "Cambiar_dimenciones", args.reparto, args.nodo, args.vencimiento)
+        
+        duplicados = None
+        if args.duplicados:
+            duplicados = Duplicados(args.duplicados, args.distancia_duplicados, args.huella, ruta_base,
+                                    compartido=reparto is not None)
         
-        # Obtener factor de escala
-        factor_escala = obtener_factor_escala()
+        # Obtener factor(es) de escala; con solo --lado-maximo no se usa ninguno
+        if args.escala is not None:
+            factor_escala = args.escala
+        elif args.lado_maximo:
+            factor_escala = None
+        elif interactivo:
+            factor_escala = obtener_factor_escala()
+        else:
+            factor_escala = FACTOR_POR_DEFECTO
+        
+        # Política de borrado de originales
+        politica = args.eliminar_originales or ("preguntar" if interactivo else "no")
+        eliminar_originales = None if politica == "preguntar" else politica == "si"
         
         # Iniciar redimensionamiento
-        redimensionar_imagenes(ruta_base, factor_escala)
+        resumen = redimensionar_imagenes(ruta_base, factor_escala,
+                                         eliminar_originales=eliminar_originales,
+                                         usar_manifiesto=args.manifiesto,
+                                         trabajadores=args.trabajadores,
+                                         reduccion_rapida=not args.sin_reduccion_rapida,
+                                         lados_maximos=args.lado_maximo,
+                                         ruta_metricas=args.metricas, consola=args.consola,
+                                         memoria_mb=args.memoria_mb, formato=args.formato,
+                                         calidad=args.calidad, lecturas=args.lecturas,
+                                         escrituras=args.escrituras, sincronizar=args.sincronizar,
+                                         papelera=args.papelera, reparto=reparto,
+                                         duplicados=duplicados,
+                                         informe_duplicados=args.informe_duplicados,
+                                         planificar=args.planificar, remuestreo=args.remuestreo)
+        if resumen["errores"]:
+            codigo_salida = 1
         
     except KeyboardInterrupt:
         print("\n\n⚠️  Proceso cancelado por el usuario.")
+        codigo_salida = 130
     except Exception as e:
         print(f"\n❌ Error inesperado: {e}")
+        codigo_salida = 1
     finally:
-        input("\nPresiona Enter para salir...")
+        if interactivo:
+            input("\nPresiona Enter para salir...")
+    
+    return codigo_salida
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
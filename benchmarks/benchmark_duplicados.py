@@ -0,0 +1,144 @@
+# Benchmark de casi duplicadas - Huellas perceptuales e índice por bloques
+# Julio 2025
+#
+# Mide, para cada huella (phash, dhash) y cada distancia, cuántas fotos se omitirían
+# con --duplicados representante (llamadas al modelo que se ahorran), cuántas
+# ráfagas se detectan y cuántas fotos se agrupan con una escena distinta (errores).
+# Las fotos sintéticas son ráfagas: la misma escena con cambios de brillo, encuadre
+# y calidad JPEG, más escenas sueltas. Con --carpeta se usan fotos reales (sin
+# verdad de referencia: solo grupos, omitidas y tiempo).
+#
+# También compara el índice por bloques con la búsqueda lineal sobre muchas huellas
+# aleatorias (lo que cuesta agrupar una carpeta enorme).
+#
+# USO:
+#    >>> python benchmarks/benchmark_duplicados.py [--escenas 20] [--rafaga 5] [--sueltas 20]
+#                                                  [--carpeta RUTA_CON_FOTOS] [--huellas 10000]
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+# Permite importar los scripts de la carpeta raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from duplicados import Duplicados, IndiceMultiple, MINIATURAS, distancia_hamming  # noqa: E402
+from decodificadores import EXTENSIONES_IMAGEN  # noqa: E402
+
+# Distancias que se prueban
+DISTANCIAS = (2, 4, 6, 8, 10, 12)
+
+def escena(semilla, tamano=(1600, 1200)):
+    """Imagen sintética suave (manchas de color), distinta para cada semilla"""
+    generador = np.random.default_rng(semilla)
+    manchas = generador.integers(0, 256, (12, 16, 3), dtype=np.uint8)
+    return Image.fromarray(manchas).resize(tamano, Image.Resampling.BICUBIC).filter(ImageFilter.GaussianBlur(8))
+
+def generar_rafagas(carpeta, escenas, rafaga, sueltas):
+    """Guarda ráfagas y escenas sueltas; devuelve [(ruta, escena), ...] por nombre"""
+    rutas = []
+    for numero in range(escenas):
+        original = escena(numero)
+        for toma in range(rafaga):
+            # Cada toma: algo más de brillo, encuadre desplazado y otra calidad JPEG
+            margen_x, margen_y = toma * 6, toma * 4
+            variante = ImageEnhance.Brightness(original).enhance(1 + 0.03 * toma)
+            variante = variante.crop((margen_x, margen_y, original.width - margen_x,
+                                      original.height - margen_y)).resize(original.size)
+            ruta = os.path.join(carpeta, f"rafaga{numero:03d}_{toma}.jpg")
+            variante.save(ruta, quality=95 - 6 * toma)
+            rutas.append((ruta, numero))
+    for numero in range(sueltas):
+        ruta = os.path.join(carpeta, f"suelta{numero:03d}.jpg")
+        escena(10_000 + numero).save(ruta, quality=85)
+        rutas.append((ruta, 10_000 + numero))
+    return sorted(rutas)
+
+def medir_agrupacion(rutas, escenas_por_ruta):
+    """Imprime una fila por huella y distancia"""
+    ejemplares = len(set(escenas_por_ruta.values())) if escenas_por_ruta else None
+    print(f"{'Huella':<7} {'dist.':>5} {'ms/foto':>8} {'grupos':>7} {'omitidas':>9} {'ahorro':>7} {'errores':>8}")
+    for metodo in sorted(MINIATURAS):
+        for distancia in DISTANCIAS:
+            duplicados = Duplicados("representante", distancia, metodo)
+            copias = duplicados.agrupar(rutas)
+            milisegundos = duplicados.segundos * 1000 / len(rutas)
+            errores = "-"
+            if escenas_por_ruta:
+                # Una foto agrupada con el representante de otra escena se habría perdido
+                errores = sum(escenas_por_ruta[ruta] != escenas_por_ruta[representante]
+                              for ruta, representante in copias.items())
+            print(f"{metodo:<7} {distancia:>5} {milisegundos:>8.2f} {len(duplicados.grupos):>7} "
+                  f"{len(copias):>9} {len(copias) / len(rutas):>7.0%} {errores:>8}")
+    if ejemplares is not None:
+        print(f"   (ideal: omitir {len(rutas) - ejemplares} de {len(rutas)} sin errores)")
+
+def medir_indice(cantidad, distancia=6, semilla=1):
+    """Compara el índice por bloques con una búsqueda lineal sobre 'cantidad' huellas aleatorias"""
+    generador = random.Random(semilla)
+    huellas = []
+    for _ in range(cantidad):
+        if huellas and generador.random() < 0.3:
+            # Casi copia de una anterior: unos pocos bits cambiados
+            huella = generador.choice(huellas)
+            for _ in range(generador.randint(0, distancia)):
+                huella ^= 1 << generador.randrange(64)
+        else:
+            huella = generador.getrandbits(64)
+        huellas.append(huella)
+
+    inicio = time.perf_counter()
+    indice = IndiceMultiple(distancia)
+    for huella in huellas:
+        if not indice.buscar(huella, distancia):
+            indice.anadir(huella, None)
+    segundos_indice = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    representantes = []
+    for huella in huellas:
+        if not any(distancia_hamming(huella, otra) <= distancia for otra in representantes):
+            representantes.append(huella)
+    segundos_lineal = time.perf_counter() - inicio
+
+    print(f"\n🔎 {cantidad} huellas, distancia {distancia}: índice por bloques {segundos_indice:.2f} s, "
+          f"lineal {segundos_lineal:.2f} s ({segundos_lineal / max(segundos_indice, 1e-9):.0f}x); "
+          f"grupos {indice.elementos} y {len(representantes)}")
+
+def main(argv=None):
+    """Ejecuta las mediciones e imprime las tablas"""
+    parser = argparse.ArgumentParser(description="Huellas perceptuales: ahorro, errores y velocidad.")
+    parser.add_argument("--carpeta", default=None, help="Carpeta con fotos reales (sin verdad de referencia).")
+    parser.add_argument("--imagenes", type=int, default=500, help="Máximo de fotos reales a usar.")
+    parser.add_argument("--escenas", type=int, default=20, help="Ráfagas sintéticas.")
+    parser.add_argument("--rafaga", type=int, default=5, help="Fotos por ráfaga.")
+    parser.add_argument("--sueltas", type=int, default=20, help="Escenas sin repetir.")
+    parser.add_argument("--huellas", type=int, default=10_000, help="Huellas aleatorias para el índice.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        if args.carpeta:
+            rutas = sorted(os.path.join(args.carpeta, archivo) for archivo in os.listdir(args.carpeta)
+                           if os.path.splitext(archivo.lower())[1] in EXTENSIONES_IMAGEN)[:args.imagenes]
+            escenas_por_ruta = None
+            print(f"📁 {len(rutas)} fotos de {args.carpeta}")
+        else:
+            generadas = generar_rafagas(temporal, args.escenas, args.rafaga, args.sueltas)
+            rutas = [ruta for ruta, _ in generadas]
+            escenas_por_ruta = dict(generadas)
+            print(f"📸 {args.escenas} ráfagas de {args.rafaga} fotos y {args.sueltas} sueltas (1600x1200 JPEG)")
+        if not rutas:
+            print("❌ No hay imágenes para medir")
+            return 1
+        medir_agrupacion(rutas, escenas_por_ruta)
+    medir_indice(args.huellas)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# Benchmark de formatos de salida - Codificación por formato
+# Julio 2025
+#
+# Mide cada formato de formatos_salida.py sobre las mismas imágenes: ms por
+# megapíxel al codificar y al decodificar, KB por megapíxel y, en los formatos con
+# pérdida, PSNR frente al original. Con --alfa las imágenes llevan transparencia
+# (como las salidas de quitar_fondo_lento.py; JPEG queda fuera).
+#
+# USO:
+#    >>> python benchmarks/benchmark_formatos.py [--carpeta RUTA] [--imagenes 3] [--alfa]
+#                                                [--formatos png webp avif] [--salida resultados.json]
+#    Sin --carpeta se usan fotos sintéticas de 3024x4032 (tamaño de cámara de iPhone).
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+
+from PIL import Image, ImageDraw, ImageFilter
+
+# Permite importar los scripts de la carpeta raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import leer_bytes  # noqa: E402
+from decodificadores import EXTENSIONES_IMAGEN, abrir_imagen  # noqa: E402
+from formatos_salida import (FORMATOS_SALIDA, FORMATOS_CON_PERDIDA, formato_disponible,  # noqa: E402
+                             codificar)
+from benchmark_redimensionado import generar_jpeg, psnr  # noqa: E402
+
+def anadir_alfa(img):
+    """Añade un canal alfa con una elipse de borde suave, parecido a un recorte"""
+    mascara = Image.new("L", img.size, 0)
+    ImageDraw.Draw(mascara).ellipse((img.width // 6, img.height // 8, img.width * 5 // 6, img.height * 7 // 8),
+                                    fill=255)
+    recortada = img.convert("RGBA")
+    recortada.putalpha(mascara.filter(ImageFilter.GaussianBlur(8)))
+    return recortada
+
+def medir(img, nombre, repeticiones=3):
+    """Devuelve (mejor ms de codificación, mejor ms de decodificación, bytes, imagen decodificada)"""
+    mejor_codificacion = mejor_decodificacion = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        datos = codificar(img, nombre)
+        mejor_codificacion = min(mejor_codificacion, time.perf_counter() - inicio)
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        decodificada = Image.open(io.BytesIO(datos))
+        decodificada.load()
+        mejor_decodificacion = min(mejor_decodificacion, time.perf_counter() - inicio)
+    return mejor_codificacion * 1000, mejor_decodificacion * 1000, len(datos), decodificada
+
+def main(argv=None):
+    """Ejecuta el benchmark e imprime una tabla por formato"""
+    parser = argparse.ArgumentParser(description="ms/MP y bytes/MP de cada formato de salida.")
+    parser.add_argument("--carpeta", default=None, help="Carpeta con fotos reales.")
+    parser.add_argument("--imagenes", type=int, default=3)
+    parser.add_argument("--alfa", action="store_true", help="Medir con transparencia (salidas sin fondo).")
+    parser.add_argument("--formatos", nargs="+", choices=sorted(FORMATOS_SALIDA), default=list(FORMATOS_SALIDA))
+    parser.add_argument("--salida", default=None, help="Guarda los resultados en este JSON.")
+    args = parser.parse_args(argv)
+
+    if args.carpeta:
+        rutas = sorted(os.path.join(args.carpeta, archivo) for archivo in os.listdir(args.carpeta)
+                       if os.path.splitext(archivo.lower())[1] in EXTENSIONES_IMAGEN)[:args.imagenes]
+        imagenes = [abrir_imagen(leer_bytes(ruta)).convert("RGB") for ruta in rutas]
+    else:
+        imagenes = [Image.open(io.BytesIO(generar_jpeg(semilla=semilla))).convert("RGB")
+                    for semilla in range(args.imagenes)]
+    if not imagenes:
+        print("❌ No hay imágenes para medir")
+        return 1
+    if args.alfa:
+        imagenes = [anadir_alfa(img) for img in imagenes]
+    megapixeles = sum(img.width * img.height for img in imagenes) / 1e6
+
+    print(f"🖼️  {len(imagenes)} imágenes, {megapixeles:.1f} MP en total{' (con alfa)' if args.alfa else ''}")
+    print(f"{'Formato':<14} {'cod. ms/MP':>11} {'dec. ms/MP':>11} {'KB/MP':>9} {'PSNR dB':>8}")
+    resultados = {}
+    for nombre in args.formatos:
+        if not formato_disponible(nombre):
+            print(f"{nombre:<14} (Pillow no puede escribirlo en este equipo)")
+            continue
+        if args.alfa and not FORMATOS_SALIDA[nombre].transparencia:
+            continue
+        ms_codificacion = ms_decodificacion = total_bytes = 0
+        calidades = []
+        for img in imagenes:
+            codificacion, decodificacion, tamano, decodificada = medir(img, nombre)
+            ms_codificacion += codificacion
+            ms_decodificacion += decodificacion
+            total_bytes += tamano
+            if nombre in FORMATOS_CON_PERDIDA:
+                calidades.append(psnr(img, decodificada))
+        resultados[nombre] = {
+            "codificacion_ms_por_mp": round(ms_codificacion / megapixeles, 2),
+            "decodificacion_ms_por_mp": round(ms_decodificacion / megapixeles, 2),
+            "kb_por_mp": round(total_bytes / 1024 / megapixeles, 1),
+            "psnr_db": round(min(calidades), 2) if calidades else None,
+        }
+        fila = resultados[nombre]
+        print(f"{nombre:<14} {fila['codificacion_ms_por_mp']:>11.1f} {fila['decodificacion_ms_por_mp']:>11.1f} "
+              f"{fila['kb_por_mp']:>9.0f} {fila['psnr_db'] if fila['psnr_db'] is not None else 'sin pérdida':>8}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump({"imagenes": len(imagenes), "megapixeles": round(megapixeles, 2), "alfa": args.alfa,
+                       "formatos": resultados}, archivo, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados guardados en {args.salida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
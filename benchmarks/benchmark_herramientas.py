@@ -0,0 +1,280 @@
+# Benchmark de las tres herramientas - Corpus sintético y resultados en JSON
+# Julio 2025
+#
+# Genera un corpus sintético determinista (HEIC, JPEG, PNG y WebP en varias
+# resoluciones, repartido en subcarpetas de varios niveles) y ejecuta sin menús
+# convertir_heic_a_png, redimensionar_imagenes y quitar_fondo_imagenes sobre una
+# copia del corpus cada una. Para cada herramienta informa:
+#   - imágenes/segundo de la ejecución completa (recorrido + pipeline),
+#   - latencia p50/p95 por imagen (etapa de CPU de cada imagen, una a una),
+#   - pico de memoria (RSS) del proceso y sus trabajadores,
+#   - bytes escritos.
+# Cada herramienta corre en un proceso aparte para que el pico de memoria sea solo suyo.
+#
+# USO:
+#    >>> python benchmarks/benchmark_herramientas.py [--imagenes 4] [--resoluciones 640x480 1920x1080]
+#                                                    [--herramientas convertir redimensionar fondo]
+#                                                    [--salida resultados.json] [--comparar anterior.json]
+#    Guardar el JSON de cada commit y pasarlo a --comparar para ver si algo fue más rápido o más lento.
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+
+from PIL import Image, ImageChops, ImageFilter
+
+# Permite importar los scripts de la carpeta raíz del repositorio
+RAIZ_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ_REPOSITORIO)
+
+from pipeline import leer_bytes  # noqa: E402
+from escaner import recorrer_carpetas  # noqa: E402
+
+# Formatos del corpus: extensión -> (formato de Pillow, opciones de guardado)
+FORMATOS = {
+    ".heic": ("HEIF", {"quality": 90}),
+    ".jpg": ("JPEG", {"quality": 90}),
+    ".png": ("PNG", {"compress_level": 6}),
+    ".webp": ("WEBP", {"quality": 90}),
+}
+
+# Qué archivos del corpus procesa cada herramienta (el redimensionador y el
+# eliminador de fondos leen HEIC directamente, ver decodificadores.py)
+ENTRADAS = {
+    "convertir": {".heic"},
+    "redimensionar": {".heic", ".jpg", ".png", ".webp"},
+    "fondo": {".heic", ".jpg", ".png", ".webp"},
+}
+
+RESOLUCIONES_POR_DEFECTO = ["640x480", "1920x1080", "4032x3024"]
+
+def generar_imagen(tamano, semilla):
+    """Crea una foto sintética determinista (ruido suavizado + degradado + figura)"""
+    aleatorio = random.Random(semilla)
+    pequeno = (max(tamano[0] // 8, 1), max(tamano[1] // 8, 1))
+    ruido = Image.frombytes("L", pequeno, aleatorio.randbytes(pequeno[0] * pequeno[1]))
+    ruido = ruido.resize(tamano, Image.Resampling.BICUBIC).filter(ImageFilter.DETAIL)
+    degradado = Image.linear_gradient("L").resize(tamano)
+    img = Image.merge("RGB", (ruido, degradado, ImageChops.invert(ruido)))
+    # Un objeto en primer plano para que el eliminador de fondos tenga algo que recortar
+    img.paste((200, aleatorio.randrange(256), 60),
+              (tamano[0] // 4, tamano[1] // 4, tamano[0] * 3 // 4, tamano[1] * 3 // 4))
+    return img
+
+def generar_corpus(carpeta, imagenes, resoluciones, profundidad, semilla=0):
+    """Crea el corpus en 'carpeta' y devuelve su descripción"""
+    import pillow_heif
+    pillow_heif.register_heif_opener()
+    total = 0
+    for extension, (formato, opciones) in FORMATOS.items():
+        for ancho, alto in resoluciones:
+            for numero in range(imagenes):
+                # Cada imagen va a un nivel distinto: raiz/nivel_1/.../nivel_N
+                nivel = numero % (profundidad + 1)
+                destino = os.path.join(carpeta, *[f"nivel_{n}" for n in range(1, nivel + 1)])
+                os.makedirs(destino, exist_ok=True)
+                img = generar_imagen((ancho, alto), semilla + total)
+                img.save(os.path.join(destino, f"foto_{ancho}x{alto}_{numero:03d}{extension}"),
+                         formato, **opciones)
+                total += 1
+    return {"imagenes": total, "formatos": sorted(FORMATOS), "profundidad": profundidad,
+            "resoluciones": [f"{ancho}x{alto}" for ancho, alto in resoluciones], "semilla": semilla}
+
+def listar_archivos(carpeta):
+    """Devuelve {ruta: tamaño} de todos los archivos del árbol"""
+    return {entrada.path: entrada.stat().st_size
+            for _, archivos, _ in recorrer_carpetas(carpeta) for entrada in archivos}
+
+def percentil(valores, porcentaje):
+    """Percentil por rango más cercano (valores ya ordenados)"""
+    if not valores:
+        return None
+    posicion = max(math.ceil(porcentaje / 100 * len(valores)) - 1, 0)
+    return valores[posicion]
+
+def rss_pico_mb():
+    """Pico de memoria del proceso y de sus hijos ya terminados, en MB (None si no se puede medir)"""
+    try:
+        import resource
+    except ImportError:
+        # Windows: no hay getrusage
+        return None
+    pico = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux lo da en KB y macOS en bytes
+    return pico / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+def ejecutar_herramienta(herramienta, carpeta, trabajadores, modelo):
+    """Ejecuta la herramienta completa sin menús y devuelve (procesadas, errores)"""
+    if herramienta == "convertir":
+        from convertir_a_png import convertir_heic_a_png
+        resumen = convertir_heic_a_png(carpeta, trabajadores, eliminar_originales=False, consola="silencio")
+        return resumen["convertidos"], resumen["errores"]
+    if herramienta == "redimensionar":
+        from Cambiar_dimenciones import redimensionar_imagenes
+        resumen = redimensionar_imagenes(carpeta, 0.3, eliminar_originales=False, trabajadores=trabajadores,
+                                         consola="silencio")
+        return resumen["procesadas"], resumen["errores"]
+    from quitar_fondo_lento import quitar_fondo_imagenes
+    resumen = quitar_fondo_imagenes(carpeta, modelo, eliminar_originales=False, consola="silencio")
+    return resumen["procesadas"], resumen["errores"]
+
+def preparar_latencia(herramienta, modelo):
+    """Devuelve una función datos -> None que procesa una imagen en memoria (etapa de CPU)"""
+    if herramienta == "convertir":
+        import pillow_heif
+        from convertir_a_png import convertir_bytes_heic, preparar_opciones_png
+        pillow_heif.register_heif_opener()
+        opciones = preparar_opciones_png()
+        return lambda datos: convertir_bytes_heic(("entrada.heic", "salida.png", opciones), datos)
+    if herramienta == "redimensionar":
+        from Cambiar_dimenciones import redimensionar_bytes, preparar_variantes
+        variante, = preparar_variantes([0.3])
+        return lambda datos: redimensionar_bytes(("entrada", [(variante, "salida.jpg")], True, None, None, "calidad"), datos)
+    from quitar_fondo_lento import obtener_sesion, quitar_fondo_contenidos
+    sesion = obtener_sesion(modelo)
+    return lambda datos: quitar_fondo_contenidos(sesion, modelo, [datos])
+
+def medir_herramienta(herramienta, corpus, trabajadores, modelo):
+    """Mide una herramienta sobre una copia del corpus (se ejecuta en un proceso aparte)"""
+    with tempfile.TemporaryDirectory() as temporal:
+        copia = os.path.join(temporal, "corpus")
+        shutil.copytree(corpus, copia)
+        antes = listar_archivos(copia)
+        entradas = sorted(ruta for ruta in antes if os.path.splitext(ruta)[1] in ENTRADAS[herramienta])
+
+        # Ejecución completa, sin la salida por consola de la herramienta
+        with open(os.devnull, "w", encoding="utf-8") as nulo, contextlib.redirect_stdout(nulo):
+            inicio = time.perf_counter()
+            procesadas, errores = ejecutar_herramienta(herramienta, copia, trabajadores, modelo)
+            segundos = time.perf_counter() - inicio
+        rss = rss_pico_mb()
+        despues = listar_archivos(copia)
+        bytes_escritos = sum(tamano for ruta, tamano in despues.items() if ruta not in antes)
+
+        # Latencia por imagen: cada imagen por separado, ya leída, sin E/S
+        procesar = preparar_latencia(herramienta, modelo)
+        latencias = []
+        with open(os.devnull, "w", encoding="utf-8") as nulo, contextlib.redirect_stdout(nulo):
+            for ruta in entradas:
+                datos = leer_bytes(ruta)
+                inicio_imagen = time.perf_counter()
+                procesar(datos)
+                latencias.append((time.perf_counter() - inicio_imagen) * 1000)
+        latencias.sort()
+
+    return {
+        "imagenes": len(entradas),
+        "procesadas": procesadas,
+        "errores": errores,
+        "segundos": round(segundos, 3),
+        "imagenes_por_segundo": round(procesadas / segundos, 3) if segundos else None,
+        "latencia_p50_ms": round(percentil(latencias, 50), 2) if latencias else None,
+        "latencia_p95_ms": round(percentil(latencias, 95), 2) if latencias else None,
+        "rss_pico_mb": round(rss, 1) if rss is not None else None,
+        "bytes_escritos": bytes_escritos,
+    }
+
+def commit_actual():
+    """Hash del commit del repositorio, si git está disponible"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ_REPOSITORIO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def comparar(resultados, anteriores):
+    """Imprime la variación de cada métrica frente a un JSON anterior"""
+    print(f"\n📈 Comparación con {anteriores.get('commit') or 'resultado anterior'}")
+    for herramienta, actual in resultados["herramientas"].items():
+        previo = anteriores.get("herramientas", {}).get(herramienta)
+        if not previo:
+            continue
+        for metrica in ("imagenes_por_segundo", "latencia_p50_ms", "latencia_p95_ms", "rss_pico_mb"):
+            if actual.get(metrica) is None or not previo.get(metrica):
+                continue
+            cambio = (actual[metrica] - previo[metrica]) / previo[metrica] * 100
+            print(f"   {herramienta:<14} {metrica:<22} {previo[metrica]:>10} → {actual[metrica]:>10} "
+                  f"({cambio:+.1f}%)")
+
+def resolucion_valida(texto):
+    """Convierte 'ANCHOxALTO' en una tupla de enteros"""
+    try:
+        ancho, alto = (int(valor) for valor in texto.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"resolución inválida: {texto} (usa ANCHOxALTO)")
+    if ancho < 8 or alto < 8:
+        raise argparse.ArgumentTypeError(f"resolución demasiado pequeña: {texto}")
+    return ancho, alto
+
+def main(argv=None):
+    """Genera el corpus, mide cada herramienta en su propio proceso y guarda el JSON"""
+    parser = argparse.ArgumentParser(description="Benchmark de las tres herramientas con un corpus sintético.")
+    parser.add_argument("--imagenes", type=int, default=4, help="Imágenes por formato y resolución.")
+    parser.add_argument("--resoluciones", type=resolucion_valida, nargs="+",
+                        default=[resolucion_valida(texto) for texto in RESOLUCIONES_POR_DEFECTO])
+    parser.add_argument("--profundidad", type=int, default=2, help="Niveles de subcarpetas del corpus.")
+    parser.add_argument("--herramientas", nargs="+", choices=sorted(ENTRADAS), default=sorted(ENTRADAS))
+    parser.add_argument("--trabajadores", type=int, default=None)
+    parser.add_argument("--modelo", default="u2net")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultados (por defecto, solo pantalla).")
+    parser.add_argument("--comparar", default=None, help="JSON de una ejecución anterior para comparar.")
+    # Uso interno: medir una sola herramienta sobre un corpus ya generado
+    parser.add_argument("--medir", choices=sorted(ENTRADAS), help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.medir:
+        print(json.dumps(medir_herramienta(args.medir, args.corpus, args.trabajadores, args.modelo)))
+        return 0
+
+    resultados = {"commit": commit_actual(), "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  "python": platform.python_version(), "plataforma": platform.platform(),
+                  "herramientas": {}}
+    codigo_salida = 0
+    with tempfile.TemporaryDirectory() as temporal:
+        print("⏳ Generando corpus sintético...")
+        resultados["corpus"] = generar_corpus(temporal, args.imagenes, args.resoluciones,
+                                              args.profundidad, args.semilla)
+        for herramienta in args.herramientas:
+            print(f"🔄 Midiendo {herramienta}...")
+            comando = [sys.executable, os.path.abspath(__file__), "--medir", herramienta,
+                       "--corpus", temporal, "--modelo", args.modelo]
+            if args.trabajadores:
+                comando += ["--trabajadores", str(args.trabajadores)]
+            proceso = subprocess.run(comando, capture_output=True, text=True)
+            if proceso.returncode != 0:
+                print(f"❌ Error midiendo {herramienta}:\n{proceso.stderr}")
+                resultados["herramientas"][herramienta] = {"error": proceso.stderr.strip().splitlines()[-1:]}
+                codigo_salida = 1
+                continue
+            medida = json.loads(proceso.stdout.strip().splitlines()[-1])
+            resultados["herramientas"][herramienta] = medida
+            print(f"   {medida['imagenes_por_segundo']} img/s | p50 {medida['latencia_p50_ms']} ms | "
+                  f"p95 {medida['latencia_p95_ms']} ms | RSS {medida['rss_pico_mb']} MB | "
+                  f"{medida['bytes_escritos'] / 1024 ** 2:.1f} MB escritos")
+
+    texto = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+        print(f"💾 Resultados guardados en {args.salida}")
+    else:
+        print(texto)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            comparar(resultados, json.load(archivo))
+    return codigo_salida
+
+if __name__ == "__main__":
+    sys.exit(main())
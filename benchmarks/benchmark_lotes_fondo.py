@@ -0,0 +1,87 @@
+# Benchmark de inferencia por lotes - Eliminador de fondos
+# Julio 2025
+#
+# Mide imágenes/segundo de quitar_fondo_lote() en CPU para varios tamaños de lote,
+# para elegir el valor de --lote de quitar_fondo_lento.py en cada máquina.
+#
+# USO:
+#    >>> python benchmarks/benchmark_lotes_fondo.py [--carpeta RUTA] [--imagenes 32]
+#                                                   [--lotes 1 2 4 8 16] [--modelo u2net]
+#    Sin --carpeta se generan imágenes sintéticas de 1024x768 en una carpeta temporal.
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from PIL import Image
+
+# Permite importar los scripts de la carpeta raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import leer_bytes  # noqa: E402
+from decodificadores import EXTENSIONES_IMAGEN  # noqa: E402
+from quitar_fondo_lento import obtener_sesion, quitar_fondo_lote, PREPROCESADO_LOTES  # noqa: E402
+
+def generar_imagenes(carpeta, cantidad, tamano=(1024, 768)):
+    """Crea imágenes JPEG sintéticas (degradado + rectángulo) y devuelve sus rutas"""
+    rutas = []
+    for numero in range(cantidad):
+        img = Image.linear_gradient("L").resize(tamano).convert("RGB")
+        img.paste((200, 40 + numero % 200, 60), (tamano[0] // 4, tamano[1] // 4,
+                                                  tamano[0] * 3 // 4, tamano[1] * 3 // 4))
+        ruta = os.path.join(carpeta, f"sintetica_{numero:04d}.jpg")
+        img.save(ruta, quality=90)
+        rutas.append(ruta)
+    return rutas
+
+def listar_imagenes(carpeta, cantidad):
+    """Devuelve hasta 'cantidad' imágenes de la carpeta indicada"""
+    rutas = sorted(
+        os.path.join(carpeta, archivo) for archivo in os.listdir(carpeta)
+        if os.path.splitext(archivo.lower())[1] in EXTENSIONES_IMAGEN
+    )
+    return rutas[:cantidad]
+
+def medir(sesion, modelo, contenidos, tamano_lote):
+    """Procesa todas las imágenes con el tamaño de lote dado y devuelve imágenes/segundo"""
+    inicio = time.perf_counter()
+    for desde in range(0, len(contenidos), tamano_lote):
+        quitar_fondo_lote(sesion, modelo, contenidos[desde:desde + tamano_lote])
+    return len(contenidos) / (time.perf_counter() - inicio)
+
+def main(argv=None):
+    """Ejecuta el benchmark e imprime una tabla de resultados"""
+    parser = argparse.ArgumentParser(description="Imágenes/seg según el tamaño de lote.")
+    parser.add_argument("--carpeta", default=None, help="Carpeta con imágenes reales.")
+    parser.add_argument("--imagenes", type=int, default=32, help="Imágenes a procesar por medición.")
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--modelo", choices=sorted(PREPROCESADO_LOTES), default="u2net")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        if args.carpeta:
+            rutas = listar_imagenes(args.carpeta, args.imagenes)
+        else:
+            rutas = generar_imagenes(temporal, args.imagenes)
+        if not rutas:
+            print("❌ No hay imágenes para medir")
+            return 1
+
+        # Se lee todo antes de medir: solo interesa decodificación + inferencia
+        contenidos = [leer_bytes(ruta) for ruta in rutas]
+
+        sesion = obtener_sesion(args.modelo)
+        # Calentamiento: la primera inferencia incluye inicializaciones de ONNX
+        quitar_fondo_lote(sesion, args.modelo, contenidos[:1])
+
+        print(f"🤖 Modelo: {args.modelo} | Imágenes: {len(rutas)}")
+        print(f"{'Lote':>6} {'img/s':>10}")
+        for tamano_lote in args.lotes:
+            print(f"{tamano_lote:>6} {medir(sesion, args.modelo, contenidos, tamano_lote):>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# Benchmark de la máscara rápida - Eliminador de fondos
+# Julio 2025
+#
+# Compara la máscara rápida (--mascara-rapida: inferencia sobre una copia reducida
+# y máscara ampliada con filtro guiado) con la salida actual de rembg, imagen por
+# imagen: tiempo de cada una, IoU de las máscaras (alfa >= 128) y diferencia media
+# del canal alfa. Con --iou-minimo el código de salida es 1 si alguna imagen
+# queda por debajo, para usarlo como control antes de cambiar el modo por defecto.
+#
+# USO:
+#    >>> python benchmarks/benchmark_mascara_fondo.py --carpeta RUTA_CON_FOTOS [--modelo u2net]
+#                                                     [--imagenes 20] [--iou-minimo 0.95]
+#    Sin --carpeta se generan imágenes sintéticas de 1024x768 (solo sirven para medir tiempos).
+
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+# Permite importar los scripts de la carpeta raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import leer_bytes  # noqa: E402
+from quitar_fondo_lento import obtener_sesion, quitar_fondo_contenidos, PREPROCESADO_LOTES  # noqa: E402
+from benchmark_lotes_fondo import generar_imagenes, listar_imagenes  # noqa: E402
+
+def alfa(png):
+    """Canal alfa de un PNG como arreglo uint8"""
+    with Image.open(io.BytesIO(png)) as img:
+        return np.asarray(img.convert("RGBA").getchannel("A"))
+
+def comparar_mascaras(referencia, rapida):
+    """Devuelve (IoU de las máscaras binarizadas, diferencia media del alfa en 0-255)"""
+    if referencia.shape != rapida.shape:
+        raise ValueError(f"tamaños distintos: {referencia.shape} y {rapida.shape}")
+    dentro_referencia = referencia >= 128
+    dentro_rapida = rapida >= 128
+    union = np.logical_or(dentro_referencia, dentro_rapida).sum()
+    iou = np.logical_and(dentro_referencia, dentro_rapida).sum() / union if union else 1.0
+    return float(iou), float(np.abs(referencia.astype(np.int16) - rapida.astype(np.int16)).mean())
+
+def procesar(sesion, modelo, datos, mascara_rapida):
+    """Devuelve (segundos, PNG) de quitar el fondo de una imagen"""
+    inicio = time.perf_counter()
+    (png,), _ = quitar_fondo_contenidos(sesion, modelo, [datos], mascara_rapida=mascara_rapida)
+    segundos = time.perf_counter() - inicio
+    if isinstance(png, Exception):
+        raise png
+    return segundos, png
+
+def main(argv=None):
+    """Ejecuta la comparación e imprime una tabla por imagen y un resumen"""
+    parser = argparse.ArgumentParser(description="Máscara rápida frente a la salida actual de rembg.")
+    parser.add_argument("--carpeta", default=None, help="Carpeta con fotos reales (conjunto de prueba).")
+    parser.add_argument("--imagenes", type=int, default=20)
+    parser.add_argument("--modelo", choices=sorted(PREPROCESADO_LOTES), default="u2net")
+    parser.add_argument("--iou-minimo", type=float, default=None,
+                        help="Falla (código 1) si alguna imagen tiene un IoU menor.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        if args.carpeta:
+            rutas = listar_imagenes(args.carpeta, args.imagenes)
+        else:
+            rutas = generar_imagenes(temporal, args.imagenes)
+        if not rutas:
+            print("❌ No hay imágenes para medir")
+            return 1
+
+        sesion = obtener_sesion(args.modelo)
+        # Calentamiento: la primera inferencia incluye inicializaciones de ONNX
+        procesar(sesion, args.modelo, leer_bytes(rutas[0]), False)
+
+        print(f"🤖 Modelo: {args.modelo} | Imágenes: {len(rutas)}")
+        print(f"{'Imagen':<32} {'actual ms':>10} {'rápida ms':>10} {'IoU':>7} {'Δ alfa':>7}")
+        tiempos_actual, tiempos_rapida, ious = [], [], []
+        for ruta in rutas:
+            datos = leer_bytes(ruta)
+            segundos_actual, referencia = procesar(sesion, args.modelo, datos, False)
+            segundos_rapida, rapida = procesar(sesion, args.modelo, datos, True)
+            iou, diferencia = comparar_mascaras(alfa(referencia), alfa(rapida))
+            tiempos_actual.append(segundos_actual)
+            tiempos_rapida.append(segundos_rapida)
+            ious.append(iou)
+            print(f"{os.path.basename(ruta)[:32]:<32} {segundos_actual * 1000:>10.0f} "
+                  f"{segundos_rapida * 1000:>10.0f} {iou:>7.4f} {diferencia:>7.2f}")
+
+    aceleracion = sum(tiempos_actual) / max(sum(tiempos_rapida), 1e-9)
+    print(f"\n📊 IoU medio {sum(ious) / len(ious):.4f} | IoU mínimo {min(ious):.4f} | "
+          f"aceleración {aceleracion:.2f}x")
+    if args.iou_minimo is not None and min(ious) < args.iou_minimo:
+        print(f"❌ Alguna imagen queda por debajo del IoU mínimo ({args.iou_minimo})")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
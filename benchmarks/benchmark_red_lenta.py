@@ -0,0 +1,146 @@
+# Benchmark de carpeta de red lenta - Lecturas por adelantado y fsync agrupados
+# Julio 2025
+#
+# Simula un montaje de red (SMB/NFS/sshfs) en una carpeta temporal: cada apertura
+# de archivo espera 'latencia' ms y cada fsync de carpeta otro tanto (de uno en uno,
+# como un servidor que confirma cada vez una escritura en su diario). Con la misma
+# carga mide archivos por segundo del pipeline (pipeline.py) con una sola lectura y
+# escritura a la vez, con los valores por defecto (4 y 2) y con --lecturas K; y, con
+# salidas confirmadas en disco, un fsync de carpeta por archivo frente a
+# SincronizacionEnGrupo. Comprueba además que todas las salidas son idénticas.
+#
+# USO:
+#    >>> python benchmarks/benchmark_red_lenta.py [--archivos 200] [--latencia-ms 20] [--lecturas 32]
+#                                                 [--escrituras 8] [--kb 256]
+
+import os
+import sys
+import time
+import zlib
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Permite importar los scripts de la carpeta raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import procesar_en_pipeline, leer_bytes, escribir_bytes, SincronizacionEnGrupo  # noqa: E402
+
+class CarpetaLenta:
+    """Carpeta local que se comporta como una de red: cada apertura tarda 'latencia' segundos"""
+
+    def __init__(self, latencia):
+        self.latencia = latencia
+
+    def leer(self, ruta):
+        time.sleep(self.latencia)
+        return leer_bytes(ruta)
+
+    def escribir(self, ruta, datos, sincronizacion=None):
+        time.sleep(self.latencia)
+        escribir_bytes(ruta, datos, sincronizacion)
+
+class SincronizacionLenta(SincronizacionEnGrupo):
+    """SincronizacionEnGrupo con la latencia de la carpeta de red en cada fsync de carpeta"""
+
+    def __init__(self, latencia):
+        super().__init__()
+        self.latencia = latencia
+        self._servidor = threading.Lock()
+
+    def _sincronizar_carpeta(self, carpeta):
+        with self._servidor:
+            time.sleep(self.latencia)
+            super()._sincronizar_carpeta(carpeta)
+
+class SincronizacionPorArchivo(SincronizacionLenta):
+    """Sin agrupar: un fsync de carpeta por cada archivo escrito (lo habitual)"""
+
+    def confirmar(self, carpeta):
+        self._sincronizar_carpeta(carpeta)
+        self.sincronizaciones += 1
+
+def transformar(tarea, datos):
+    """Trabajo de CPU casi nulo (zlib sin compresión): aquí lo que se mide es la E/S"""
+    return zlib.compress(datos, 0)
+
+def ejecutar(rutas, carpeta_salida, sistema, lecturas, escrituras, sincronizacion=None):
+    """Pasa todos los archivos por el pipeline; devuelve (segundos, {nombre: crc de la salida})"""
+    ejecutor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+    inicio = time.perf_counter()
+    resultados = procesar_en_pipeline(
+        rutas,
+        leer=sistema.leer,
+        transformar=transformar,
+        escribir=lambda ruta, salida: sistema.escribir(
+            os.path.join(carpeta_salida, os.path.basename(ruta) + ".z"), salida, sincronizacion),
+        ejecutor_cpu=ejecutor,
+        hilos_lectura=lecturas,
+        hilos_escritura=escrituras,
+        max_en_vuelo=max(32, lecturas + (os.cpu_count() or 1)),
+    )
+    for ruta, _, error in resultados:
+        if error is not None:
+            raise error
+    segundos = time.perf_counter() - inicio
+    ejecutor.shutdown()
+    sumas = {}
+    for nombre in os.listdir(carpeta_salida):
+        sumas[nombre] = zlib.crc32(leer_bytes(os.path.join(carpeta_salida, nombre)))
+        os.remove(os.path.join(carpeta_salida, nombre))
+    return segundos, sumas
+
+def main(argv=None):
+    """Ejecuta el benchmark e imprime una tabla por configuración"""
+    parser = argparse.ArgumentParser(description="Pipeline sobre una carpeta de red simulada.")
+    parser.add_argument("--archivos", type=int, default=200)
+    parser.add_argument("--latencia-ms", type=float, default=20.0, help="Latencia por apertura y por fsync.")
+    parser.add_argument("--lecturas", type=int, default=32, help="Lecturas simultáneas a comparar.")
+    parser.add_argument("--escrituras", type=int, default=8, help="Escrituras simultáneas a comparar.")
+    parser.add_argument("--kb", type=int, default=256, help="Tamaño de cada archivo.")
+    args = parser.parse_args(argv)
+    latencia = args.latencia_ms / 1000
+
+    carpeta = tempfile.mkdtemp(prefix="red_lenta_")
+    try:
+        origen = os.path.join(carpeta, "origen")
+        salida = os.path.join(carpeta, "salida")
+        os.makedirs(origen)
+        os.makedirs(salida)
+        aleatorio = random.Random(0)
+        rutas = []
+        for indice in range(args.archivos):
+            ruta = os.path.join(origen, f"foto_{indice:05d}.bin")
+            with open(ruta, "wb") as archivo:
+                archivo.write(aleatorio.randbytes(args.kb * 1024))
+            rutas.append(ruta)
+        sistema = CarpetaLenta(latencia)
+
+        configuraciones = [
+            ("una a la vez", 1, 1, None),
+            ("por defecto (4/2)", 4, 2, None),
+            (f"--lecturas {args.lecturas} --escrituras {args.escrituras}", args.lecturas, args.escrituras, None),
+            ("  + fsync por archivo", args.lecturas, args.escrituras, SincronizacionPorArchivo(latencia)),
+            ("  + fsync agrupado", args.lecturas, args.escrituras, SincronizacionLenta(latencia)),
+        ]
+        print(f"🌐 {args.archivos} archivos de {args.kb} KB, {args.latencia_ms:.0f} ms por apertura y por fsync")
+        print(f"{'Configuración':<34} {'archivos/s':>11} {'aceleración':>12} {'fsync carpeta':>14}")
+        referencia = base = None
+        for nombre, lecturas, escrituras, sincronizacion in configuraciones:
+            segundos, sumas = ejecutar(rutas, salida, sistema, lecturas, escrituras, sincronizacion)
+            if referencia is None:
+                referencia, base = sumas, segundos
+            elif sumas != referencia:
+                print(f"❌ {nombre}: las salidas no coinciden con las de una a la vez")
+                return 1
+            fsyncs = "-" if sincronizacion is None else str(sincronizacion.sincronizaciones)
+            print(f"{nombre:<34} {args.archivos / segundos:>11.1f} {base / segundos:>11.1f}x {fsyncs:>14}")
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
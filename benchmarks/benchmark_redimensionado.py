@@ -0,0 +1,93 @@
+# Benchmark de redimensionado - Reducción rápida frente a LANCZOS completo
+# Julio 2025
+#
+# Compara redimensionar_bytes() con y sin reducción rápida (escalado DCT del JPEG +
+# reduce() antes de LANCZOS): tiempo por imagen y PSNR del resultado rápido frente
+# al LANCZOS sobre la imagen completa. Por encima de ~40 dB la diferencia no se ve.
+#
+# USO:
+#    >>> python benchmarks/benchmark_redimensionado.py [--carpeta RUTA] [--escalas 0.3 0.5 0.75]
+#    Sin --carpeta se usan fotos sintéticas de 3024x4032 (tamaño de cámara de iPhone).
+
+import io
+import os
+import sys
+import math
+import time
+import random
+import argparse
+
+from PIL import Image, ImageChops, ImageFilter, ImageStat
+
+# Permite importar los scripts de la carpeta raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import leer_bytes  # noqa: E402
+from Cambiar_dimenciones import redimensionar_bytes, preparar_variantes  # noqa: E402
+
+def generar_jpeg(tamano=(3024, 4032), semilla=0):
+    """Crea una foto sintética con detalle fino (ruido suavizado + degradado) en JPEG"""
+    aleatorio = random.Random(semilla)
+    ruido = Image.frombytes("L", (tamano[0] // 8, tamano[1] // 8),
+                            bytes(aleatorio.getrandbits(8) for _ in range(tamano[0] * tamano[1] // 64)))
+    ruido = ruido.resize(tamano, Image.Resampling.BICUBIC).filter(ImageFilter.DETAIL)
+    degradado = Image.linear_gradient("L").resize(tamano)
+    img = Image.merge("RGB", (ruido, degradado, ImageChops.invert(ruido)))
+    salida = io.BytesIO()
+    img.save(salida, "JPEG", quality=92)
+    return salida.getvalue()
+
+def psnr(imagen_a, imagen_b):
+    """PSNR en dB entre dos imágenes del mismo tamaño"""
+    diferencia = ImageChops.difference(imagen_a.convert("RGB"), imagen_b.convert("RGB"))
+    rms = ImageStat.Stat(diferencia).rms
+    mse = sum(valor ** 2 for valor in rms) / len(rms)
+    return float("inf") if mse == 0 else 20 * math.log10(255 / math.sqrt(mse))
+
+def medir(datos, factor_escala, reduccion_rapida, repeticiones=3):
+    """Devuelve (mejor tiempo en ms, imagen resultante) de redimensionar_bytes()"""
+    # Salida .png para comparar píxeles sin pérdidas de una segunda compresión JPEG
+    variante, = preparar_variantes([factor_escala])
+    tarea = ("entrada.jpg", [(variante, "salida.png")], reduccion_rapida, None, None, "calidad")
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        _, [(_, codificada, _)], _ = redimensionar_bytes(tarea, datos)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000, Image.open(io.BytesIO(codificada))
+
+def main(argv=None):
+    """Ejecuta el benchmark e imprime una tabla de resultados"""
+    parser = argparse.ArgumentParser(description="Reducción rápida frente a LANCZOS completo.")
+    parser.add_argument("--carpeta", default=None, help="Carpeta con JPEG reales.")
+    parser.add_argument("--escalas", type=float, nargs="+", default=[0.3, 0.5, 0.75])
+    parser.add_argument("--imagenes", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.carpeta:
+        rutas = sorted(os.path.join(args.carpeta, archivo) for archivo in os.listdir(args.carpeta)
+                       if archivo.lower().endswith((".jpg", ".jpeg")))[:args.imagenes]
+        muestras = [leer_bytes(ruta) for ruta in rutas]
+    else:
+        muestras = [generar_jpeg(semilla=semilla) for semilla in range(args.imagenes)]
+    if not muestras:
+        print("❌ No hay imágenes para medir")
+        return 1
+
+    print(f"{'Escala':>7} {'completo ms':>12} {'rápido ms':>10} {'aceleración':>12} {'PSNR dB':>8}")
+    for factor_escala in args.escalas:
+        tiempos_completo, tiempos_rapido, calidades = [], [], []
+        for datos in muestras:
+            ms_completo, referencia = medir(datos, factor_escala, False)
+            ms_rapido, rapida = medir(datos, factor_escala, True)
+            tiempos_completo.append(ms_completo)
+            tiempos_rapido.append(ms_rapido)
+            calidades.append(psnr(referencia, rapida))
+        completo = sum(tiempos_completo) / len(muestras)
+        rapido = sum(tiempos_rapido) / len(muestras)
+        print(f"{factor_escala:>7.2f} {completo:>12.1f} {rapido:>10.1f} "
+              f"{completo / rapido:>11.1f}x {min(calidades):>8.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
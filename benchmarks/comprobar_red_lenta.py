@@ -0,0 +1,128 @@
+# Comprobación del pipeline en una carpeta de red lenta - Sale con código 1 si algún caso falla
+# Julio 2025
+#
+# A diferencia de benchmark_red_lenta.py, que mide, aquí solo se comprueba sobre
+# la misma carpeta simulada (CarpetaLenta):
+#   1. Con cualquier número de lecturas y escrituras a la vez, y con fsync por
+#      archivo o agrupado, se escribe exactamente una salida por archivo, con el
+#      contenido esperado, y no queda ningún '.parcial'. Los fsync agrupados son
+#      menos que los archivos.
+#   2. Un archivo que desaparece antes de leerlo da error solo en su tarea; las
+#      demás salidas se escriben igual.
+#   3. Con latencia, 16 lecturas y 8 escrituras a la vez van al menos 3 veces más
+#      rápido que de una en una.
+#
+# USO:
+#    >>> python benchmarks/comprobar_red_lenta.py [--archivos 60] [--latencia-ms 20]
+
+import os
+import sys
+import zlib
+import random
+import shutil
+import argparse
+import tempfile
+
+# Permite importar los scripts de la carpeta raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import procesar_en_pipeline, leer_bytes  # noqa: E402
+from benchmark_red_lenta import (CarpetaLenta, SincronizacionLenta, SincronizacionPorArchivo,  # noqa: E402
+                                 transformar, ejecutar)
+
+# Aceleración mínima de 16 lecturas y 8 escrituras frente a una de cada
+ACELERACION_MINIMA = 3.0
+
+def esperadas(rutas):
+    """{nombre de la salida: crc} calculado sin pipeline ni latencia"""
+    return {os.path.basename(ruta) + ".z": zlib.crc32(transformar(ruta, leer_bytes(ruta))) for ruta in rutas}
+
+def comprobar_salidas(rutas, salida, sistema, latencia, fallos):
+    """Caso 1: una salida correcta por archivo con cualquier configuración"""
+    referencia = esperadas(rutas)
+    tiempos = {}
+    for lecturas, escrituras, sincronizacion in [(1, 1, None), (4, 2, None), (16, 8, None),
+                                                 (16, 8, SincronizacionPorArchivo(latencia)),
+                                                 (16, 8, SincronizacionLenta(latencia))]:
+        nombre = f"{lecturas}/{escrituras}" + ("" if sincronizacion is None else f" + {type(sincronizacion).__name__}")
+        segundos, sumas = ejecutar(rutas, salida, sistema, lecturas, escrituras, sincronizacion)
+        if sincronizacion is None:
+            tiempos[lecturas, escrituras] = segundos
+        sobrantes = sorted(set(sumas) - set(referencia))
+        faltan = sorted(set(referencia) - set(sumas))
+        distintas = [nombre_salida for nombre_salida in set(sumas) & set(referencia)
+                     if sumas[nombre_salida] != referencia[nombre_salida]]
+        if sobrantes or faltan or distintas:
+            fallos.append(f"{nombre}: {len(faltan)} salidas faltan, {len(sobrantes)} sobran "
+                          f"(p. ej. {(sobrantes or ['-'])[0]}) y {len(distintas)} no coinciden")
+        if type(sincronizacion) is SincronizacionLenta and sincronizacion.sincronizaciones >= len(rutas):
+            fallos.append(f"{nombre}: {sincronizacion.sincronizaciones} fsync de carpeta para "
+                          f"{len(rutas)} archivos; no se agruparon")
+    return tiempos
+
+def comprobar_archivo_borrado(rutas, salida, sistema, fallos):
+    """Caso 2: un archivo que desaparece solo hace fallar su tarea"""
+    borrada = rutas[len(rutas) // 2]
+    rutas = rutas[:len(rutas) // 2] + [borrada + ".borrado"] + rutas[len(rutas) // 2 + 1:]
+    errores = []
+    for ruta, _, error in procesar_en_pipeline(
+            rutas,
+            leer=sistema.leer,
+            transformar=transformar,
+            escribir=lambda ruta, datos: sistema.escribir(os.path.join(salida, os.path.basename(ruta) + ".z"), datos),
+            hilos_lectura=16,
+            hilos_escritura=8):
+        if error is not None:
+            errores.append((ruta, error))
+    escritas = set(os.listdir(salida))
+    for nombre in escritas:
+        os.remove(os.path.join(salida, nombre))
+    if [ruta for ruta, _ in errores] != [borrada + ".borrado"] or not isinstance(errores[0][1], FileNotFoundError):
+        fallos.append(f"archivo borrado: errores inesperados {errores}")
+    if escritas != set(esperadas(ruta for ruta in rutas if ruta != borrada + ".borrado")):
+        fallos.append(f"archivo borrado: se escribieron {len(escritas)} de {len(rutas) - 1} salidas")
+
+def main(argv=None):
+    """Ejecuta los casos; devuelve 1 si alguno falla"""
+    parser = argparse.ArgumentParser(description="Comprueba el pipeline sobre una carpeta de red simulada.")
+    parser.add_argument("--archivos", type=int, default=60)
+    parser.add_argument("--latencia-ms", type=float, default=20.0, help="Latencia por apertura y por fsync.")
+    parser.add_argument("--kb", type=int, default=64, help="Tamaño de cada archivo.")
+    args = parser.parse_args(argv)
+    latencia = args.latencia_ms / 1000
+
+    carpeta = tempfile.mkdtemp(prefix="comprobar_red_lenta_")
+    fallos = []
+    try:
+        origen = os.path.join(carpeta, "origen")
+        salida = os.path.join(carpeta, "salida")
+        os.makedirs(origen)
+        os.makedirs(salida)
+        aleatorio = random.Random(0)
+        rutas = []
+        for indice in range(args.archivos):
+            ruta = os.path.join(origen, f"foto_{indice:05d}.bin")
+            with open(ruta, "wb") as archivo:
+                archivo.write(aleatorio.randbytes(args.kb * 1024))
+            rutas.append(ruta)
+        sistema = CarpetaLenta(latencia)
+
+        antes = len(fallos)
+        tiempos = comprobar_salidas(rutas, salida, sistema, latencia, fallos)
+        print(f"{'✅' if len(fallos) == antes else '❌'} {comprobar_salidas.__doc__}")
+        antes = len(fallos)
+        comprobar_archivo_borrado(rutas, salida, sistema, fallos)
+        print(f"{'✅' if len(fallos) == antes else '❌'} {comprobar_archivo_borrado.__doc__}")
+        aceleracion = tiempos[1, 1] / tiempos[16, 8]
+        if aceleracion < ACELERACION_MINIMA:
+            fallos.append(f"16/8 solo va {aceleracion:.1f}x más rápido que 1/1 (mínimo {ACELERACION_MINIMA:.0f}x)")
+        print(f"{'✅' if aceleracion >= ACELERACION_MINIMA else '❌'} Caso 3: 16/8 va {aceleracion:.1f}x "
+              f"más rápido que 1/1")
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    for fallo in fallos:
+        print(f"   ❌ {fallo}")
+    return 1 if fallos else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# Comprobación del reparto entre nodos - Sale con código 1 si algún caso falla
+# Julio 2025
+#
+# A diferencia de simulacion_nodos.py, que mide, aquí solo se comprueba. Cada nodo
+# es un proceso local y apunta en su registro cada salida que escribe:
+#   1. Tres nodos: cada salida se escribe exactamente una vez y todos los lotes
+#      de la ronda quedan "hecho".
+#   2. Tres nodos y uno se corta a mitad de trabajo sin liberar nada: su lote se
+#      vuelve a alquilar al vencer, todo se escribe y, entre los nodos que siguen
+#      vivos, cada salida se escribe exactamente una vez (solo se repite lo que el
+#      nodo caído ya había escrito en el lote que no terminó).
+#   3. Una carpeta que tumba a todo nodo que la toma: tras MAX_INTENTOS alquileres
+#      queda en "error" y el nodo que sobrevive termina la ronda con el resto.
+#
+# USO:
+#    >>> python benchmarks/comprobar_reparto.py [--carpetas 12] [--archivos 10] [--vencimiento 2]
+#                                              [--limite 60]
+
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+from collections import Counter
+
+# Permite importar los scripts de la carpeta raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import procesar_en_pipeline  # noqa: E402
+from reparto import Reparto, NOMBRE_REPARTO, MAX_INTENTOS  # noqa: E402
+from simulacion_nodos import crear_arbol  # noqa: E402
+
+# Carpeta que tumba a los nodos en el caso 3 (de primer nivel, sin subcarpetas)
+CARPETA_VENENO = "c001"
+
+def nodo(ruta_base, ronda, nombre, vencimiento, registro, caer_tras=None, veneno=None):
+    """Un nodo: apunta en su registro cada salida escrita; se cae tras 'caer_tras' o al tocar 'veneno'"""
+    reparto = Reparto(ruta_base, "comprobacion", ronda, nombre, vencimiento)
+
+    def tareas():
+        for _, archivos, _ in reparto.recorrer():
+            for entrada in archivos:
+                if entrada.name.endswith(".jpg"):
+                    yield entrada.path
+
+    with open(registro, "a", encoding="utf-8") as archivo:
+        def escribir(ruta, salida):
+            if veneno is not None and os.path.basename(os.path.dirname(ruta)) == veneno:
+                # Caída sin cerrar el reparto ni liberar las carpetas alquiladas
+                os._exit(1)
+            time.sleep(0.005)
+            archivo.write(os.path.relpath(ruta, ruta_base) + "\n")
+            archivo.flush()
+            return ruta
+
+        hechos = 0
+        # Pocas tareas en vuelo: con las 32 por defecto el nodo ya habría alquilado las
+        # carpetas siguientes al caer en la carpeta veneno, y también gastarían intentos
+        for ruta, _, error in procesar_en_pipeline(reparto.tareas(tareas()), leer=lambda ruta: b"",
+                                                   transformar=lambda ruta, datos: datos, escribir=escribir,
+                                                   hilos_lectura=1, hilos_escritura=1, max_en_vuelo=4):
+            if error is not None:
+                raise error
+            reparto.procesado()
+            hechos += 1
+            if caer_tras is not None and hechos >= caer_tras:
+                os._exit(1)
+    reparto.cerrar()
+
+def ejecutar_ronda(ruta_base, ronda, carpeta_registros, args, nodos, caer_tras=None, veneno=None):
+    """Lanza los nodos y espera; devuelve ({nodo: Counter de salidas}, {nodo: código de salida})
+
+    Un nodo que sigue vivo pasados --limite segundos se termina y su código es None.
+    """
+    procesos = {}
+    for indice in range(nodos):
+        nombre = f"nodo{indice}"
+        registro = os.path.join(carpeta_registros, f"{ronda}-{nombre}.txt")
+        proceso = multiprocessing.Process(target=nodo, args=(ruta_base, ronda, nombre, args.vencimiento, registro,
+                                                             caer_tras if indice == 0 else None, veneno))
+        proceso.start()
+        procesos[nombre] = proceso
+    escritas, codigos = {}, {}
+    limite = time.monotonic() + args.limite
+    for nombre, proceso in procesos.items():
+        proceso.join(max(0.0, limite - time.monotonic()))
+        if proceso.is_alive():
+            proceso.kill()
+            proceso.join()
+            codigos[nombre] = None
+        else:
+            codigos[nombre] = proceso.exitcode
+        registro = os.path.join(carpeta_registros, f"{ronda}-{nombre}.txt")
+        escritas[nombre] = Counter()
+        if os.path.exists(registro):
+            with open(registro, encoding="utf-8") as archivo:
+                escritas[nombre].update(linea.strip() for linea in archivo if linea.strip())
+    return escritas, codigos
+
+def lotes_de(ruta_base, ronda):
+    """Filas (carpeta, parte, estado, intentos) de la ronda en la tabla del reparto"""
+    conexion = sqlite3.connect(os.path.join(ruta_base, NOMBRE_REPARTO))
+    try:
+        return conexion.execute("SELECT carpeta, parte, estado, intentos FROM lotes WHERE ronda = ? ORDER BY id",
+                                (ronda,)).fetchall()
+    finally:
+        conexion.close()
+
+def todos_los_archivos(ruta_base):
+    """Rutas relativas de todos los .jpg del árbol"""
+    rutas = set()
+    for carpeta, _, archivos in os.walk(ruta_base):
+        rutas.update(os.path.relpath(os.path.join(carpeta, nombre), ruta_base)
+                     for nombre in archivos if nombre.endswith(".jpg"))
+    return rutas
+
+def comprobar_sin_caidas(ruta_base, carpeta_registros, args, fallos):
+    """Caso 1: tres nodos sanos"""
+    ronda = "sin-caidas"
+    escritas, codigos = ejecutar_ronda(ruta_base, ronda, carpeta_registros, args, 3)
+    total = sum(escritas.values(), Counter())
+    if any(codigo != 0 for codigo in codigos.values()):
+        fallos.append(f"{ronda}: nodos que terminaron con error: {codigos}")
+    if set(total) != todos_los_archivos(ruta_base):
+        fallos.append(f"{ronda}: se escribieron {len(total)} de {len(todos_los_archivos(ruta_base))} salidas")
+    repetidas = sorted(ruta for ruta, veces in total.items() if veces > 1)
+    if repetidas:
+        fallos.append(f"{ronda}: {len(repetidas)} salidas escritas más de una vez, p. ej. {repetidas[0]}")
+    pendientes = [fila for fila in lotes_de(ruta_base, ronda) if fila[2] != "hecho"]
+    if pendientes:
+        fallos.append(f"{ronda}: lotes sin terminar: {pendientes}")
+
+def comprobar_caida(ruta_base, carpeta_registros, args, fallos):
+    """Caso 2: un nodo se corta a mitad de trabajo y los demás retoman su lote"""
+    ronda = "con-caida"
+    # A mitad de su segundo lote, para que la caída deje escritas a medias
+    caer_tras = args.archivos + args.archivos // 2
+    escritas, codigos = ejecutar_ronda(ruta_base, ronda, carpeta_registros, args, 3, caer_tras=caer_tras)
+    if codigos["nodo0"] != 1:
+        fallos.append(f"{ronda}: el nodo que debía caerse terminó con código {codigos['nodo0']}")
+    if codigos["nodo1"] != 0 or codigos["nodo2"] != 0:
+        fallos.append(f"{ronda}: nodos que terminaron con error: {codigos}")
+    caido = escritas["nodo0"]
+    vivos = escritas["nodo1"] + escritas["nodo2"]
+    if set(caido) | set(vivos) != todos_los_archivos(ruta_base):
+        fallos.append(f"{ronda}: faltan salidas: {sorted(todos_los_archivos(ruta_base) - set(caido) - set(vivos))[:3]}")
+    repetidas = sorted(ruta for ruta, veces in (caido + vivos).items()
+                       if veces > 1 and (vivos[ruta] > 1 or caido[ruta] > 1))
+    if repetidas:
+        fallos.append(f"{ronda}: {len(repetidas)} salidas escritas más de una vez por el mismo grupo, "
+                      f"p. ej. {repetidas[0]}")
+    lotes = lotes_de(ruta_base, ronda)
+    pendientes = [fila for fila in lotes if fila[2] != "hecho"]
+    if pendientes:
+        fallos.append(f"{ronda}: lotes sin terminar: {pendientes}")
+    if not any(intentos > 1 for _, _, _, intentos in lotes):
+        fallos.append(f"{ronda}: ningún lote se volvió a alquilar tras la caída")
+
+def comprobar_carpeta_veneno(ruta_base, carpeta_registros, args, fallos):
+    """Caso 3: una carpeta tumba a cada nodo que la toma; acaba en "error" y el resto se termina"""
+    ronda = "con-veneno"
+    # Cada alquiler de la carpeta tumba un nodo: con uno más que MAX_INTENTOS siempre sobrevive alguno
+    escritas, codigos = ejecutar_ronda(ruta_base, ronda, carpeta_registros, args,
+                                       MAX_INTENTOS + 1, veneno=CARPETA_VENENO)
+    if None in codigos.values():
+        fallos.append(f"{ronda}: nodos que no terminaron en {args.limite:.0f} s: {codigos}")
+    caidos = sum(1 for codigo in codigos.values() if codigo == 1)
+    if caidos != MAX_INTENTOS:
+        fallos.append(f"{ronda}: se cayeron {caidos} nodos y se esperaban {MAX_INTENTOS}")
+    esperadas = {ruta for ruta in todos_los_archivos(ruta_base)
+                 if os.path.dirname(ruta) != CARPETA_VENENO}
+    total = sum(escritas.values(), Counter())
+    if set(total) != esperadas:
+        fallos.append(f"{ronda}: se escribieron {len(set(total) & esperadas)} de {len(esperadas)} salidas "
+                      f"y {len(set(total) - esperadas)} de la carpeta fallida")
+    for carpeta, _, estado, intentos in lotes_de(ruta_base, ronda):
+        if carpeta == CARPETA_VENENO and (estado != "error" or intentos != MAX_INTENTOS):
+            fallos.append(f"{ronda}: {carpeta} quedó en '{estado}' tras {intentos} alquileres")
+        elif carpeta != CARPETA_VENENO and estado != "hecho":
+            fallos.append(f"{ronda}: {carpeta} quedó en '{estado}'")
+
+def main(argv=None):
+    """Ejecuta los tres casos; devuelve 1 si alguno falla"""
+    parser = argparse.ArgumentParser(description="Comprueba el reparto entre nodos simulados con procesos locales.")
+    parser.add_argument("--carpetas", type=int, default=12)
+    parser.add_argument("--archivos", type=int, default=10, help="Archivos por carpeta.")
+    parser.add_argument("--vencimiento", type=float, default=2.0, help="Segundos del alquiler.")
+    parser.add_argument("--limite", type=float, default=60.0, help="Segundos máximos de cada caso.")
+    args = parser.parse_args(argv)
+
+    carpeta = tempfile.mkdtemp(prefix="comprobar_reparto_")
+    fallos = []
+    try:
+        ruta_base = os.path.join(carpeta, "arbol")
+        carpeta_registros = os.path.join(carpeta, "registros")
+        os.makedirs(carpeta_registros)
+        crear_arbol(ruta_base, args.carpetas, args.archivos)
+        for comprobar in (comprobar_sin_caidas, comprobar_caida, comprobar_carpeta_veneno):
+            antes = len(fallos)
+            comprobar(ruta_base, carpeta_registros, args, fallos)
+            print(f"{'✅' if len(fallos) == antes else '❌'} {comprobar.__doc__}")
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    for fallo in fallos:
+        print(f"   ❌ {fallo}")
+    return 1 if fallos else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# Simulación de varios nodos - Reparto por alquileres con procesos locales
+# Julio 2025
+#
+# Crea un árbol de carpetas y lo procesa con 1, 2, 4... "nodos" (procesos locales
+# que comparten la tabla de reparto.py, igual que varias máquinas sobre una carpeta
+# de red). Cada archivo tarda --trabajo-ms en el pipeline (espera de E/S, para que
+# la escala no dependa de los núcleos de este equipo). Comprueba que cada archivo
+# se procesó al menos una vez y cuenta los repetidos.
+#
+# Con --caida uno de los nodos se corta a mitad de trabajo sin liberar sus
+# carpetas (como una máquina que se apaga); los demás las retoman cuando vence
+# su alquiler (--vencimiento segundos).
+#
+# USO:
+#    >>> python benchmarks/simulacion_nodos.py [--nodos 1 2 4] [--carpetas 24] [--archivos 20]
+#                                              [--trabajo-ms 10] [--caida] [--vencimiento 3]
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from collections import Counter
+
+# Permite importar los scripts de la carpeta raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import procesar_en_pipeline  # noqa: E402
+from reparto import Reparto  # noqa: E402
+
+def crear_arbol(carpeta, carpetas, archivos):
+    """Crea 'carpetas' carpetas (algunas anidadas) con 'archivos' archivos cada una"""
+    for indice in range(carpetas):
+        # Cada cuarta carpeta cuelga de la anterior, para probar subcarpetas
+        padre = f"c{indice - 1:03d}" if indice % 4 == 3 else ""
+        ruta = os.path.join(carpeta, padre, f"c{indice:03d}")
+        os.makedirs(ruta, exist_ok=True)
+        for numero in range(archivos):
+            with open(os.path.join(ruta, f"foto_{numero:04d}.jpg"), "wb") as archivo:
+                archivo.write(b"\xff\xd8\xff" + bytes(61))
+
+def nodo(ruta_base, ronda, nombre, trabajo, vencimiento, registro, caer_tras):
+    """Un nodo: procesa las carpetas que alquila y apunta cada archivo en su registro"""
+    reparto = Reparto(ruta_base, "simulacion", ronda, nombre, vencimiento)
+
+    def tareas():
+        for _, archivos, _ in reparto.recorrer():
+            for entrada in archivos:
+                # La carpeta raíz también guarda la tabla del reparto
+                if entrada.name.endswith(".jpg"):
+                    yield entrada.path
+
+    def escribir(ruta, salida):
+        time.sleep(trabajo)
+        return ruta
+
+    hechos = 0
+    with open(registro, "a", encoding="utf-8") as archivo:
+        for ruta, _, error in procesar_en_pipeline(reparto.tareas(tareas()), leer=lambda ruta: b"",
+                                                   transformar=lambda ruta, datos: datos, escribir=escribir,
+                                                   hilos_lectura=1, hilos_escritura=1):
+            archivo.write(os.path.relpath(ruta, ruta_base) + "\n")
+            archivo.flush()
+            reparto.procesado()
+            hechos += 1
+            if caer_tras is not None and hechos >= caer_tras:
+                # Caída: sin cerrar el reparto ni liberar las carpetas alquiladas
+                os._exit(1)
+    reparto.cerrar()
+
+def simular(ruta_base, total, nodos, args, carpeta_registros):
+    """Ejecuta una ronda con 'nodos' procesos; devuelve (segundos, procesados por archivo)"""
+    ronda = f"simulacion-{nodos}-{time.time():.0f}"
+    procesos = []
+    inicio = time.perf_counter()
+    for indice in range(nodos):
+        # Con --caida el primer nodo se cae tras hacer una cuarta parte de lo que le tocaría
+        caer_tras = max(1, total // nodos // 4) if args.caida and indice == 0 and nodos > 1 else None
+        registro = os.path.join(carpeta_registros, f"{ronda}-nodo{indice}.txt")
+        proceso = multiprocessing.Process(target=nodo, args=(ruta_base, ronda, f"nodo{indice}", args.trabajo_ms / 1000,
+                                                             args.vencimiento, registro, caer_tras))
+        proceso.start()
+        procesos.append(proceso)
+    for proceso in procesos:
+        proceso.join()
+    segundos = time.perf_counter() - inicio
+    conteo = Counter()
+    for nombre in os.listdir(carpeta_registros):
+        if nombre.startswith(ronda):
+            with open(os.path.join(carpeta_registros, nombre), encoding="utf-8") as archivo:
+                conteo.update(linea.strip() for linea in archivo if linea.strip())
+    return segundos, conteo
+
+def main(argv=None):
+    """Ejecuta la simulación e imprime una tabla por número de nodos"""
+    parser = argparse.ArgumentParser(description="Reparto entre nodos simulados con procesos locales.")
+    parser.add_argument("--nodos", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--carpetas", type=int, default=24)
+    parser.add_argument("--archivos", type=int, default=20, help="Archivos por carpeta.")
+    parser.add_argument("--trabajo-ms", type=float, default=10.0, help="Tiempo de cada archivo.")
+    parser.add_argument("--caida", action="store_true", help="Un nodo se cae a mitad de trabajo.")
+    parser.add_argument("--vencimiento", type=float, default=3.0, help="Segundos del alquiler.")
+    args = parser.parse_args(argv)
+
+    carpeta = tempfile.mkdtemp(prefix="simulacion_nodos_")
+    try:
+        ruta_base = os.path.join(carpeta, "arbol")
+        carpeta_registros = os.path.join(carpeta, "registros")
+        os.makedirs(carpeta_registros)
+        crear_arbol(ruta_base, args.carpetas, args.archivos)
+        total = args.carpetas * args.archivos
+        print(f"🌳 {args.carpetas} carpetas x {args.archivos} archivos, {args.trabajo_ms:.0f} ms por archivo"
+              f"{', un nodo se cae' if args.caida else ''}")
+        print(f"{'Nodos':>6} {'segundos':>9} {'archivos/s':>11} {'aceleración':>12} {'repetidos':>10}")
+        base = None
+        for nodos in args.nodos:
+            segundos, conteo = simular(ruta_base, total, nodos, args, carpeta_registros)
+            if len(conteo) != total:
+                print(f"❌ {nodos} nodos: se procesaron {len(conteo)} de {total} archivos")
+                return 1
+            base = base or segundos * nodos / args.nodos[0]
+            repetidos = sum(conteo.values()) - total
+            print(f"{nodos:>6} {segundos:>9.2f} {total / segundos:>11.1f} {base / segundos:>11.1f}x {repetidos:>10}")
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
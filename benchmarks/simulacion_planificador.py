@@ -0,0 +1,87 @@
+# Simulación del planificador - Orden del recorrido frente a "de mayor a menor"
+# Julio 2025
+#
+# Procesa con el pipeline real (pipeline.py) una carpeta simulada de fotos de móvil
+# con unas pocas panorámicas enormes al final del recorrido. Cada archivo tarda
+# --ms-por-mp milisegundos por megapíxel (una espera, para que el resultado no
+# dependa de los núcleos de este equipo). Compara:
+#   - el tiempo total (makespan) en el orden del recorrido y de mayor a menor coste
+#     (el orden de planificador.py), entregando los resultados en orden o según
+#     terminan (en_orden=False, lo que hacen los scripts con --planificar), y
+#   - el error del tiempo restante estimado a mitad de camino, contando archivos por
+#     segundo (Progreso sin plan) o megapíxeles por segundo (Progreso con plan).
+#
+# USO:
+#    >>> python benchmarks/simulacion_planificador.py [--fotos 200] [--panoramicas 6]
+#                                                     [--trabajadores 4] [--ms-por-mp 2]
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Permite importar los scripts de la carpeta raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import procesar_en_pipeline  # noqa: E402
+from planificador import Cabecera, costo_estimado  # noqa: E402
+
+def simular(cabeceras, trabajadores, ms_por_mp, en_orden=True):
+    """Procesa las cabeceras en orden; devuelve (segundos, [(segundos, archivos, coste hechos), ...])"""
+    def transformar(cabecera, datos):
+        time.sleep(costo_estimado(cabecera) * ms_por_mp / 1000)
+
+    ejecutor = ThreadPoolExecutor(max_workers=trabajadores)
+    avance = []
+    coste = 0.0
+    inicio = time.perf_counter()
+    try:
+        for numero, (cabecera, *_) in enumerate(procesar_en_pipeline(
+                cabeceras, leer=lambda cabecera: b"", transformar=transformar,
+                escribir=lambda cabecera, salida: None, ejecutor_cpu=ejecutor,
+                max_en_vuelo=trabajadores * 2 + 4, en_orden=en_orden), 1):
+            coste += costo_estimado(cabecera)
+            avance.append((time.perf_counter() - inicio, numero, coste))
+    finally:
+        ejecutor.shutdown()
+    return time.perf_counter() - inicio, avance
+
+def error_restante(avance, total_archivos, total_coste, segundos, fraccion=0.5):
+    """Error del tiempo restante estimado al pasar 'fraccion' del tiempo total: (por archivos, por coste)"""
+    momento, archivos, coste = next(punto for punto in avance if punto[0] >= segundos * fraccion)
+    real = segundos - momento
+    por_archivos = (total_archivos - archivos) / (archivos / momento)
+    por_coste = (total_coste - coste) / (coste / momento)
+    return (por_archivos - real) / real, (por_coste - real) / real
+
+def main(argv=None):
+    """Ejecuta la simulación e imprime la comparación"""
+    parser = argparse.ArgumentParser(description="Orden del recorrido frente a de mayor a menor coste.")
+    parser.add_argument("--fotos", type=int, default=200, help="Fotos de 12 MP.")
+    parser.add_argument("--panoramicas", type=int, default=6, help="Panorámicas de 100 MP al final del recorrido.")
+    parser.add_argument("--trabajadores", type=int, default=4)
+    parser.add_argument("--ms-por-mp", type=float, default=2.0, help="Milisegundos de trabajo por megapíxel.")
+    args = parser.parse_args(argv)
+
+    recorrido = ([Cabecera(4032, 3024, "jpeg")] * args.fotos
+                 + [Cabecera(12000, 8400, "jpeg")] * args.panoramicas)
+    planificado = sorted(recorrido, key=lambda cabecera: -costo_estimado(cabecera))
+    total_coste = sum(costo_estimado(cabecera) for cabecera in recorrido)
+    ideal = total_coste * args.ms_por_mp / 1000 / args.trabajadores
+
+    print(f"📸 {args.fotos} fotos de 12 MP y {args.panoramicas} panorámicas de 100 MP al final, "
+          f"{args.trabajadores} trabajadores (ideal {ideal:.2f} s)")
+    print(f"{'Orden':<16} {'segundos':>9} {'sobre ideal':>12} {'restante/archivos':>18} {'restante/coste':>15}")
+    for nombre, orden, en_orden in (("recorrido", recorrido, True),
+                                    ("mayor a menor", planificado, True),
+                                    ("planificado", planificado, False)):
+        segundos, avance = simular(orden, args.trabajadores, args.ms_por_mp, en_orden)
+        por_archivos, por_coste = error_restante(avance, len(orden), total_coste, segundos)
+        print(f"{nombre:<16} {segundos:>9.2f} {segundos / ideal - 1:>11.0%} {por_archivos:>17.0%} {por_coste:>14.0%}")
+    print("   (planificado: de mayor a menor y cada resultado según termina, como con --planificar;")
+    print("    restante: error del tiempo restante estimado a mitad del proceso)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
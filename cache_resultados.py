@@ -0,0 +1,182 @@
+# Caché de resultados por contenido - Evita repetir trabajo con archivos duplicados
+# Julio 2025 - Usado por quitar_fondo_lento.py
+#
+# Guarda cada resultado bajo el hash de la imagen de origen más los parámetros
+# (por ejemplo el modelo). Si la misma foto aparece copiada en diez carpetas, la
+# red neuronal solo se ejecuta una vez y las otras nueve salidas se sirven desde
+# la caché con una copia. Con enlazar=True se usa un enlace duro (o una copia si el
+# destino está en otro disco): ahorra espacio, pero la salida y la caché son el
+# mismo archivo, y editar una salida cambia el resultado guardado y las demás
+# salidas enlazadas a él.
+#
+# La caché tiene un tamaño máximo: cuando se supera se borran los resultados
+# usados hace más tiempo (LRU). La fecha de último uso se guarda en un archivo
+# vacío "<resultado>.uso" al lado de cada resultado, no en el resultado: con
+# enlaces duros, tocar su fecha cambiaría la de todas las salidas enlazadas.
+# Un resultado encontrado con contiene() queda reservado hasta que servir() lo usa,
+# así una expulsión de otro hilo no lo borra entre medias.
+
+import os
+import shutil
+import hashlib
+import threading
+
+from manifiesto import ruta_parcial
+
+# Carpeta por defecto de la caché
+CARPETA_POR_DEFECTO = os.path.join(os.path.expanduser("~"), ".cache", "quitar_fondo")
+
+# Tamaño máximo por defecto (5 GB)
+LIMITE_POR_DEFECTO = 5 * 1024 ** 3
+
+# Al expulsar, se baja hasta esta fracción del límite para no expulsar en cada guardado
+FRACCION_TRAS_EXPULSAR = 0.9
+
+# Sufijo del archivo que guarda la fecha de último uso de cada resultado
+SUFIJO_USO = ".uso"
+
+class CacheResultados:
+    """Caché en disco de resultados indexados por hash de contenido"""
+
+    def __init__(self, carpeta=CARPETA_POR_DEFECTO, limite_bytes=LIMITE_POR_DEFECTO,
+                 extension=".png", enlazar=False):
+        self.carpeta = carpeta
+        self.limite_bytes = limite_bytes
+        self.extension = extension
+        self.enlazar = enlazar
+        self.aciertos = 0
+        self.fallos = 0
+        self._candado = threading.Lock()
+        # Clave → veces que contiene() la encontró y servir() aún no la usó
+        self._reservadas = {}
+        os.makedirs(self.carpeta, exist_ok=True)
+        self._total_bytes = sum(tamano for _, tamano, _ in self._entradas())
+
+    def clave(self, datos, *parametros):
+        """Calcula la clave de un origen (sus bytes) con los parámetros que cambian el resultado"""
+        digest = hashlib.blake2b(datos, digest_size=20)
+        for parametro in parametros:
+            digest.update(b"\0" + str(parametro).encode("utf-8"))
+        return digest.hexdigest()
+
+    def ruta(self, clave):
+        """Ruta del resultado en la caché (repartida en subcarpetas por los 2 primeros caracteres)"""
+        return os.path.join(self.carpeta, clave[:2], clave + self.extension)
+
+    def ruta_uso(self, clave):
+        """Archivo vacío cuya fecha de modificación es el último uso del resultado"""
+        return self.ruta(clave) + SUFIJO_USO
+
+    def _marcar_uso(self, clave):
+        """Pone la fecha actual como último uso del resultado"""
+        uso = self.ruta_uso(clave)
+        try:
+            os.utime(uso)
+        except FileNotFoundError:
+            open(uso, 'wb').close()
+
+    def contiene(self, clave):
+        """Indica si la caché tiene el resultado y cuenta el acierto o fallo
+
+        Si lo tiene, el resultado no se expulsa hasta que se llame a servir() con esa clave.
+        """
+        with self._candado:
+            # Comprobar y reservar bajo el candado: _expulsar() también lo toma
+            encontrado = os.path.exists(self.ruta(clave))
+            if encontrado:
+                self.aciertos += 1
+                self._reservadas[clave] = self._reservadas.get(clave, 0) + 1
+            else:
+                self.fallos += 1
+        return encontrado
+
+    def servir(self, clave, ruta_salida, sincronizacion=None):
+        """Crea la salida a partir de la caché (copia o, con enlazar, enlace duro) y marca el uso
+
+        Con 'sincronizacion' (ver pipeline.escribir_bytes) la salida queda en disco antes de volver.
+        Si otra ejecución con la misma carpeta de caché lo expulsó, lanza FileNotFoundError.
+        """
+        try:
+            self._servir(clave, ruta_salida, sincronizacion)
+        finally:
+            with self._candado:
+                if self._reservadas.get(clave, 0) > 1:
+                    self._reservadas[clave] -= 1
+                else:
+                    self._reservadas.pop(clave, None)
+
+    def _servir(self, clave, ruta_salida, sincronizacion):
+        """Enlaza o copia el resultado en la salida (ver servir)"""
+        origen = self.ruta(clave)
+        temporal = ruta_parcial(ruta_salida)
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        try:
+            if not self.enlazar:
+                raise OSError("enlaces desactivados")
+            os.link(origen, temporal)
+        except OSError:
+            # Otro disco, sistema de archivos sin enlaces o enlaces desactivados
+            shutil.copyfile(origen, temporal)
+        if sincronizacion is not None:
+            with open(temporal, 'rb') as archivo:
+                os.fsync(archivo.fileno())
+        os.replace(temporal, ruta_salida)
+        if sincronizacion is not None:
+            sincronizacion.confirmar(os.path.dirname(os.path.abspath(ruta_salida)))
+        self._marcar_uso(clave)
+
+    def guardar(self, clave, datos):
+        """Guarda un resultado nuevo y expulsa los más antiguos si se supera el límite"""
+        destino = self.ruta(clave)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporal = ruta_parcial(destino)
+        with open(temporal, 'wb') as archivo:
+            archivo.write(datos)
+        os.replace(temporal, destino)
+        self._marcar_uso(clave)
+        with self._candado:
+            self._total_bytes += len(datos)
+            if self._total_bytes > self.limite_bytes:
+                self._expulsar()
+
+    def _entradas(self):
+        """Lista (fecha de último uso, tamaño, ruta) de todos los resultados guardados"""
+        entradas = []
+        for subcarpeta in os.scandir(self.carpeta):
+            if not subcarpeta.is_dir():
+                continue
+            resultados = []
+            usos = {}
+            for entrada in os.scandir(subcarpeta.path):
+                if entrada.name.endswith(SUFIJO_USO):
+                    usos[entrada.path[:-len(SUFIJO_USO)]] = entrada.stat().st_mtime
+                # Todos los formatos cuentan para el límite, no solo el de esta ejecución
+                elif not entrada.name.endswith(".parcial"):
+                    resultados.append(entrada)
+            for entrada in resultados:
+                estado = entrada.stat()
+                # Sin archivo de uso (caché de una versión anterior): su propia fecha
+                entradas.append((usos.get(entrada.path, estado.st_mtime), estado.st_size, entrada.path))
+        return entradas
+
+    def _expulsar(self):
+        """Borra los resultados usados hace más tiempo (llamar con el candado)"""
+        entradas = sorted(self._entradas())
+        self._total_bytes = sum(tamano for _, tamano, _ in entradas)
+        objetivo = self.limite_bytes * FRACCION_TRAS_EXPULSAR
+        reservadas = {self.ruta(clave) for clave in self._reservadas}
+        for _, tamano, ruta in entradas:
+            if self._total_bytes <= objetivo:
+                break
+            if ruta in reservadas:
+                continue
+            try:
+                os.remove(ruta)
+                self._total_bytes -= tamano
+            except OSError:
+                continue
+            try:
+                os.remove(ruta + SUFIJO_USO)
+            except OSError:
+                pass
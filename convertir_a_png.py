@@ -10,12 +10,57 @@
 # 4. Selecciona la carpeta donde están tus archivos HEIC o usa la carpeta por defecto
 # 5. El programa recorrerá todas las subcarpetas y convertirá todas las imágenes .HEIC a .PNG
 # 6. Una vez finalizado, verás un resumen del total de imágenes convertidas
+#
+# USO SIN MENÚS (cron, tareas programadas):
+#    >>> python convertir_a_png.py RUTA [--trabajadores N] [--eliminar-originales si|no]
+#                                  [--png-perfil rapido|equilibrado|pequeno] [--manifiesto] [--yes]
+#                                  [--metricas ARCHIVO.jsonl|ARCHIVO.prom]
+#                                  [--consola barra|detalle|silencio] [-q] [--memoria-mb MB]
+#                                  [--formato png|webp|webp_perdida|avif|jpeg|intermedio] [--calidad N]
+#                                  [--lecturas K] [--escrituras N] [--sincronizar] [--papelera CARPETA]
+#                                  [--reparto RONDA] [--nodo NOMBRE] [--vencimiento SEGUNDOS] [--planificar]
+#    Con una ruta o con --yes no se hace ninguna pregunta ni pausa final.
+#    Código de salida: 0 si todo fue bien, 1 si hubo errores, 130 si se canceló.
+#
+# La conversión se reparte entre varios procesos (uno por núcleo por defecto),
+# ya que tanto la decodificación HEIC como la compresión PNG usan solo CPU.
+# La lectura y la escritura de archivos se hacen en hilos aparte (pipeline.py),
+# así el disco y la CPU trabajan a la vez.
+#
+# El codificador PNG se puede ajustar (--png-perfil, --png-nivel, --png-estrategia,
+# --png-optimizar) y, si está instalado opencv-python, usar su codificador
+# (--png-motor opencv), que suele ser más rápido. Al final se muestra cuánto tiempo
+# se fue en cada etapa (lectura, decodificación HEIC, codificación PNG, escritura...);
+# con --metricas ARCHIVO esos tiempos se exportan por archivo (JSON) o para Prometheus (.prom).
+import io
 import os
 import sys
-from PIL import Image
-import pillow_heif
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from manifiesto import Manifiesto
+from pipeline import procesar_en_pipeline, leer_bytes, escribir_bytes, SincronizacionEnGrupo
+from escaner import recorrer_carpetas, existe
+from metricas import Metricas, cronometrar
+from progreso import Progreso, MODOS as MODOS_CONSOLA
+from memoria import pixeles_en_cabecera, presupuesto_pixeles
+from decodificadores import abrir_imagen, registrar_decodificadores
+from formatos_salida import FORMATOS_SALIDA, comprobar_formato, opciones_formato, codificar
+from retiro_originales import RetiroOriginales, comprobar_papelera
+from reparto import Reparto, MAX_INTENTOS, VENCIMIENTO as VENCIMIENTO_REPARTO
+from planificador import planificar as planificar_tareas
+
+# Carpeta usada por la opción "por defecto" del menú y por --yes sin ruta
+RUTA_POR_DEFECTO = os.path.join(os.path.expanduser("~"), "Downloads", "BATERIAS")
+
+# Estrategias de compresión de zlib (las mismas constantes Z_* de zlib)
+ESTRATEGIAS_ZLIB = {"defecto": 0, "filtrado": 1, "huffman": 2, "rle": 3, "fijo": 4}
+
+# Perfiles del codificador PNG: "equilibrado" es el comportamiento de siempre
+PERFILES_PNG = {
+    "rapido": {"nivel": 1, "estrategia": "rle", "optimizar": False},
+    "equilibrado": {"nivel": 6, "estrategia": "defecto", "optimizar": False},
+    "pequeno": {"nivel": 9, "estrategia": "defecto", "optimizar": True},
+}
 
 def verificar_dependencias():
     """Verifica que las librerías necesarias estén instaladas"""
@@ -31,7 +76,7 @@ def verificar_dependencias():
 def obtener_ruta_base():
     """Obtiene la ruta base donde buscar archivos HEIC"""
     # Opción 1: Carpeta por defecto en Descargas
-    ruta_por_defecto = os.path.join(os.path.expanduser("~"), "Downloads", "BATERIAS")
+    ruta_por_defecto = RUTA_POR_DEFECTO
     print("🔍 Opciones para seleccionar carpeta:")
     print("1. Seleccionar carpeta manualmente")
     print("2. Usar carpeta por defecto (Descargas/BATERIAS)")
@@ -40,6 +85,9 @@ def obtener_ruta_base():
         opcion = input("\nElige una opción (1-3): ").strip()
         if opcion == "1":
             try:
+                # tkinter solo se importa cuando de verdad se abre el diálogo
+                import tkinter as tk
+                from tkinter import filedialog
                 # Crear ventana de diálogo para seleccionar carpeta
                 root = tk.Tk()
                 root.withdraw()  # Ocultar ventana principal
@@ -77,46 +125,258 @@ def obtener_ruta_base():
         else:
             print("❌ Opción inválida. Elige 1, 2 o 3.")
 
-def convertir_heic_a_png(ruta_base):
-    """Convierte todos los archivos HEIC a PNG en la ruta especificada"""
+def _inicializar_trabajador():
+    """Registra el soporte HEIC en cada proceso trabajador"""
+    registrar_decodificadores()
+
+def motor_opencv_disponible():
+    """Indica si se puede usar el codificador PNG de OpenCV"""
+    try:
+        import cv2  # noqa: F401
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def preparar_opciones_png(perfil="equilibrado", nivel=None, estrategia=None, optimizar=None,
+                          motor="pillow"):
+    """Combina un perfil con los ajustes sueltos que se hayan indicado"""
+    opciones = dict(PERFILES_PNG[perfil])
+    if nivel is not None:
+        opciones["nivel"] = nivel
+    if estrategia is not None:
+        opciones["estrategia"] = estrategia
+    if optimizar is not None:
+        opciones["optimizar"] = optimizar
+    opciones["motor"] = motor
+    return opciones
+
+def codificar_png(img, opciones):
+    """Codifica una imagen RGB como PNG con las opciones indicadas"""
+    estrategia = ESTRATEGIAS_ZLIB[opciones["estrategia"]]
+    if opciones["motor"] == "opencv":
+        import cv2
+        import numpy as np
+        # OpenCV trabaja en BGR
+        correcto, codificada = cv2.imencode(
+            ".png", np.asarray(img)[:, :, ::-1],
+            [cv2.IMWRITE_PNG_COMPRESSION, opciones["nivel"], cv2.IMWRITE_PNG_STRATEGY, estrategia],
+        )
+        if not correcto:
+            raise RuntimeError("OpenCV no pudo codificar el PNG")
+        return codificada.tobytes()
+    salida = io.BytesIO()
+    img.save(salida, "PNG", compress_level=opciones["nivel"], compress_type=estrategia,
+             optimize=opciones["optimizar"])
+    return salida.getvalue()
+
+def convertir_bytes_heic(tarea, datos):
+    """Decodifica un HEIC leído en memoria y devuelve la imagen codificada (etapa de CPU)
+
+    Devuelve (bytes en el formato de salida, métricas de la conversión: tiempos por
+    etapa, bytes y píxeles).
+    """
+    _, _, opciones_png, formato, opciones = tarea
+    tiempos = {"bytes_entrada": len(datos)}
+    # Abrir y convertir imagen (convert() siempre copia: solo si no es ya RGB)
+    with cronometrar(tiempos, "decodificacion"):
+        img = abrir_imagen(datos)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        else:
+            img.load()
+    with cronometrar(tiempos, "codificacion"):
+        if formato == "png":
+            png = codificar_png(img, opciones_png)
+        else:
+            png = codificar(img, formato, opciones)
+    tiempos["bytes_salida"] = len(png)
+    tiempos["pixeles"] = img.width * img.height
+    return png, tiempos
+
+def escribir_png(tarea, salida, sincronizacion=None):
+    """Guarda la imagen convertida y devuelve las métricas de la conversión (etapa de escritura)"""
+    png, tiempos = salida
+    escribir_bytes(tarea[1], png, sincronizacion)
+    return tiempos
+
+def convertir_heic_a_png(ruta_base, trabajadores=None, eliminar_originales=None, usar_manifiesto=False,
+                         opciones_png=None, ruta_metricas=None, consola="barra", memoria_mb=None,
+                         formato="png", calidad=None, lecturas=4, escrituras=2, sincronizar=False,
+                         papelera=None, reparto=None, planificar=False):
+    """Convierte todos los archivos HEIC a PNG (u otro formato) en la ruta especificada
+
+    eliminar_originales: None pregunta al usuario, True/False decide sin preguntar.
+    Cada HEIC se retira en cuanto su conversión está escrita y verificada; con
+    'papelera' se mueve a esa carpeta (conservando las subcarpetas) en vez de borrarse.
+    reparto: Reparto opcional (ver reparto.py) para repartir el árbol entre varios
+    nodos; este nodo solo procesa las carpetas que alquila. Se cierra al terminar.
+    planificar: recorre todo el árbol y lee las cabeceras antes de empezar (ver
+    planificador.py) para convertir de la foto más grande a la más pequeña. No se
+    combina con reparto.
+    opciones_png: ajustes del codificador (ver preparar_opciones_png); por defecto
+    el perfil "equilibrado".
+    usar_manifiesto: decide qué convertir según el manifiesto de la carpeta
+    (archivos nuevos o modificados) en lugar de mirar si ya existe el PNG.
+    ruta_metricas: archivo donde exportar los tiempos por etapa (.prom para
+    Prometheus, cualquier otro nombre para líneas JSON).
+    consola: "barra" (progreso en una línea), "detalle" (una línea por archivo)
+    o "silencio" (solo el resumen).
+    memoria_mb: si se indica, limita los píxeles que se decodifican a la vez
+    (ver memoria.py) para que el pico de memoria no dependa del tamaño de las fotos.
+    formato: formato de salida (ver formatos_salida.py); con "png" se usan opciones_png.
+    calidad: calidad del codificador en los demás formatos (por defecto, la del formato).
+    lecturas, escrituras: archivos que se leen y se escriben a la vez (súbelos en
+    carpetas de red con mucha latencia). sincronizar: confirma cada salida en disco
+    (fsync) antes de darla por hecha.
+    Devuelve un diccionario con los contadores del proceso.
+    """
     # Registrar soporte HEIC
-    pillow_heif.register_heif_opener()
+    registrar_decodificadores()
+    # Por defecto, un proceso por núcleo
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
+    # Codificador PNG
+    if opciones_png is None:
+        opciones_png = preparar_opciones_png()
+    if opciones_png["motor"] == "opencv" and not motor_opencv_disponible():
+        print("⚠️  opencv-python no está instalado; se usa el codificador de Pillow")
+        opciones_png = dict(opciones_png, motor="pillow")
+    # Preguntar antes de empezar si eliminar los HEIC (solo en modo interactivo)
+    if eliminar_originales is None:
+        eliminar = (
+            input("\n¿Deseas eliminar los archivos HEIC originales a medida que se conviertan? (s/n): ")
+            .strip()
+            .lower()
+        )
+        eliminar_originales = eliminar in ["s", "sí", "si", "SI", "Si", "Sí", "yes", "y", "YES", "Yes", "1"]
     # Contadores para estadísticas
     contador_convertidos = 0
     contador_errores = 0
     errores_detallados = []
+    metricas = Metricas("convertir_a_png", ruta_metricas)
+    progreso = Progreso(consola)
+    extension = FORMATOS_SALIDA[formato].extension
+    opciones = opciones_formato(formato, calidad)
+    parametros = {"formato": formato}
+    if formato != "png":
+        parametros["opciones"] = opciones
+    manifiesto = Manifiesto(ruta_base, "convertir_a_png", reparto is not None) if usar_manifiesto else None
+    retiro = RetiroOriginales(ruta_base, papelera, progreso.detalle) if eliminar_originales else None
+    # Un original solo se retira cuando su salida ya está en disco
+    sincronizacion = SincronizacionEnGrupo() if sincronizar or retiro is not None else None
     print(f"\n🔄 Iniciando conversión en: {ruta_base}")
+    print(f"⚙️  Procesos en paralelo: {trabajadores}")
+    if formato == "png":
+        print(f"🗜️  PNG: nivel {opciones_png['nivel']}, estrategia {opciones_png['estrategia']}, "
+              f"optimizar {'sí' if opciones_png['optimizar'] else 'no'}, motor {opciones_png['motor']}")
+    else:
+        print(f"🗜️  {formato.upper()}: " + ", ".join(f"{clave} {valor}" for clave, valor in opciones.items()))
     print("=" * 60)
-    # Recorrer todas las carpetas y subcarpetas
-    for carpeta_actual, subcarpetas, archivos in os.walk(ruta_base):
-        # Filtrar solo archivos HEIC
-        archivos_heic = [
-            archivo
-            for archivo in archivos
-            if archivo.lower().endswith((".heic", ".heif"))
-        ]
-        if archivos_heic:
-            print(f"\n📁 Procesando carpeta: {carpeta_actual}")
-            print(f"   Archivos HEIC encontrados: {len(archivos_heic)}")
-        for archivo in archivos_heic:
-            ruta_completa = os.path.join(carpeta_actual, archivo)
-            nombre_base = os.path.splitext(archivo)[0]
-            salida_png = os.path.join(carpeta_actual, nombre_base + ".png")
-            # Verificar si ya existe el archivo PNG
-            if os.path.exists(salida_png):
-                print(f"⚠️  Ya existe: {nombre_base}.png (omitiendo)")
-                continue
-            try:
-                # Abrir y convertir imagen
-                img = Image.open(ruta_completa).convert("RGB")
-                img.save(salida_png, "PNG")
+    def buscar_tareas():
+        """Genera las conversiones pendientes a medida que se recorre el árbol"""
+        # Recorrer todas las carpetas y subcarpetas
+        carpetas = recorrer_carpetas(ruta_base) if reparto is None else reparto.recorrer()
+        if reparto is None and not planificar:
+            # Con reparto este nodo solo hace una parte: el total del árbol no serviría
+            carpetas = progreso.contar(carpetas, lambda nombre, nombres: nombre.lower().endswith((".heic", ".heif")))
+        for carpeta_actual, archivos, nombres in metricas.escaneo(carpetas):
+            # Filtrar solo archivos HEIC
+            archivos_heic = [
+                entrada
+                for entrada in archivos
+                if entrada.name.lower().endswith((".heic", ".heif"))
+            ]
+            if archivos_heic:
+                progreso.detalle(f"\n📁 Procesando carpeta: {carpeta_actual}")
+                progreso.detalle(f"   Archivos HEIC encontrados: {len(archivos_heic)}")
+            for entrada in archivos_heic:
+                archivo = entrada.name
+                nombre_base = os.path.splitext(archivo)[0]
+                salida_convertida = os.path.join(carpeta_actual, nombre_base + extension)
+                if manifiesto is not None:
+                    # Omitir solo si el manifiesto dice que no cambió
+                    if not manifiesto.necesita_proceso(entrada.path, parametros, entrada, nombres):
+                        progreso.detalle(f"⚠️  Sin cambios: {archivo} (omitiendo)")
+                        progreso.avanzar()
+                        continue
+                # Verificar si ya existe el archivo convertido (sin consultar al disco)
+                elif existe(nombres, nombre_base + extension):
+                    progreso.detalle(f"⚠️  Ya existe: {nombre_base}{extension} (omitiendo)")
+                    progreso.avanzar()
+                    continue
+                yield (entrada.path, salida_convertida, opciones_png, formato, opciones)
+    # Lectura, conversión y escritura solapadas; la conversión se reparte entre
+    # procesos y los resultados llegan en el orden del recorrido (salida determinista),
+    # salvo con plan, donde llegan según terminan
+    if trabajadores > 1:
+        ejecutor = ProcessPoolExecutor(
+            max_workers=trabajadores, initializer=_inicializar_trabajador
+        )
+    else:
+        ejecutor = ThreadPoolExecutor(max_workers=1)
+    plan = None
+    if planificar:
+        # Todo el recorrido y las cabeceras primero; luego de la foto más cara a la más barata
+        plan = planificar_tareas(buscar_tareas(), lambda tarea: tarea[0], max(lecturas, 8))
+        progreso.planificar(plan.costos)
+        tareas = plan.tareas
+    elif reparto is not None:
+        tareas = reparto.tareas(buscar_tareas())
+    else:
+        # Las tareas se generan mientras se recorre: la conversión empieza de inmediato
+        tareas = buscar_tareas()
+    resultados = procesar_en_pipeline(
+        tareas,
+        # Con manifiesto la lectura también calcula el hash de lo que se procesa
+        leer=lambda tarea: leer_bytes(tarea[0]) if manifiesto is None else manifiesto.leer_origen(tarea[0]),
+        transformar=convertir_bytes_heic,
+        escribir=lambda tarea, salida: escribir_png(tarea, salida, sincronizacion),
+        ejecutor_cpu=ejecutor,
+        hilos_lectura=lecturas,
+        hilos_escritura=escrituras,
+        max_en_vuelo=max(trabajadores * 2 + 4, lecturas + trabajadores),
+        con_tiempos=True,
+        costo=lambda tarea, datos: pixeles_en_cabecera(datos),
+        presupuesto=presupuesto_pixeles(memoria_mb, "convertir_a_png") if memoria_mb else None,
+        # Con plan el orden ya no es el del recorrido: cada resultado sale en cuanto termina
+        en_orden=not planificar,
+    )
+    try:
+        for (ruta_completa, salida_convertida, *_), tiempos_conversion, error, tiempos in resultados:
+            archivo = os.path.basename(ruta_completa)
+            metricas.registrar(ruta_completa, dict(tiempos, **(tiempos_conversion or {})))
+            if manifiesto is not None:
+                estado, hash_origen = manifiesto.tomar_lectura(ruta_completa)
+            if error is None:
                 contador_convertidos += 1
-                print(f"✅ Convertido: {archivo} → {nombre_base}.png")
-            except Exception as e:
+                if manifiesto is not None:
+                    manifiesto.registrar(ruta_completa, salida_convertida, parametros, hash_origen, estado)
+                progreso.detalle(f"✅ Convertido: {archivo} → {os.path.basename(salida_convertida)}")
+                if retiro is not None:
+                    retiro.retirar(ruta_completa, [salida_convertida])
+            else:
                 contador_errores += 1
-                error_msg = f"❌ Error con {archivo}: {str(e)}"
-                print(error_msg)
+                error_msg = f"❌ Error con {archivo}: {error}"
+                progreso.detalle(error_msg)
                 errores_detallados.append(error_msg)
+            if reparto is not None:
+                reparto.procesado()
+            progreso.avanzar(costo=plan.costo_de(ruta_completa) if plan is not None else 0.0)
+    finally:
+        progreso.terminar()
+        resultados.close()
+        ejecutor.shutdown(cancel_futures=True)
+        if retiro is not None:
+            retiro.vaciar()
+        if reparto is not None:
+            reparto.cerrar()
+            for carpeta in reparto.carpetas_con_error:
+                contador_errores += 1
+                errores_detallados.append(f"❌ Carpeta abandonada en el reparto tras {MAX_INTENTOS} intentos: {carpeta}")
+        if manifiesto is not None:
+            manifiesto.cerrar()
+        metricas.cerrar()
     # Mostrar resumen final
     print("\n" + "=" * 60)
     print("📊 RESUMEN DE CONVERSIÓN")
@@ -124,63 +384,208 @@ def convertir_heic_a_png(ruta_base):
     print(f"✅ Imágenes convertidas exitosamente: {contador_convertidos}")
     print(f"❌ Errores encontrados: {contador_errores}")
     print(f"📁 Carpeta procesada: {ruta_base}")
+    if retiro is not None:
+        retiro.imprimir_resumen()
+    if reparto is not None:
+        print(f"🖧  Nodo {reparto.nodo}: {reparto.lotes_tomados} carpetas de la ronda '{reparto.ronda}'")
+    if plan is not None:
+        plan.imprimir_resumen()
+    if contador_convertidos > 0:
+        metricas.imprimir_resumen()
     if errores_detallados:
         print("\n📋 DETALLES DE ERRORES:")
         for error in errores_detallados:
             print(f"   {error}")
     if contador_convertidos > 0:
         print(f"\n🎉 ¡Proceso completado exitosamente!")
-        # Preguntar si eliminar archivos HEIC originales
-        eliminar = (
-            input("\n¿Deseas eliminar los archivos HEIC originales? (s/n): ")
-            .strip()
-            .lower()
-        )
-        if eliminar in ["s", "sí", "si", "SI", "Si", "Sí", "yes", "y", "YES", "Yes", "1"]:
-            eliminar_archivos_heic(ruta_base)
     else:
         print("\n🤷 No se encontraron archivos HEIC para convertir.")
+    return {"convertidos": contador_convertidos, "errores": contador_errores}
+
+def construir_parser():
+    """Define los argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Convierte masivamente imágenes HEIC/HEIF a PNG (incluye subcarpetas)."
+    )
+    parser.add_argument(
+        "ruta", nargs="?",
+        help="Carpeta raíz a procesar. Si se omite (y no se usa --yes) se muestra el menú."
+    )
+    parser.add_argument(
+        "-t", "--trabajadores", type=int, default=None,
+        help="Número de procesos en paralelo (por defecto: uno por núcleo)."
+    )
+    parser.add_argument(
+        "--png-perfil", choices=sorted(PERFILES_PNG), default="equilibrado",
+        help="Perfil del codificador PNG: 'rapido' (archivo rápido), 'equilibrado' o 'pequeno' (menor tamaño)."
+    )
+    parser.add_argument(
+        "--png-nivel", type=int, choices=range(0, 10), default=None, metavar="0-9",
+        help="Nivel de compresión zlib (sustituye al del perfil)."
+    )
+    parser.add_argument(
+        "--png-estrategia", choices=sorted(ESTRATEGIAS_ZLIB), default=None,
+        help="Estrategia de compresión zlib (sustituye a la del perfil)."
+    )
+    parser.add_argument(
+        "--png-optimizar", action="store_true", default=None,
+        help="Buscar la compresión más pequeña (mucho más lento)."
+    )
+    parser.add_argument(
+        "--png-motor", choices=["pillow", "opencv"], default="pillow",
+        help="Codificador PNG; 'opencv' requiere opencv-python."
+    )
+    parser.add_argument(
+        "--formato", choices=sorted(FORMATOS_SALIDA), default="png",
+        help="Formato de salida: 'webp' (sin pérdida) suele ser más pequeño que PNG; 'intermedio' es el más rápido."
+    )
+    parser.add_argument(
+        "--calidad", type=int, choices=range(0, 101), default=None, metavar="0-100",
+        help="Calidad del codificador en webp_perdida, avif y jpeg (en webp sin pérdida, el esfuerzo)."
+    )
+    parser.add_argument(
+        "--eliminar-originales", choices=["si", "no", "preguntar"], default=None,
+        help="Eliminar cada HEIC en cuanto su conversión está escrita y verificada (por defecto: 'no' sin menú, 'preguntar' con menú)."
+    )
+    parser.add_argument(
+        "--papelera", metavar="CARPETA", default=None,
+        help="Con --eliminar-originales, mueve los originales a esta carpeta (fuera de RUTA) en lugar de borrarlos."
+    )
+    parser.add_argument(
+        "--manifiesto", action="store_true",
+        help="Usa el manifiesto de la carpeta para convertir solo archivos nuevos o modificados."
+    )
+    parser.add_argument(
+        "--metricas", metavar="ARCHIVO", default=None,
+        help="Exporta los tiempos por etapa: ARCHIVO.prom para Prometheus, otro nombre para líneas JSON."
+    )
+    parser.add_argument(
+        "--memoria-mb", type=int, default=None,
+        help="Memoria aproximada para imágenes en curso; limita cuántas fotos grandes se procesan a la vez."
+    )
+    parser.add_argument(
+        "--lecturas", type=int, default=4,
+        help="Archivos que se leen por adelantado a la vez; súbelo (16-64) en carpetas de red con mucha latencia."
+    )
+    parser.add_argument(
+        "--escrituras", type=int, default=2,
+        help="Salidas que se escriben a la vez; súbelo en carpetas de red con mucha latencia."
+    )
+    parser.add_argument(
+        "--sincronizar", action="store_true",
+        help="Confirma cada salida en disco (fsync) antes de darla por hecha; los fsync de carpeta se agrupan."
+    )
+    parser.add_argument(
+        "--reparto", metavar="RONDA", default=None,
+        help="Reparte el árbol entre varias máquinas: las que usan la misma RONDA sobre la misma carpeta se dividen las carpetas."
+    )
+    parser.add_argument(
+        "--nodo", default=None,
+        help="Nombre de esta máquina en el reparto (por defecto: nombre del equipo y número de proceso)."
+    )
+    parser.add_argument(
+        "--vencimiento", type=int, default=VENCIMIENTO_REPARTO, metavar="SEGUNDOS",
+        help="Segundos sin noticias tras los que las carpetas de una máquina caída pasan a otra."
+    )
+    parser.add_argument(
+        "--planificar", action="store_true",
+        help="Lee antes todas las cabeceras y convierte primero las fotos más grandes (tiempo restante más fiable)."
+    )
+    parser.add_argument(
+        "--consola", choices=MODOS_CONSOLA, default="barra",
+        help="Salida por archivo: 'barra' (progreso y tiempo restante), 'detalle' (una línea por archivo) o 'silencio'."
+    )
+    parser.add_argument(
+        "-q", "--silencioso", dest="consola", action="store_const", const="silencio",
+        help="Igual que --consola silencio: sin barra ni líneas por archivo, solo el resumen."
+    )
+    parser.add_argument(
+        "-y", "--yes", action="store_true",
+        help="No preguntar nada: usa la carpeta por defecto si no hay ruta y la crea si no existe."
+    )
+    return parser
 
-def eliminar_archivos_heic(ruta_base):
-    """Elimina todos los archivos HEIC después de la conversión"""
-    contador_eliminados = 0
-    print(f"\n🗑️  Eliminando archivos HEIC originales...")
-    for carpeta_actual, subcarpetas, archivos in os.walk(ruta_base):
-        for archivo in archivos:
-            if archivo.lower().endswith((".heic", ".heif")):
-                ruta_completa = os.path.join(carpeta_actual, archivo)
-                try:
-                    os.remove(ruta_completa)
-                    contador_eliminados += 1
-                    print(f"🗑️  Eliminado: {archivo}")
-                except Exception as e:
-                    print(f"❌ Error al eliminar {archivo}: {e}")
-    print(f"\n✅ Archivos HEIC eliminados: {contador_eliminados}")
-
-def main():
-    """Función principal"""
+def main(argv=None):
+    """Función principal; devuelve el código de salida"""
+    args = construir_parser().parse_args(argv)
+    # Sin ruta ni --yes se mantiene el comportamiento interactivo de siempre
+    interactivo = args.ruta is None and not args.yes
+    if args.trabajadores is not None and args.trabajadores < 1:
+        print("❌ --trabajadores debe ser 1 o mayor")
+        return 2
+    if args.memoria_mb is not None and args.memoria_mb < 1:
+        print("❌ --memoria-mb debe ser 1 o mayor")
+        return 2
+    if args.lecturas < 1 or args.escrituras < 1:
+        print("❌ --lecturas y --escrituras deben ser 1 o mayor")
+        return 2
+    if args.vencimiento < 10:
+        print("❌ --vencimiento debe ser de al menos 10 segundos")
+        return 2
+    if args.planificar and args.reparto:
+        # Cada nodo solo conoce sus carpetas, y el reparto cuenta las tareas en el orden del recorrido
+        print("❌ --planificar no se puede combinar con --reparto")
+        return 2
+    error_formato = comprobar_formato(args.formato)
+    if error_formato:
+        print(f"❌ {error_formato}")
+        return 2
     print("🖼️  CONVERTIDOR HEIC A PNG")
     print("=" * 40)
+    codigo_salida = 0
     # Verificar dependencias
     if not verificar_dependencias():
-        input("\nPresiona Enter para salir...")
-        return
+        if interactivo:
+            input("\nPresiona Enter para salir...")
+        return 1
     try:
         # Obtener ruta base
-        ruta_base = obtener_ruta_base()
+        if interactivo:
+            ruta_base = obtener_ruta_base()
+        else:
+            ruta_base = args.ruta or RUTA_POR_DEFECTO
+            if args.yes and not os.path.exists(ruta_base):
+                os.makedirs(ruta_base, exist_ok=True)
+                print(f"✅ Carpeta creada: {ruta_base}")
         # Verificar que la ruta existe
         if not os.path.exists(ruta_base):
             print(f"❌ La ruta especificada no existe: {ruta_base}")
-            return
+            return 1
+        error_papelera = comprobar_papelera(ruta_base, args.papelera) if args.papelera else None
+        if error_papelera:
+            print(f"❌ {error_papelera}")
+            return 2
+        reparto = None
+        if args.reparto:
+            reparto = Reparto(ruta_base, "convertir_a_png", args.reparto, args.nodo, args.vencimiento)
+        # Política de borrado de originales
+        politica = args.eliminar_originales or ("preguntar" if interactivo else "no")
+        eliminar_originales = None if politica == "preguntar" else politica == "si"
         # Iniciar conversión
-        convertir_heic_a_png(ruta_base)
+        opciones_png = preparar_opciones_png(
+            args.png_perfil, args.png_nivel, args.png_estrategia, args.png_optimizar, args.png_motor
+        )
+        resumen = convertir_heic_a_png(
+            ruta_base, trabajadores=args.trabajadores, eliminar_originales=eliminar_originales,
+            usar_manifiesto=args.manifiesto, opciones_png=opciones_png, ruta_metricas=args.metricas,
+            consola=args.consola, memoria_mb=args.memoria_mb, formato=args.formato,
+            calidad=args.calidad, lecturas=args.lecturas, escrituras=args.escrituras,
+            sincronizar=args.sincronizar, papelera=args.papelera, reparto=reparto,
+            planificar=args.planificar
+        )
+        if resumen["errores"]:
+            codigo_salida = 1
     except KeyboardInterrupt:
         print("\n\n⚠️  Proceso cancelado por el usuario.")
+        codigo_salida = 130
     except Exception as e:
         print(f"\n❌ Error inesperado: {e}")
+        codigo_salida = 1
     finally:
-        input("\nPresiona Enter para salir...")
+        if interactivo:
+            input("\nPresiona Enter para salir...")
+    return codigo_salida
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# Decodificadores de imagen - Formatos soportados y detección por contenido
+# Julio 2025 - Compartido por convertir_a_png.py, Cambiar_dimenciones.py y quitar_fondo_lento.py
+#
+# Registra una sola vez los decodificadores opcionales (HEIC/HEIF y AVIF con
+# pillow-heif, si está instalado) y reconoce el formato de cada archivo por sus
+# primeros bytes ("número mágico"), no por la extensión: un .jpg exportado desde
+# un iPhone que en realidad es HEIC se abre igual, y un formato no soportado da un
+# error claro en lugar del "cannot identify image file" de Pillow.
+#
+# Así el redimensionador y el eliminador de fondos leen los HEIC directamente,
+# sin tener que convertirlos antes a PNG con convertir_a_png.py.
+
+import io
+import os
+
+from PIL import Image
+
+from escaner import existe
+
+# Extensiones que los recorridos consideran imágenes
+EXTENSIONES_IMAGEN = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.tif', '.webp',
+                      '.heic', '.heif', '.avif'}
+
+# Formatos que Pillow no puede volver a codificar: sus salidas se guardan en PNG
+EXTENSION_SALIDA = {'.heic': '.png', '.heif': '.png', '.avif': '.png'}
+
+# Extensiones que puede tener la versión convertida de un HEIC (convertir_a_png.py --formato)
+EXTENSIONES_CONVERTIDAS = ('.png', '.webp', '.avif', '.jpg', '.tif')
+
+# Marcas ("brands") del contenedor ISO BMFF de cada formato
+_MARCAS_HEIF = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1"}
+_MARCAS_AVIF = {b"avif", b"avis"}
+
+# Bytes necesarios para reconocer cualquier formato de la lista
+BYTES_CABECERA = 32
+
+_registrados = False
+
+def registrar_decodificadores():
+    """Registra en Pillow los decodificadores opcionales (una vez por proceso)"""
+    global _registrados
+    if _registrados:
+        return
+    try:
+        import pillow_heif
+    except ImportError:
+        # Sin pillow-heif los HEIC se reconocen pero no se pueden abrir
+        pillow_heif = None
+    if pillow_heif is not None:
+        pillow_heif.register_heif_opener()
+        # Pillow 11.2+ ya trae AVIF; si no, lo aporta pillow-heif (versiones anteriores a 1.0)
+        if ".avif" not in Image.registered_extensions() and hasattr(pillow_heif, "register_avif_opener"):
+            pillow_heif.register_avif_opener()
+    _registrados = True
+
+def detectar_formato(cabecera):
+    """Formato según los primeros bytes ('jpeg', 'png', 'heif', 'avif'...) o None si no se reconoce"""
+    if cabecera.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if cabecera.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return "webp"
+    if cabecera[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if cabecera[:4] in (b"II*\x00", b"MM\x00*"):
+        return "tiff"
+    if cabecera.startswith(b"BM"):
+        return "bmp"
+    if cabecera[4:8] == b"ftyp":
+        # Marca principal y, si no basta, las compatibles que caben en la cabecera
+        marcas = {cabecera[indice:indice + 4] for indice in range(8, min(len(cabecera), BYTES_CABECERA) - 3, 4)}
+        if cabecera[8:12] in _MARCAS_AVIF or (marcas & _MARCAS_AVIF and cabecera[8:12] not in _MARCAS_HEIF):
+            return "avif"
+        if marcas & _MARCAS_HEIF:
+            return "heif"
+    return None
+
+def formato_disponible(formato):
+    """Indica si Pillow puede abrir el formato con los decodificadores registrados"""
+    registrar_decodificadores()
+    extensiones = Image.registered_extensions()
+    if formato == "heif":
+        return ".heic" in extensiones
+    if formato == "avif":
+        return ".avif" in extensiones
+    return True
+
+def abrir_imagen(datos):
+    """Abre una imagen en memoria reconociendo el formato por su contenido"""
+    registrar_decodificadores()
+    formato = detectar_formato(datos[:BYTES_CABECERA])
+    if formato in ("heif", "avif") and not formato_disponible(formato):
+        raise RuntimeError(f"formato {formato.upper()} no soportado: instala pillow-heif (pip install pillow-heif)")
+    return Image.open(io.BytesIO(datos))
+
+def extension_salida(extension):
+    """Extensión con la que se guarda una salida del mismo tipo que el original"""
+    return EXTENSION_SALIDA.get(extension.lower(), extension)
+
+def tiene_convertida(nombres, archivo):
+    """Indica si un HEIC/AVIF ya tiene al lado su versión convertida (foto.heic y foto.png)
+
+    En ese caso se procesa solo la convertida: las dos darían la misma salida.
+    """
+    nombre_base, extension = os.path.splitext(archivo)
+    if extension.lower() not in EXTENSION_SALIDA:
+        return False
+    return any(existe(nombres, nombre_base + otra) for otra in EXTENSIONES_CONVERTIDAS)
@@ -0,0 +1,296 @@
+# Casi duplicadas - Huellas perceptuales para no procesar varias veces la misma foto
+# Julio 2025 - Compartido por Cambiar_dimenciones.py y quitar_fondo_lento.py
+#
+# Las ráfagas del iPhone y las re-exportaciones dejan en cada carpeta muchas fotos
+# casi iguales. Antes de procesar una carpeta se calcula una huella de 64 bits de
+# cada imagen a partir de una miniatura en grises (los JPEG se decodifican ya
+# reducidos con draft(), así que cuesta una fracción de la decodificación completa):
+#   - phash: coseno discreto (DCT) de una miniatura de 32x32; cada bit dice si una
+#     de las 64 frecuencias bajas está por encima de la mediana. Aguanta cambios de
+#     brillo, de compresión y de tamaño.
+#   - dhash: cada bit compara dos píxeles vecinos de una miniatura de 9x8. Más
+#     barato y algo menos robusto.
+# Las huellas de toda la carpeta se calculan juntas con NumPy.
+#
+# Dos fotos son casi duplicadas si sus huellas difieren en pocos bits (distancia de
+# Hamming). Los representantes se indexan por bloques de bits (IndiceMultiple), así
+# cada foto solo se compara con las que comparten algún bloque y no con todas (con
+# huellas de 64 bits un árbol BK apenas descarta ramas).
+# Cada foto se une al grupo del representante más cercano; si no hay ninguno a la
+# distancia indicada, pasa a ser representante de un grupo nuevo (la primera por nombre).
+#
+# Los grupos se forman dentro de cada carpeta: así el resultado no depende del orden
+# del recorrido, ni de qué nodo procesa cada carpeta (ver reparto.py), ni de qué
+# fotos ya se procesaron en ejecuciones anteriores.
+#
+# Con la carpeta raíz, las huellas se guardan en HuellasGuardadas (un SQLite junto al
+# manifiesto) por ruta, tamaño y fecha: las casi duplicadas omitidas no tienen salida
+# y su carpeta se vuelve a agrupar en cada ejecución, pero sin decodificar nada.
+
+import os
+import json
+import time
+import sqlite3
+from functools import partial
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:
+    # Sin NumPy el redimensionador funciona igual, pero sin --duplicados
+    np = None
+
+from decodificadores import registrar_decodificadores
+
+# Qué hacer con las casi duplicadas: solo informar, o procesar solo el representante
+MODOS = ("informe", "representante")
+
+# Métodos de huella y tamaño de la miniatura que usa cada uno (ancho, alto)
+MINIATURAS = {"phash": (32, 32), "dhash": (9, 8)}
+
+# Bits distintos (de 64) hasta los que dos fotos se consideran casi duplicadas
+DISTANCIA_POR_DEFECTO = 6
+
+# Grupos más grandes que se listan en el resumen
+GRUPOS_EN_RESUMEN = 5
+
+# Nombre del archivo de huellas ya calculadas dentro de la carpeta raíz
+NOMBRE_HUELLAS = ".huellas_duplicados.sqlite"
+
+def _matriz_dct(lado):
+    """Matriz de la DCT-II ortonormal de tamaño lado x lado"""
+    frecuencias = np.arange(lado)[:, None]
+    posiciones = np.arange(lado)[None, :]
+    matriz = np.cos(np.pi * (2 * posiciones + 1) * frecuencias / (2 * lado)) * np.sqrt(2 / lado)
+    matriz[0] /= np.sqrt(2)
+    return matriz.astype(np.float32)
+
+_DCT = _matriz_dct(MINIATURAS["phash"][0]) if np is not None else None
+
+def _bits_a_enteros(bits):
+    """Convierte una matriz (N, 64) de booleanos en N huellas enteras de 64 bits"""
+    return [int(huella) for huella in np.packbits(bits, axis=1).view(">u8")[:, 0]]
+
+def huellas_phash(miniaturas):
+    """pHash de un lote de miniaturas en grises de 32x32 (matriz N x 32 x 32)"""
+    # DCT en 2D de todas las miniaturas a la vez: D · M · Dᵀ
+    coeficientes = _DCT @ miniaturas.astype(np.float32) @ _DCT.T
+    bajas = coeficientes[:, :8, :8].reshape(len(miniaturas), 64)
+    # La componente continua (brillo medio) no entra en la mediana
+    mediana = np.median(bajas[:, 1:], axis=1, keepdims=True)
+    return _bits_a_enteros(bajas > mediana)
+
+def huellas_dhash(miniaturas):
+    """dHash de un lote de miniaturas en grises de 9x8 (matriz N x 8 x 9)"""
+    bits = miniaturas[:, :, 1:] > miniaturas[:, :, :-1]
+    return _bits_a_enteros(bits.reshape(len(miniaturas), 64))
+
+HUELLAS = {"phash": huellas_phash, "dhash": huellas_dhash}
+
+def comprobar_duplicados():
+    """Devuelve un mensaje de error si no se pueden calcular huellas, o None"""
+    if np is None:
+        return "--duplicados necesita NumPy: instálalo con pip install numpy"
+    return None
+
+def distancia_hamming(huella_a, huella_b):
+    """Número de bits distintos entre dos huellas"""
+    return bin(huella_a ^ huella_b).count("1")
+
+def miniatura_gris(ruta, tamano):
+    """Bytes de una miniatura en grises de 'tamano' o None si no se puede abrir
+
+    Se ejecuta en los trabajadores (hilos o procesos): solo devuelve unos pocos bytes.
+    """
+    registrar_decodificadores()
+    try:
+        with Image.open(ruta) as img:
+            # Solo JPEG: decodifica a 1/2, 1/4 u 1/8 con el escalado DCT
+            img.draft("L", (tamano[0] * 4, tamano[1] * 4))
+            gris = img.convert("L")
+        return gris.resize(tamano, Image.Resampling.BOX, reducing_gap=2.0).tobytes()
+    except Exception:
+        # Una imagen dañada no se agrupa; su error aparece luego al procesarla
+        return None
+
+class IndiceMultiple:
+    """Índice de huellas por bloques para buscar por distancia de Hamming sin comparar con todas
+
+    Con 'distancia' + 1 bloques, dos huellas a esa distancia o menos coinciden por
+    completo en al menos un bloque (no pueden repartir los bits distintos entre
+    todos): solo se comparan las huellas que comparten algún bloque.
+    """
+
+    def __init__(self, distancia, bits=64):
+        bloques = distancia + 1
+        limites = [bits * numero // bloques for numero in range(bloques + 1)]
+        # (desplazamiento, máscara) de cada bloque
+        self._bloques = [(inicio, (1 << (fin - inicio)) - 1) for inicio, fin in zip(limites, limites[1:])]
+        self._tablas = [{} for _ in self._bloques]
+        self.elementos = 0
+
+    def anadir(self, huella, valor):
+        """Añade una huella con su valor asociado"""
+        entrada = (self.elementos, huella, valor)
+        self.elementos += 1
+        for (desplazamiento, mascara), tabla in zip(self._bloques, self._tablas):
+            tabla.setdefault((huella >> desplazamiento) & mascara, []).append(entrada)
+
+    def buscar(self, huella, radio):
+        """Devuelve [(distancia, valor), ...] de las huellas a 'radio' bits o menos"""
+        encontrados = []
+        vistas = set()
+        for (desplazamiento, mascara), tabla in zip(self._bloques, self._tablas):
+            for numero, otra, valor in tabla.get((huella >> desplazamiento) & mascara, ()):
+                if numero in vistas:
+                    continue
+                vistas.add(numero)
+                distancia = distancia_hamming(huella, otra)
+                if distancia <= radio:
+                    encontrados.append((distancia, valor))
+        return encontrados
+
+class HuellasGuardadas:
+    """Huellas ya calculadas por ruta y método, válidas mientras no cambien tamaño y fecha"""
+
+    def __init__(self, ruta_base, compartido=False):
+        """compartido: varios nodos lo usan a la vez sobre una carpeta de red (ver reparto.py)"""
+        self.ruta_base = os.path.abspath(ruta_base)
+        self._conexion = sqlite3.connect(os.path.join(self.ruta_base, NOMBRE_HUELLAS),
+                                         timeout=60 if compartido else 5, check_same_thread=False)
+        # WAL necesita memoria compartida: no sirve entre máquinas sobre una carpeta de red
+        self._conexion.execute("PRAGMA journal_mode=DELETE" if compartido else "PRAGMA journal_mode=WAL")
+        self._conexion.execute(
+            """CREATE TABLE IF NOT EXISTS huellas (
+                origen TEXT NOT NULL,
+                metodo TEXT NOT NULL,
+                tamano INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                huella TEXT NOT NULL,
+                PRIMARY KEY (origen, metodo)
+            )"""
+        )
+        self._conexion.commit()
+
+    def _relativa(self, ruta):
+        """Ruta guardada: relativa a la carpeta raíz y con '/'"""
+        return os.path.relpath(os.path.abspath(ruta), self.ruta_base).replace(os.sep, "/")
+
+    def buscar(self, rutas, metodo):
+        """Devuelve ({ruta: huella} de las que siguen valiendo, {ruta: os.stat_result} de todas)"""
+        encontradas, estados = {}, {}
+        for ruta in rutas:
+            try:
+                estados[ruta] = estado = os.stat(ruta)
+            except OSError:
+                continue
+            fila = self._conexion.execute(
+                "SELECT tamano, mtime_ns, huella FROM huellas WHERE origen = ? AND metodo = ?",
+                (self._relativa(ruta), metodo),
+            ).fetchone()
+            if fila is not None and fila[0] == estado.st_size and fila[1] == estado.st_mtime_ns:
+                # En hexadecimal: SQLite no guarda enteros de 64 bits sin signo
+                encontradas[ruta] = int(fila[2], 16)
+        return encontradas, estados
+
+    def guardar(self, huellas, estados, metodo):
+        """Guarda {ruta: huella} con el tamaño y la fecha de 'estados'"""
+        filas = [(self._relativa(ruta), metodo, estados[ruta].st_size, estados[ruta].st_mtime_ns, f"{huella:016x}")
+                 for ruta, huella in huellas.items() if ruta in estados]
+        if filas:
+            with self._conexion:
+                self._conexion.executemany("INSERT OR REPLACE INTO huellas VALUES (?, ?, ?, ?, ?)", filas)
+
+    def cerrar(self):
+        """Cierra la base de datos"""
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+
+class Duplicados:
+    """Agrupa las casi duplicadas de cada carpeta y lleva el informe de la ejecución"""
+
+    def __init__(self, modo="informe", distancia=DISTANCIA_POR_DEFECTO, metodo="phash", ruta_base=None,
+                 compartido=False):
+        """ruta_base: si se indica, las huellas se guardan allí para las siguientes ejecuciones"""
+        self.modo = modo
+        self.distancia = distancia
+        self.metodo = metodo
+        self.imagenes = 0
+        self.reutilizadas = 0
+        self.segundos = 0.0
+        self._guardadas = HuellasGuardadas(ruta_base, compartido) if ruta_base is not None else None
+        # Representante → casi duplicadas, solo de los grupos con más de una foto
+        self.grupos = {}
+
+    @property
+    def solo_representantes(self):
+        """Indica si las casi duplicadas se omiten (solo se procesa el representante)"""
+        return self.modo == "representante"
+
+    def agrupar(self, rutas, ejecutor=None):
+        """Agrupa las imágenes de una carpeta; devuelve {casi duplicada: representante}
+
+        rutas: imágenes de la carpeta, en orden (la primera de cada grupo lo representa).
+        ejecutor: hilos o procesos donde decodificar las miniaturas (si no, aquí mismo).
+        """
+        inicio = time.perf_counter()
+        huellas, estados = {}, {}
+        if self._guardadas is not None:
+            huellas, estados = self._guardadas.buscar(rutas, self.metodo)
+        faltan = [ruta for ruta in rutas if ruta not in huellas]
+        tamano = MINIATURAS[self.metodo]
+        leer = partial(miniatura_gris, tamano=tamano)
+        miniaturas = list(ejecutor.map(leer, faltan, chunksize=8) if ejecutor is not None else map(leer, faltan))
+        validas = [(ruta, datos) for ruta, datos in zip(faltan, miniaturas) if datos is not None]
+        if validas:
+            matriz = np.frombuffer(b"".join(datos for _, datos in validas), dtype=np.uint8)
+            nuevas = dict(zip((ruta for ruta, _ in validas),
+                              HUELLAS[self.metodo](matriz.reshape(len(validas), tamano[1], tamano[0]))))
+            if self._guardadas is not None:
+                self._guardadas.guardar(nuevas, estados, self.metodo)
+            huellas.update(nuevas)
+        copias = {}
+        if huellas:
+            indice = IndiceMultiple(self.distancia)
+            # En el orden de la carpeta: el primero de cada grupo lo representa
+            for ruta, huella in ((ruta, huellas[ruta]) for ruta in rutas if ruta in huellas):
+                cercanos = indice.buscar(huella, self.distancia)
+                if cercanos:
+                    # El representante más cercano (y, a igual distancia, el primero)
+                    _, (orden, representante) = min(cercanos)
+                    copias[ruta] = representante
+                    self.grupos.setdefault(representante, []).append(ruta)
+                else:
+                    indice.anadir(huella, (indice.elementos, ruta))
+        self.imagenes += len(faltan)
+        self.reutilizadas += len(rutas) - len(faltan)
+        self.segundos += time.perf_counter() - inicio
+        return copias
+
+    def cerrar(self):
+        """Cierra las huellas guardadas, si las hay"""
+        if self._guardadas is not None:
+            self._guardadas.cerrar()
+
+    def guardar_informe(self, ruta_informe, ruta_base):
+        """Escribe los grupos en JSON, con rutas relativas a la carpeta raíz"""
+        def relativa(ruta):
+            return os.path.relpath(ruta, ruta_base).replace(os.sep, "/")
+        grupos = [{"representante": relativa(representante), "casi_duplicadas": [relativa(ruta) for ruta in copias]}
+                  for representante, copias in self.grupos.items()]
+        with open(ruta_informe, "w", encoding="utf-8") as archivo:
+            json.dump({"metodo": self.metodo, "distancia": self.distancia, "grupos": grupos},
+                      archivo, ensure_ascii=False, indent=2)
+
+    def imprimir_resumen(self, ruta_base):
+        """Muestra cuántas casi duplicadas hubo y los grupos más grandes"""
+        copias = sum(len(miembros) for miembros in self.grupos.values())
+        accion = "omitidas" if self.solo_representantes else "procesadas igualmente"
+        print(f"🔁 Casi duplicadas: {copias} en {len(self.grupos)} grupos ({accion}; "
+              f"{self.imagenes} huellas {self.metodo} en {self.segundos:.1f} s"
+              f"{f', {self.reutilizadas} guardadas' if self.reutilizadas else ''})")
+        mayores = sorted(self.grupos.items(), key=lambda grupo: -len(grupo[1]))[:GRUPOS_EN_RESUMEN]
+        for representante, miembros in mayores:
+            print(f"   {os.path.relpath(representante, ruta_base)} + {len(miembros)} parecidas")
@@ -0,0 +1,61 @@
+# Escáner de carpetas rápido - Reemplazo de os.walk + os.path.exists por archivo
+# Julio 2025 - Compartido por convertir_a_png.py, Cambiar_dimenciones.py y quitar_fondo_lento.py
+#
+# Lee las carpetas con os.scandir en varios hilos a la vez (en carpetas de red
+# cada listado tarda, y así se solapan), pero entrega las carpetas siempre en el
+# mismo orden (recorrido en profundidad, por nombre), igual en cada ejecución.
+# Cada carpeta se entrega en cuanto se ha leído, sin esperar a todo el árbol.
+#
+# Junto con los archivos se entrega el conjunto de nombres de la carpeta, para
+# saber si una salida ya existe sin preguntarle al disco archivo por archivo.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Hilos que leen carpetas a la vez
+HILOS_POR_DEFECTO = 8
+
+def _leer_carpeta(carpeta):
+    """Lista una carpeta: (carpeta, archivos como DirEntry, subcarpetas), ordenados por nombre"""
+    archivos = []
+    subcarpetas = []
+    try:
+        with os.scandir(carpeta) as entradas:
+            for entrada in entradas:
+                try:
+                    # DirEntry ya trae el tipo del listado: no hace falta un stat
+                    if entrada.is_dir(follow_symlinks=False):
+                        subcarpetas.append(entrada.path)
+                    else:
+                        archivos.append(entrada)
+                except OSError:
+                    continue
+    except OSError:
+        # Igual que os.walk: una carpeta ilegible se omite sin detener el recorrido
+        pass
+    archivos.sort(key=lambda entrada: entrada.name)
+    subcarpetas.sort()
+    return carpeta, archivos, subcarpetas
+
+def existe(nombres, nombre):
+    """Indica si 'nombre' está en la carpeta, con las mayúsculas/minúsculas del sistema"""
+    return os.path.normcase(nombre) in nombres
+
+def recorrer_carpetas(ruta_base, hilos=HILOS_POR_DEFECTO):
+    """Recorre el árbol y entrega (carpeta, archivos DirEntry, nombres existentes) por carpeta
+
+    Las subcarpetas se empiezan a leer en segundo plano en cuanto se conoce su
+    carpeta madre, mientras el llamador procesa la carpeta actual.
+    Los nombres existentes van normalizados con os.path.normcase (usar existe()).
+    """
+    ejecutor = ThreadPoolExecutor(max_workers=hilos)
+    try:
+        pila = [ejecutor.submit(_leer_carpeta, ruta_base)]
+        while pila:
+            carpeta, archivos, subcarpetas = pila.pop().result()
+            futuros = [ejecutor.submit(_leer_carpeta, subcarpeta) for subcarpeta in subcarpetas]
+            # Al revés en la pila para visitar las subcarpetas en orden alfabético
+            pila.extend(reversed(futuros))
+            yield carpeta, archivos, {os.path.normcase(entrada.name) for entrada in archivos}
+    finally:
+        ejecutor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,552 @@
+# Flujo completo - Convertir, redimensionar y quitar el fondo en una sola pasada
+# Julio 2025
+#
+# El flujo de siempre encadena los tres scripts (HEIC → PNG, redimensionar al 30%
+# y quitar el fondo): cada uno recorre otra vez todo el árbol, vuelve a decodificar
+# y escribe un archivo intermedio completo. Este script hace las tres etapas en
+# memoria sobre una sola decodificación de cada foto y escribe solo las salidas
+# finales (y los intermedios que se pidan).
+#
+# INSTRUCCIONES DE INSTALACIÓN:
+#    >>> pip install pillow pillow-heif
+#    >>> pip install rembg onnxruntime        (solo si el trabajo quita el fondo)
+#
+# USO (sin menús, pensado para cron / tareas programadas):
+#    >>> python flujo_completo.py RUTA [--trabajo TRABAJO.json] [--trabajadores N]
+#                                 [--manifiesto] [--metricas ARCHIVO.jsonl|ARCHIVO.prom]
+#                                 [--consola barra|detalle|silencio] [-q] [--memoria-mb MB]
+#                                 [--lecturas K] [--escrituras N] [--sincronizar]
+#    Código de salida: 0 si todo fue bien, 1 si hubo errores, 2 si el trabajo no es válido,
+#    130 si se canceló.
+#
+# TRABAJO (JSON). Una sección ausente o null desactiva esa etapa; sin --trabajo
+# se usa TRABAJO_POR_DEFECTO (el flujo de siempre):
+#    {
+#      "convertir": {"guardar": false, "perfil_png": "equilibrado", "formato": "png"},
+#      "redimensionar": {"escalas": [0.3], "lados_maximos": [], "guardar": false,
+#                        "reduccion_rapida": true, "remuestreo": "calidad", "formato": null},
+#      "quitar_fondo": {"modelo": "u2net", "mascara_rapida": false, "formato": "png"}
+#    }
+#    "guardar" escribe también la salida intermedia de esa etapa. Los nombres son
+#    los mismos que al encadenar los scripts: foto.png, foto_30pcmarkett.png y
+#    foto_30pcmarkett_sin_fondo.png. "formato" (y "calidad") elige el formato de
+#    salida de cada etapa (ver formatos_salida.py); en redimensionar, null mantiene
+#    el del original. "remuestreo" elige el filtro de reducción (ver remuestreo.py).
+
+import io
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from PIL import Image, ImageOps
+from manifiesto import Manifiesto
+from pipeline import procesar_en_pipeline, leer_bytes, escribir_bytes, SincronizacionEnGrupo
+from escaner import recorrer_carpetas, existe
+from metricas import Metricas, cronometrar
+from progreso import Progreso, MODOS as MODOS_CONSOLA
+from memoria import pixeles_en_cabecera, presupuesto_pixeles
+from decodificadores import (EXTENSIONES_IMAGEN, abrir_imagen, extension_salida,
+                             registrar_decodificadores)
+from convertir_a_png import PERFILES_PNG, preparar_opciones_png, codificar_png
+from formatos_salida import FORMATOS_SALIDA, comprobar_formato, opciones_formato, codificar
+from Cambiar_dimenciones import (MARGEN_REDUCCION, preparar_variantes, tamano_variante,
+                                 redimensionar_variante)
+from remuestreo import POLITICAS as POLITICAS_REMUESTREO, elegir_remuestreador
+
+# Trabajo usado sin --trabajo: HEIC → 30% → sin fondo, guardando solo el resultado final
+TRABAJO_POR_DEFECTO = {
+    "convertir": {"guardar": False},
+    "redimensionar": {"escalas": [0.3]},
+    "quitar_fondo": {"modelo": "u2net"},
+}
+
+# Valores por defecto de cada sección cuando el trabajo no los indica
+OPCIONES_ETAPAS = {
+    "convertir": {"guardar": False, "perfil_png": "equilibrado", "formato": "png", "calidad": None},
+    "redimensionar": {"escalas": [], "lados_maximos": [], "guardar": False, "reduccion_rapida": True,
+                      "remuestreo": "calidad", "formato": None, "calidad": None},
+    "quitar_fondo": {"modelo": "u2net", "mascara_rapida": False, "formato": "png", "calidad": None},
+}
+
+# Extensiones que convertir_a_png.py convierte a PNG
+EXTENSIONES_CONVERTIR = ('.heic', '.heif')
+
+def cargar_trabajo(ruta_trabajo=None):
+    """Lee el trabajo (JSON), completa los valores por defecto y lo valida
+
+    Devuelve un diccionario con las tres secciones; las etapas desactivadas quedan en None.
+    Lanza ValueError si el trabajo no es válido.
+    """
+    if ruta_trabajo is None:
+        especificacion = TRABAJO_POR_DEFECTO
+    else:
+        with open(ruta_trabajo, encoding="utf-8") as archivo:
+            especificacion = json.load(archivo)
+    if not isinstance(especificacion, dict):
+        raise ValueError("el trabajo debe ser un objeto JSON")
+    desconocidas = set(especificacion) - set(OPCIONES_ETAPAS)
+    if desconocidas:
+        raise ValueError(f"secciones desconocidas: {', '.join(sorted(desconocidas))}")
+
+    trabajo = {}
+    for etapa, opciones_por_defecto in OPCIONES_ETAPAS.items():
+        opciones = especificacion.get(etapa)
+        if opciones is None:
+            trabajo[etapa] = None
+            continue
+        desconocidas = set(opciones) - set(opciones_por_defecto)
+        if desconocidas:
+            raise ValueError(f"opciones desconocidas en '{etapa}': {', '.join(sorted(desconocidas))}")
+        trabajo[etapa] = dict(opciones_por_defecto, **opciones)
+
+    # La conversión siempre ocurre (es la decodificación); sin sección no se guarda el PNG
+    if trabajo["convertir"] is None:
+        trabajo["convertir"] = dict(OPCIONES_ETAPAS["convertir"])
+    if trabajo["convertir"]["perfil_png"] not in PERFILES_PNG:
+        raise ValueError(f"perfil_png debe ser uno de: {', '.join(PERFILES_PNG)}")
+
+    redimensionar = trabajo["redimensionar"]
+    if redimensionar is not None:
+        if not redimensionar["escalas"] and not redimensionar["lados_maximos"]:
+            raise ValueError("'redimensionar' necesita al menos una escala o un lado máximo")
+        if any(not 0.1 <= factor <= 1.0 for factor in redimensionar["escalas"]):
+            raise ValueError("las escalas deben estar entre 0.1 y 1.0")
+        if any(int(lado) < 1 for lado in redimensionar["lados_maximos"]):
+            raise ValueError("los lados máximos deben ser de al menos 1 píxel")
+        if redimensionar["remuestreo"] not in POLITICAS_REMUESTREO:
+            raise ValueError(f"remuestreo debe ser uno de: {', '.join(POLITICAS_REMUESTREO)}")
+
+    if redimensionar is None and trabajo["quitar_fondo"] is None and not trabajo["convertir"]["guardar"]:
+        raise ValueError("el trabajo no genera ninguna salida")
+
+    # Formatos de salida: existen, se pueden escribir y, sin fondo, admiten transparencia
+    for etapa in OPCIONES_ETAPAS:
+        if trabajo[etapa] is None or trabajo[etapa]["formato"] is None:
+            continue
+        if trabajo[etapa]["formato"] not in FORMATOS_SALIDA:
+            raise ValueError(f"formato de '{etapa}' debe ser uno de: {', '.join(FORMATOS_SALIDA)}")
+        error_formato = comprobar_formato(trabajo[etapa]["formato"], con_transparencia=etapa == "quitar_fondo")
+        if error_formato:
+            raise ValueError(error_formato)
+        trabajo[etapa]["opciones"] = opciones_formato(trabajo[etapa]["formato"], trabajo[etapa]["calidad"])
+    return trabajo
+
+def describir_trabajo(trabajo):
+    """Texto corto con las etapas del trabajo, p. ej. 'HEIC → 30% → sin fondo (u2net)'"""
+    etapas = ["HEIC → PNG" if trabajo["convertir"]["guardar"] else "decodificar"]
+    if trabajo["redimensionar"] is not None:
+        variantes = preparar_variantes(trabajo["redimensionar"]["escalas"],
+                                       trabajo["redimensionar"]["lados_maximos"])
+        etapas.append(", ".join(variante["texto"] for variante in variantes))
+    if trabajo["quitar_fondo"] is not None:
+        etapas.append(f"sin fondo ({trabajo['quitar_fondo']['modelo']})")
+    return " → ".join(etapas)
+
+def planificar_salidas(trabajo, variantes, carpeta, archivo):
+    """Rutas que genera una foto: (PNG convertido o None, [(variante, ruta o None, ruta sin fondo o None)],
+    ruta sin fondo de la foto completa o None)"""
+    nombre_base, extension = os.path.splitext(archivo)
+    ruta_png = None
+    if trabajo["convertir"]["guardar"] and extension.lower() in EXTENSIONES_CONVERTIR:
+        ruta_png = os.path.join(carpeta, nombre_base + FORMATOS_SALIDA[trabajo["convertir"]["formato"]].extension)
+
+    quitar_fondo = trabajo["quitar_fondo"] is not None
+    if quitar_fondo:
+        extension_sin_fondo = FORMATOS_SALIDA[trabajo["quitar_fondo"]["formato"]].extension
+    if variantes and trabajo["redimensionar"]["formato"] is not None:
+        extension_variantes = FORMATOS_SALIDA[trabajo["redimensionar"]["formato"]].extension
+    else:
+        extension_variantes = extension_salida(extension)
+    salidas_variantes = []
+    for variante in variantes:
+        nombre_variante = f"{nombre_base}_{variante['sufijo']}"
+        # La variante se guarda si se pide o si es la última etapa
+        guardar = trabajo["redimensionar"]["guardar"] or not quitar_fondo
+        salidas_variantes.append((
+            variante,
+            os.path.join(carpeta, nombre_variante + extension_variantes) if guardar else None,
+            os.path.join(carpeta, nombre_variante + "_sin_fondo" + extension_sin_fondo) if quitar_fondo else None,
+        ))
+
+    ruta_sin_fondo = None
+    if quitar_fondo and not variantes:
+        ruta_sin_fondo = os.path.join(carpeta, nombre_base + "_sin_fondo" + extension_sin_fondo)
+    return ruta_png, salidas_variantes, ruta_sin_fondo
+
+def rutas_planificadas(plan):
+    """Todas las rutas de salida de un plan, en orden"""
+    ruta_png, salidas_variantes, ruta_sin_fondo = plan
+    rutas = [ruta_png]
+    for _, ruta_variante, ruta_variante_sin_fondo in salidas_variantes:
+        rutas += [ruta_variante, ruta_variante_sin_fondo]
+    rutas.append(ruta_sin_fondo)
+    return [ruta for ruta in rutas if ruta is not None]
+
+def quitar_fondo_imagenes_pil(trabajo, imagenes, tiempos):
+    """Quita el fondo de imágenes ya decodificadas y devuelve las imágenes RGBA"""
+    # rembg solo se importa si el trabajo quita el fondo
+    from rembg import remove
+    from quitar_fondo_lento import obtener_sesion, quitar_fondo_lote, PREPROCESADO_LOTES
+
+    modelo = trabajo["quitar_fondo"]["modelo"]
+    sesion = obtener_sesion(modelo)
+    if modelo not in PREPROCESADO_LOTES:
+        # u2net_cloth_seg y otros: rembg acepta y devuelve imágenes de Pillow
+        with cronometrar(tiempos, "transformacion"):
+            return [remove(img, session=sesion) for img in imagenes]
+
+    # Todas las variantes de una foto van en una sola inferencia
+    tiempos_fondo = {}
+    resultados = quitar_fondo_lote(sesion, modelo, imagenes, tiempos_fondo,
+                                   trabajo["quitar_fondo"]["mascara_rapida"])
+    # Los píxeles ya se contaron al decodificar la foto
+    tiempos_fondo.pop("pixeles", None)
+    for etapa, segundos in tiempos_fondo.items():
+        tiempos[etapa] = tiempos.get(etapa, 0.0) + segundos
+    for resultado in resultados:
+        if isinstance(resultado, Exception):
+            raise resultado
+    return resultados
+
+def procesar_bytes(tarea, datos):
+    """Decodifica una foto una sola vez y genera todas sus salidas en memoria (etapa de CPU)
+
+    Devuelve ([(ruta de salida, bytes codificados), ...], métricas: tiempos por etapa,
+    bytes y píxeles).
+    """
+    ruta_completa, trabajo, (ruta_png, salidas_variantes, ruta_sin_fondo) = tarea
+    tiempos = {"bytes_entrada": len(datos)}
+    salidas = []
+
+    with cronometrar(tiempos, "decodificacion"):
+        img = abrir_imagen(datos)
+        ancho_original, alto_original = img.size
+        objetivos = sorted(
+            ((tamano_variante(variante, ancho_original, alto_original), ruta_variante, ruta_variante_sin_fondo)
+             for variante, ruta_variante, ruta_variante_sin_fondo in salidas_variantes),
+            key=lambda objetivo: objetivo[0][0] * objetivo[0][1], reverse=True
+        )
+        margen = None
+        if objetivos and ruta_png is None and trabajo["redimensionar"]["reduccion_rapida"]:
+            # Solo JPEG: decodificar menos píxeles, como Cambiar_dimenciones.py
+            (ancho_mayor, alto_mayor), _, _ = objetivos[0]
+            img.draft(None, (int(ancho_mayor * MARGEN_REDUCCION), int(alto_mayor * MARGEN_REDUCCION)))
+            margen = MARGEN_REDUCCION
+        img.load()
+        formato_original = img.format
+        if img.mode not in ("L", "RGB", "RGBA"):
+            img = img.convert("RGB")
+    tiempos["pixeles"] = img.width * img.height
+
+    if ruta_png is not None:
+        # Igual que convertir_a_png.py: RGB, en PNG con el perfil del trabajo u otro formato
+        convertir = trabajo["convertir"]
+        rgb = img if img.mode == "RGB" else img.convert("RGB")
+        with cronometrar(tiempos, "codificacion"):
+            if convertir["formato"] == "png":
+                salidas.append((ruta_png, codificar_png(rgb, preparar_opciones_png(convertir["perfil_png"]))))
+            else:
+                salidas.append((ruta_png, codificar(rgb, convertir["formato"], convertir["opciones"])))
+
+    # Variantes en cascada, de la más grande a la más pequeña
+    fuente = img
+    para_fondo = []
+    for tamano, ruta_variante, ruta_variante_sin_fondo in objetivos:
+        with cronometrar(tiempos, "transformacion"):
+            remuestreador = elegir_remuestreador(trabajo["redimensionar"]["remuestreo"], fuente.size, tamano,
+                                                 en_cascada=fuente is not img)
+            fuente = redimensionar_variante(fuente, tamano, margen, remuestreador)
+        if ruta_variante is not None and trabajo["redimensionar"]["formato"] is not None:
+            with cronometrar(tiempos, "codificacion"):
+                salidas.append((ruta_variante, codificar(fuente, trabajo["redimensionar"]["formato"],
+                                                         trabajo["redimensionar"]["opciones"])))
+        elif ruta_variante is not None:
+            extension = os.path.splitext(ruta_variante)[1]
+            formato = Image.registered_extensions().get(extension.lower(), formato_original)
+            codificada = io.BytesIO()
+            with cronometrar(tiempos, "codificacion"):
+                fuente.save(codificada, formato, optimize=True, quality=95)
+            salidas.append((ruta_variante, codificada.getvalue()))
+        if ruta_variante_sin_fondo is not None:
+            para_fondo.append((ruta_variante_sin_fondo, fuente))
+    if ruta_sin_fondo is not None:
+        # Como quitar_fondo_lento.py sobre la foto original, que corrige la orientación
+        # EXIF (rembg también); la conversión y las variantes no la corrigen, igual que
+        # convertir_a_png.py y Cambiar_dimenciones.py
+        para_fondo.append((ruta_sin_fondo, ImageOps.exif_transpose(img)))
+
+    if para_fondo:
+        recortadas = quitar_fondo_imagenes_pil(trabajo, [imagen for _, imagen in para_fondo], tiempos)
+        for (ruta_salida, _), recortada in zip(para_fondo, recortadas):
+            with cronometrar(tiempos, "codificacion"):
+                salidas.append((ruta_salida, codificar(recortada, trabajo["quitar_fondo"]["formato"],
+                                                       trabajo["quitar_fondo"]["opciones"])))
+
+    tiempos["bytes_salida"] = sum(len(codificada) for _, codificada in salidas)
+    return salidas, tiempos
+
+def escribir_salidas(tarea, salida, sincronizacion=None):
+    """Guarda todas las salidas de una foto y devuelve sus rutas y métricas (etapa de escritura)"""
+    salidas, tiempos = salida
+    for ruta_salida, datos in salidas:
+        escribir_bytes(ruta_salida, datos, sincronizacion)
+    return [ruta_salida for ruta_salida, _ in salidas], tiempos
+
+def ejecutar_flujo(ruta_base, trabajo, trabajadores=None, usar_manifiesto=False, ruta_metricas=None,
+                   consola="barra", memoria_mb=None, lecturas=4, escrituras=2, sincronizar=False):
+    """Recorre la carpeta una sola vez y aplica el trabajo a cada foto
+
+    trabajo: diccionario devuelto por cargar_trabajo().
+    trabajadores: procesos en paralelo (hilos si el trabajo quita el fondo, porque la
+    sesión de ONNX se comparte y ya usa todos los núcleos; por defecto 2 en ese caso
+    y uno por núcleo en los demás).
+    usar_manifiesto: decide qué procesar según el manifiesto de la carpeta (fotos
+    nuevas, modificadas o con otro trabajo) en lugar de mirar si existen las salidas.
+    ruta_metricas, consola, memoria_mb, lecturas, escrituras, sincronizar: como en los
+    demás scripts.
+    Devuelve un diccionario con los contadores del proceso.
+    """
+    contador_procesadas = 0
+    contador_errores = 0
+    contador_omitidas = 0
+    errores_detallados = []
+    metricas = Metricas("flujo_completo", ruta_metricas)
+    quitar_fondo = trabajo["quitar_fondo"] is not None
+
+    if trabajo["redimensionar"] is not None:
+        variantes = preparar_variantes(trabajo["redimensionar"]["escalas"],
+                                       trabajo["redimensionar"]["lados_maximos"])
+    else:
+        variantes = []
+    # Sin redimensionar ni quitar el fondo solo hay algo que hacer con los HEIC
+    solo_convertir = not variantes and not quitar_fondo
+    extension_convertida = FORMATOS_SALIDA[trabajo["convertir"]["formato"]].extension
+    extensiones = set(EXTENSIONES_CONVERTIR) if solo_convertir else EXTENSIONES_IMAGEN
+
+    if trabajadores is None:
+        trabajadores = 2 if quitar_fondo else os.cpu_count() or 1
+
+    # Un registro por foto; el trabajo completo forma parte de los parámetros
+    manifiesto = Manifiesto(ruta_base, "flujo_completo") if usar_manifiesto else None
+    sincronizacion = SincronizacionEnGrupo() if sincronizar else None
+    parametros = trabajo
+
+    registrar_decodificadores()
+    print(f"\n🔄 Iniciando flujo completo ({describir_trabajo(trabajo)}) en: {ruta_base}")
+    print("=" * 60)
+
+    def es_salida(nombre):
+        """Indica si el archivo es una salida de este flujo o de los scripts por separado"""
+        return "markett" in nombre or "_sin_fondo" in nombre
+
+    def es_conversion(nombre, nombres):
+        """Indica si el archivo es la conversión de un HEIC de la misma carpeta (no es una foto nueva)"""
+        nombre_base, extension = os.path.splitext(nombre)
+        return extension.lower() == extension_convertida and any(
+            existe(nombres, nombre_base + otra) for otra in EXTENSIONES_CONVERTIR)
+
+    progreso = Progreso(consola)
+
+    def buscar_tareas():
+        """Genera las fotos pendientes a medida que se recorre el árbol"""
+        nonlocal contador_omitidas
+
+        carpetas = progreso.contar(recorrer_carpetas(ruta_base), lambda nombre, nombres:
+                                   os.path.splitext(nombre.lower())[1] in extensiones and not es_salida(nombre)
+                                   and not es_conversion(nombre, nombres))
+        for carpeta_actual, archivos, nombres in metricas.escaneo(carpetas):
+            archivos_imagen = [entrada for entrada in archivos
+                if os.path.splitext(entrada.name.lower())[1] in extensiones and not es_salida(entrada.name)]
+
+            if archivos_imagen:
+                progreso.detalle(f"\n📁 Procesando carpeta: {carpeta_actual}")
+                progreso.detalle(f"   Imágenes encontradas: {len(archivos_imagen)}")
+
+            for entrada in archivos_imagen:
+                archivo = entrada.name
+
+                if es_conversion(archivo, nombres):
+                    continue
+
+                plan = planificar_salidas(trabajo, variantes, carpeta_actual, archivo)
+                rutas = rutas_planificadas(plan)
+                if not rutas:
+                    progreso.avanzar()
+                    continue
+
+                if manifiesto is not None:
+                    # Omitir solo si el manifiesto dice que no cambió
+                    if not manifiesto.necesita_proceso(entrada.path, parametros, entrada, nombres):
+                        progreso.detalle(f"⚠️  Sin cambios: {archivo} (omitiendo)")
+                        progreso.avanzar()
+                        contador_omitidas += 1
+                        continue
+
+                # Verificar si ya existen todas las salidas (sin consultar al disco)
+                elif all(existe(nombres, os.path.basename(ruta)) for ruta in rutas):
+                    progreso.detalle(f"⚠️  Ya existe: {archivo} (omitiendo)")
+                    progreso.avanzar()
+                    contador_omitidas += 1
+                    continue
+
+                yield (entrada.path, trabajo, plan)
+
+    if quitar_fondo or trabajadores == 1:
+        ejecutor = ThreadPoolExecutor(max_workers=trabajadores)
+    else:
+        # Cada proceso registra los decodificadores opcionales (HEIC/AVIF)
+        ejecutor = ProcessPoolExecutor(max_workers=trabajadores, initializer=registrar_decodificadores)
+    resultados = procesar_en_pipeline(
+        buscar_tareas(),
+        # Con manifiesto la lectura también calcula el hash de lo que se procesa
+        leer=lambda tarea: leer_bytes(tarea[0]) if manifiesto is None else manifiesto.leer_origen(tarea[0]),
+        transformar=procesar_bytes,
+        escribir=lambda tarea, salida: escribir_salidas(tarea, salida, sincronizacion),
+        ejecutor_cpu=ejecutor,
+        hilos_lectura=lecturas,
+        hilos_escritura=escrituras,
+        max_en_vuelo=max(trabajadores * 2 + 4, lecturas + trabajadores),
+        con_tiempos=True,
+        costo=lambda tarea, datos: pixeles_en_cabecera(datos),
+        presupuesto=presupuesto_pixeles(memoria_mb, "flujo_completo") if memoria_mb else None,
+    )
+    try:
+        for (ruta_completa, _, _), escritas, error, tiempos in resultados:
+            archivo = os.path.basename(ruta_completa)
+            metricas.registrar(ruta_completa, dict(tiempos, **(escritas[1] if escritas else {})))
+            if manifiesto is not None:
+                estado, hash_origen = manifiesto.tomar_lectura(ruta_completa)
+            if error is None:
+                rutas_escritas, _ = escritas
+                if manifiesto is not None:
+                    manifiesto.registrar(ruta_completa, rutas_escritas, parametros, hash_origen, estado)
+                contador_procesadas += 1
+                for ruta_salida in rutas_escritas:
+                    progreso.detalle(f"✅ {archivo} → {os.path.basename(ruta_salida)}")
+            else:
+                contador_errores += 1
+                error_msg = f"❌ Error con {archivo}: {str(error)}"
+                progreso.detalle(error_msg)
+                errores_detallados.append(error_msg)
+            progreso.avanzar()
+    finally:
+        progreso.terminar()
+        resultados.close()
+        ejecutor.shutdown(cancel_futures=True)
+        metricas.cerrar()
+
+    if manifiesto is not None:
+        manifiesto.cerrar()
+
+    # Mostrar resumen final
+    print("\n" + "=" * 60)
+    print("📊 RESUMEN DEL FLUJO COMPLETO")
+    print("=" * 60)
+    print(f"✅ Fotos procesadas exitosamente: {contador_procesadas}")
+    print(f"⚠️  Fotos omitidas (ya existían): {contador_omitidas}")
+    print(f"❌ Errores encontrados: {contador_errores}")
+    print(f"📁 Carpeta procesada: {ruta_base}")
+    print(f"🧩 Trabajo: {describir_trabajo(trabajo)}")
+    if contador_procesadas > 0:
+        metricas.imprimir_resumen()
+
+    if errores_detallados:
+        print("\n📋 DETALLES DE ERRORES:")
+        for error in errores_detallados:
+            print(f"   {error}")
+
+    if contador_procesadas > 0:
+        print(f"\n🎉 ¡Proceso completado exitosamente!")
+    elif not contador_omitidas:
+        print("\n🤷 No se encontraron imágenes para procesar.")
+
+    return {"procesadas": contador_procesadas, "omitidas": contador_omitidas,
+            "errores": contador_errores}
+
+def construir_parser():
+    """Define los argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Convierte, redimensiona y quita el fondo en una sola pasada (incluye subcarpetas)."
+    )
+    parser.add_argument("ruta", help="Carpeta raíz a procesar.")
+    parser.add_argument(
+        "--trabajo", metavar="ARCHIVO", default=None,
+        help="Especificación del trabajo en JSON (por defecto: HEIC → 30% → sin fondo con u2net)."
+    )
+    parser.add_argument(
+        "-t", "--trabajadores", type=int, default=None,
+        help="Fotos en paralelo (por defecto: 2 si se quita el fondo, si no uno por núcleo)."
+    )
+    parser.add_argument(
+        "--manifiesto", action="store_true",
+        help="Usa el manifiesto de la carpeta para procesar solo fotos nuevas o modificadas."
+    )
+    parser.add_argument(
+        "--metricas", metavar="ARCHIVO", default=None,
+        help="Exporta los tiempos por etapa: ARCHIVO.prom para Prometheus, otro nombre para líneas JSON."
+    )
+    parser.add_argument(
+        "--memoria-mb", type=int, default=None,
+        help="Memoria aproximada para imágenes en curso; limita cuántas fotos grandes se procesan a la vez."
+    )
+    parser.add_argument(
+        "--lecturas", type=int, default=4,
+        help="Archivos que se leen por adelantado a la vez; súbelo (16-64) en carpetas de red con mucha latencia."
+    )
+    parser.add_argument(
+        "--escrituras", type=int, default=2,
+        help="Salidas que se escriben a la vez; súbelo en carpetas de red con mucha latencia."
+    )
+    parser.add_argument(
+        "--sincronizar", action="store_true",
+        help="Confirma cada salida en disco (fsync) antes de darla por hecha; los fsync de carpeta se agrupan."
+    )
+    parser.add_argument(
+        "--consola", choices=MODOS_CONSOLA, default="barra",
+        help="Salida por archivo: 'barra' (progreso y tiempo restante), 'detalle' (una línea por archivo) o 'silencio'."
+    )
+    parser.add_argument(
+        "-q", "--silencioso", dest="consola", action="store_const", const="silencio",
+        help="Igual que --consola silencio: sin barra ni líneas por archivo, solo el resumen."
+    )
+    return parser
+
+def main(argv=None):
+    """Función principal; devuelve el código de salida"""
+    args = construir_parser().parse_args(argv)
+    if args.trabajadores is not None and args.trabajadores < 1:
+        print("❌ --trabajadores debe ser 1 o mayor")
+        return 2
+    if args.memoria_mb is not None and args.memoria_mb < 1:
+        print("❌ --memoria-mb debe ser 1 o mayor")
+        return 2
+    if args.lecturas < 1 or args.escrituras < 1:
+        print("❌ --lecturas y --escrituras deben ser 1 o mayor")
+        return 2
+    try:
+        trabajo = cargar_trabajo(args.trabajo)
+    except (OSError, ValueError) as e:
+        print(f"❌ Trabajo no válido: {e}")
+        return 2
+    if not os.path.isdir(args.ruta):
+        print(f"❌ La ruta especificada no existe: {args.ruta}")
+        return 1
+
+    print("🧩 FLUJO COMPLETO")
+    print("=" * 40)
+    try:
+        resumen = ejecutar_flujo(args.ruta, trabajo, args.trabajadores, args.manifiesto,
+                                 args.metricas, args.consola, args.memoria_mb, args.lecturas,
+                                 args.escrituras, args.sincronizar)
+        return 1 if resumen["errores"] else 0
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Proceso cancelado por el usuario.")
+        return 130
+    except Exception as e:
+        print(f"\n❌ Error inesperado: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
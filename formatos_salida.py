@@ -0,0 +1,71 @@
+# Formatos de salida - Codificadores y sus ajustes
+# Julio 2025 - Compartido por convertir_a_png.py, Cambiar_dimenciones.py, quitar_fondo_lento.py
+# y flujo_completo.py
+#
+# PNG es lento de codificar y ocupa mucho frente a WebP sin pérdida o AVIF; en
+# archivos de varios terabytes la diferencia se nota en horas y en discos. Cada
+# formato lleva aquí su extensión, el nombre para Pillow, los ajustes del
+# codificador y si admite transparencia (JPEG no: solo para salidas opacas).
+#
+# "intermedio" es para archivos que se vuelven a leer enseguida (p. ej. entre
+# scripts encadenados): TIFF sin compresión, casi sin coste de codificación a
+# cambio de ocupar lo mismo que la imagen en memoria. Pillow también escribe QOI,
+# pero su codificador está en Python y resultó más lento que PNG nivel 1.
+#
+# benchmarks/benchmark_formatos.py mide ms/MP y bytes/MP de cada uno.
+
+import io
+from collections import namedtuple
+
+from PIL import Image
+
+from decodificadores import registrar_decodificadores
+
+FormatoSalida = namedtuple("FormatoSalida", "extension formato opciones transparencia")
+
+# Ajustes por defecto de cada formato (se pueden cambiar con 'calidad' o con ajustes sueltos)
+FORMATOS_SALIDA = {
+    # Mismo PNG de siempre (zlib nivel 6); convertir_a_png.py usa además sus perfiles
+    "png": FormatoSalida(".png", "PNG", {}, True),
+    # Sin pérdida: 'quality' es el esfuerzo de compresión (0-100), no la calidad
+    "webp": FormatoSalida(".webp", "WEBP", {"lossless": True, "quality": 50, "method": 4}, True),
+    "webp_perdida": FormatoSalida(".webp", "WEBP", {"quality": 90, "method": 4}, True),
+    "avif": FormatoSalida(".avif", "AVIF", {"quality": 80, "speed": 6}, True),
+    "jpeg": FormatoSalida(".jpg", "JPEG", {"quality": 92, "optimize": True}, False),
+    "intermedio": FormatoSalida(".tif", "TIFF", {"compression": None}, True),
+}
+
+# Formatos con pérdida: en ellos 'calidad' cambia el resultado, no solo el esfuerzo
+FORMATOS_CON_PERDIDA = {"webp_perdida", "avif", "jpeg"}
+
+def formato_disponible(nombre):
+    """Indica si Pillow puede escribir el formato (AVIF necesita Pillow 11.2+ o pillow-heif)"""
+    registrar_decodificadores()
+    Image.init()
+    return FORMATOS_SALIDA[nombre].formato in Image.SAVE
+
+def comprobar_formato(nombre, con_transparencia=False):
+    """Devuelve un mensaje de error si el formato no sirve para esta salida, o None"""
+    if not formato_disponible(nombre):
+        return f"Pillow no puede escribir {nombre.upper()} en este equipo (instala pillow-heif o actualiza Pillow)"
+    if con_transparencia and not FORMATOS_SALIDA[nombre].transparencia:
+        return f"{nombre.upper()} no admite transparencia; usa png, webp o avif"
+    return None
+
+def opciones_formato(nombre, calidad=None, **ajustes):
+    """Ajustes del codificador: los del formato, con 'calidad' y los ajustes sueltos encima"""
+    opciones = dict(FORMATOS_SALIDA[nombre].opciones)
+    if calidad is not None:
+        opciones["quality"] = calidad
+    opciones.update(ajustes)
+    return opciones
+
+def codificar(img, nombre, opciones=None):
+    """Codifica una imagen en el formato indicado y devuelve los bytes"""
+    formato = FORMATOS_SALIDA[nombre]
+    if not formato.transparencia and img.mode in ("RGBA", "LA", "PA"):
+        # Aplanar sobre negro en silencio cambiaría la foto; mejor un error claro
+        raise ValueError(f"{nombre.upper()} no admite transparencia")
+    salida = io.BytesIO()
+    img.save(salida, formato.formato, **(formato.opciones if opciones is None else opciones))
+    return salida.getvalue()
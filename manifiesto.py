@@ -0,0 +1,208 @@
+# Manifiesto de conversiones - Registro persistente para re-ejecuciones incrementales
+# Julio 2025 - Compartido por convertir_a_png.py, Cambiar_dimenciones.py y quitar_fondo_lento.py
+#
+# Guarda en un archivo SQLite dentro de la carpeta raíz qué archivos ya se
+# procesaron, con su tamaño, fecha de modificación, hash del contenido y los
+# parámetros usados (factor de escala, modelo...). En la siguiente ejecución solo
+# se vuelven a procesar los archivos nuevos o modificados.
+#
+# Las salidas se escriben primero en "<salida>.parcial" y se renombran al final,
+# así que un proceso interrumpido nunca deja un archivo a medias con el nombre final.
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from escaner import existe
+
+# Nombre del archivo del manifiesto dentro de la carpeta raíz
+NOMBRE_MANIFIESTO = ".manifiesto_conversiones.sqlite"
+
+# Cada cuántos registros se confirma la transacción en disco
+REGISTROS_POR_COMMIT = 200
+
+# Separa las salidas de un origen que genera varias (flujo_completo.py)
+SEPARADOR_SALIDAS = "\n"
+
+
+def calcular_hash(ruta, tamano_bloque=1024 * 1024):
+    """Calcula el hash BLAKE2b del contenido de un archivo"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(tamano_bloque), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def calcular_hash_bytes(datos):
+    """Calcula el hash BLAKE2b de un contenido ya leído (el mismo que calcular_hash de su archivo)"""
+    return hashlib.blake2b(datos, digest_size=20).hexdigest()
+
+
+def ruta_parcial(ruta_salida):
+    """Nombre temporal donde se escribe una salida antes de darla por buena"""
+    return ruta_salida + ".parcial"
+
+
+class Manifiesto:
+    """Registro SQLite de archivos procesados por una herramienta"""
+
+    def __init__(self, ruta_base, herramienta, compartido=False):
+        """compartido: varios nodos lo usan a la vez sobre una carpeta de red (ver reparto.py)"""
+        self.ruta_base = os.path.abspath(ruta_base)
+        self.herramienta = herramienta
+        self.ruta = os.path.join(self.ruta_base, NOMBRE_MANIFIESTO)
+        self._pendientes = 0
+        # Ruta absoluta → (os.stat_result, hash) de los orígenes leídos con leer_origen()
+        self._leidos = {}
+        # Entre nodos una transacción abierta bloquea a los demás: se confirma cada registro
+        self._por_commit = 1 if compartido else REGISTROS_POR_COMMIT
+        self._candado = threading.Lock()
+        self._conexion = sqlite3.connect(self.ruta, timeout=60 if compartido else 5, check_same_thread=False)
+        # WAL necesita memoria compartida: no sirve entre máquinas sobre una carpeta de red
+        self._conexion.execute("PRAGMA journal_mode=DELETE" if compartido else "PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute(
+            """CREATE TABLE IF NOT EXISTS procesados (
+                herramienta TEXT NOT NULL,
+                origen TEXT NOT NULL,
+                parametros TEXT NOT NULL,
+                tamano INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                salida TEXT NOT NULL,
+                fecha REAL NOT NULL,
+                PRIMARY KEY (herramienta, origen, parametros)
+            )"""
+        )
+        self._conexion.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def _clave(self, ruta_origen, parametros):
+        """Convierte ruta y parámetros al formato guardado (ruta relativa, JSON ordenado)"""
+        relativa = os.path.relpath(os.path.abspath(ruta_origen), self.ruta_base)
+        return relativa.replace(os.sep, "/"), json.dumps(parametros, sort_keys=True)
+
+    def necesita_proceso(self, ruta_origen, parametros, estado=None, nombres=None):
+        """Indica si el archivo es nuevo, cambió o perdió su salida desde que se registró con estos parámetros
+
+        estado: os.stat_result u os.DirEntry ya disponible (evita un stat extra;
+        con DirEntry el stat solo se hace si el archivo ya estaba registrado).
+        nombres: nombres de la carpeta del origen según el escáner; si la salida
+        está en esa carpeta, se comprueba que sigue ahí sin consultar al disco.
+        """
+        origen, parametros_json = self._clave(ruta_origen, parametros)
+        with self._candado:
+            fila = self._conexion.execute(
+                "SELECT tamano, mtime_ns, hash, salida FROM procesados "
+                "WHERE herramienta = ? AND origen = ? AND parametros = ?",
+                (self.herramienta, origen, parametros_json),
+            ).fetchone()
+        if fila is None:
+            return True
+        tamano, mtime_ns, hash_guardado, salida = fila
+        # Salida borrada o movida desde que se registró: hay que volver a generarla
+        if not self._salida_existe(ruta_origen, salida, nombres):
+            return True
+        if estado is None:
+            estado = os.stat(ruta_origen)
+        elif isinstance(estado, os.DirEntry):
+            estado = estado.stat()
+        if estado.st_size == tamano and estado.st_mtime_ns == mtime_ns:
+            return False
+        # Tamaño o fecha distintos: solo el contenido decide (p. ej. tras copiar la carpeta)
+        if estado.st_size != tamano or calcular_hash(ruta_origen) != hash_guardado:
+            return True
+        with self._candado:
+            self._conexion.execute(
+                "UPDATE procesados SET mtime_ns = ? "
+                "WHERE herramienta = ? AND origen = ? AND parametros = ?",
+                (estado.st_mtime_ns, self.herramienta, origen, parametros_json),
+            )
+            self._contar_registro()
+        return False
+
+    def _salida_existe(self, ruta_origen, salida, nombres):
+        """Comprueba si todas las salidas registradas (relativas a la raíz) siguen en disco"""
+        carpeta_origen = os.path.dirname(os.path.abspath(ruta_origen))
+        for relativa in salida.split(SEPARADOR_SALIDAS):
+            ruta_salida = os.path.normpath(os.path.join(self.ruta_base, relativa))
+            if nombres is not None and os.path.dirname(ruta_salida) == carpeta_origen:
+                if not existe(nombres, os.path.basename(ruta_salida)):
+                    return False
+            elif not os.path.exists(ruta_salida):
+                return False
+        return True
+
+    def leer_origen(self, ruta_origen):
+        """Lee un origen para procesarlo y recuerda su tamaño, fecha y hash (ver tomar_lectura)
+
+        Se usa como etapa de lectura: el hash es el de los bytes que se procesan y al
+        registrar no hay que volver a leer el archivo.
+        """
+        # El stat va antes de leer: si el archivo cambia entre medias, la fecha guardada
+        # no coincidirá y la próxima ejecución lo comprobará por contenido
+        estado = os.stat(ruta_origen)
+        with open(ruta_origen, 'rb') as archivo:
+            datos = archivo.read()
+        hash_origen = calcular_hash_bytes(datos)
+        with self._candado:
+            self._leidos[os.path.abspath(ruta_origen)] = (estado, hash_origen)
+        return datos
+
+    def tomar_lectura(self, ruta_origen):
+        """Devuelve (estado, hash) guardados por leer_origen() y los olvida; (None, None) si no hay"""
+        with self._candado:
+            return self._leidos.pop(os.path.abspath(ruta_origen), (None, None))
+
+    def registrar(self, ruta_origen, ruta_salida, parametros, hash_origen=None, estado=None):
+        """Guarda que el archivo se procesó correctamente con estos parámetros
+
+        ruta_salida: la salida o una lista con todas las salidas del origen; si falta
+        alguna, necesita_proceso() lo vuelve a pedir.
+        hash_origen, estado: los de los bytes procesados (ver tomar_lectura); si faltan
+        se leen del disco. Devuelve False sin registrar nada si el origen ya no se puede
+        leer (p. ej. se borró durante la ejecución): se procesará en la siguiente.
+        """
+        origen, parametros_json = self._clave(ruta_origen, parametros)
+        try:
+            if estado is None:
+                estado = os.stat(ruta_origen)
+            if hash_origen is None:
+                hash_origen = calcular_hash(ruta_origen)
+        except OSError:
+            return False
+        rutas_salida = [ruta_salida] if isinstance(ruta_salida, str) else ruta_salida
+        salida = SEPARADOR_SALIDAS.join(os.path.relpath(os.path.abspath(ruta), self.ruta_base).replace(os.sep, "/")
+                                        for ruta in rutas_salida)
+        with self._candado:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO procesados VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.herramienta, origen, parametros_json, estado.st_size,
+                 estado.st_mtime_ns, hash_origen, salida, time.time()),
+            )
+            self._contar_registro()
+        return True
+
+    def _contar_registro(self):
+        """Confirma la transacción cada REGISTROS_POR_COMMIT cambios (llamar con el candado)"""
+        self._pendientes += 1
+        if self._pendientes >= self._por_commit:
+            self._conexion.commit()
+            self._pendientes = 0
+
+    def cerrar(self):
+        """Confirma los cambios pendientes y cierra la base de datos"""
+        with self._candado:
+            if self._conexion is not None:
+                self._conexion.commit()
+                self._conexion.close()
+                self._conexion = None
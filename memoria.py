@@ -0,0 +1,37 @@
+# Presupuesto de memoria - Límite de píxeles decodificados a la vez
+# Julio 2025 - Compartido por convertir_a_png.py, Cambiar_dimenciones.py y quitar_fondo_lento.py
+#
+# Con varios trabajadores, un lote de panorámicas de 100 MP o de TIFF escaneados
+# puede agotar la memoria aunque cada imagen por separado quepa. Con --memoria-mb
+# cada script lee solo la cabecera de la imagen (ancho x alto, sin decodificar) y
+# no empieza una nueva mientras los píxeles en curso no quepan en el presupuesto.
+#
+# La memoria por píxel depende de la herramienta (copias intermedias, máscara,
+# canal alfa...); los valores de BYTES_POR_PIXEL son estimaciones prudentes.
+
+from decodificadores import abrir_imagen
+
+# Bytes de memoria por píxel de origen en cada herramienta (estimación)
+BYTES_POR_PIXEL = {
+    # RGB decodificado + búfer del PNG codificado
+    "convertir_a_png": 5,
+    # RGB decodificado + franja intermedia + variantes
+    "Cambiar_dimenciones": 5,
+    # RGB + RGBA + máscara + datos internos de rembg
+    "quitar_fondo_lento": 12,
+    # Foto completa + variantes + lo mismo que quitar_fondo_lento sobre ellas
+    "flujo_completo": 12,
+}
+
+def pixeles_en_cabecera(datos):
+    """Ancho x alto leídos de la cabecera, sin decodificar la imagen (0 si no se reconoce)"""
+    try:
+        with abrir_imagen(datos) as img:
+            return img.width * img.height
+    except Exception:
+        # El error real se informa después, al procesar la imagen
+        return 0
+
+def presupuesto_pixeles(memoria_mb, herramienta):
+    """Convierte un límite en MB en el número de píxeles que pueden estar en curso"""
+    return max(1, int(memoria_mb * 1024 ** 2 / BYTES_POR_PIXEL[herramienta]))
@@ -0,0 +1,141 @@
+# Métricas por etapa - Dónde se va el tiempo en cada ejecución
+# Julio 2025 - Compartido por convertir_a_png.py, Cambiar_dimenciones.py y quitar_fondo_lento.py
+#
+# Cada archivo procesado deja un registro con los segundos de cada etapa:
+#   escaneo, lectura, decodificacion, transformacion (o inferencia), codificacion, escritura
+# más los bytes leídos y escritos y los píxeles decodificados.
+#
+# Los registros se pueden exportar:
+#   - como líneas JSON (un registro por archivo y un resumen al final), o
+#   - como archivo de texto de Prometheus (.prom), para el "textfile collector".
+# Al terminar se imprime un resumen de qué etapa se llevó más tiempo.
+#
+# Las etapas corren en hilos y procesos a la vez, así que la suma de tiempos de
+# las etapas es tiempo de trabajo, no tiempo de reloj.
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+from manifiesto import ruta_parcial
+
+# Etapas en el orden en que las recorre un archivo
+ETAPAS = ("escaneo", "lectura", "decodificacion", "transformacion", "codificacion", "escritura")
+
+# Contadores (no tiempos) que puede llevar un registro
+CONTADORES = ("bytes_entrada", "bytes_salida", "pixeles")
+
+@contextmanager
+def cronometrar(tiempos, etapa):
+    """Suma a tiempos[etapa] los segundos que tarda el bloque 'with'
+
+    'tiempos' es un diccionario normal, así se puede devolver desde otro proceso.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        tiempos[etapa] = tiempos.get(etapa, 0.0) + time.perf_counter() - inicio
+
+class Metricas:
+    """Acumula los tiempos por etapa de una ejecución y los exporta"""
+
+    def __init__(self, herramienta, ruta_exportacion=None):
+        self.herramienta = herramienta
+        self.ruta_exportacion = ruta_exportacion
+        self.archivos = 0
+        self.totales = dict(dict.fromkeys(ETAPAS, 0.0), **dict.fromkeys(CONTADORES, 0))
+        self._inicio = time.perf_counter()
+        self._candado = threading.Lock()
+        self._lineas = None
+        if ruta_exportacion and not ruta_exportacion.endswith(".prom"):
+            self._lineas = open(ruta_exportacion, "a", encoding="utf-8")
+
+    def escaneo(self, iterable):
+        """Recorre 'iterable' sumando a la etapa de escaneo lo que tarda cada paso"""
+        iterador = iter(iterable)
+        while True:
+            inicio = time.perf_counter()
+            try:
+                elemento = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                with self._candado:
+                    self.totales["escaneo"] += time.perf_counter() - inicio
+            yield elemento
+
+    def registrar(self, archivo, tiempos, archivos=1):
+        """Añade el registro de un archivo (o de un lote de 'archivos' archivos)"""
+        with self._candado:
+            self.archivos += archivos
+            for clave in ETAPAS + CONTADORES:
+                self.totales[clave] += tiempos.get(clave, 0)
+            if self._lineas is not None:
+                registro = {"herramienta": self.herramienta, "archivo": archivo, "archivos": archivos}
+                registro.update({clave: round(valor, 6) if isinstance(valor, float) else valor
+                                 for clave, valor in tiempos.items() if clave in ETAPAS + CONTADORES})
+                self._lineas.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def resumen(self):
+        """Diccionario con los totales de la ejecución"""
+        with self._candado:
+            datos = {"herramienta": self.herramienta, "archivos": self.archivos,
+                     "segundos_reloj": round(time.perf_counter() - self._inicio, 3)}
+            datos.update({clave: round(valor, 3) if isinstance(valor, float) else valor
+                          for clave, valor in self.totales.items()})
+        return datos
+
+    def texto_prometheus(self):
+        """Totales en el formato de texto de Prometheus"""
+        datos = self.resumen()
+        etiqueta = f'herramienta="{self.herramienta}"'
+        lineas = [
+            "# HELP imagenes_etapa_segundos_total Segundos de trabajo por etapa.",
+            "# TYPE imagenes_etapa_segundos_total counter",
+        ]
+        lineas += [f'imagenes_etapa_segundos_total{{{etiqueta},etapa="{etapa}"}} {datos[etapa]}'
+                   for etapa in ETAPAS]
+        for nombre, valor, ayuda in (
+            ("imagenes_archivos_total", datos["archivos"], "Archivos procesados."),
+            ("imagenes_bytes_entrada_total", datos["bytes_entrada"], "Bytes leídos de los originales."),
+            ("imagenes_bytes_salida_total", datos["bytes_salida"], "Bytes escritos en las salidas."),
+            ("imagenes_pixeles_total", datos["pixeles"], "Píxeles decodificados."),
+            ("imagenes_duracion_segundos", datos["segundos_reloj"], "Duración de la ejecución."),
+        ):
+            tipo = "gauge" if nombre.endswith("_segundos") else "counter"
+            lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}", f"{nombre}{{{etiqueta}}} {valor}"]
+        return "\n".join(lineas) + "\n"
+
+    def imprimir_resumen(self):
+        """Muestra el reparto del tiempo entre etapas"""
+        datos = self.resumen()
+        trabajo = max(sum(datos[etapa] for etapa in ETAPAS), 1e-9)
+        print(f"⏱️  Tiempo por etapa (suma de hilos y procesos, {datos['segundos_reloj']:.1f} s de reloj):")
+        for etapa in sorted(ETAPAS, key=lambda etapa: -datos[etapa]):
+            if datos[etapa]:
+                print(f"   {etapa:<15} {datos[etapa]:>9.1f} s ({datos[etapa] / trabajo:.0%})")
+        reloj = max(datos["segundos_reloj"], 1e-9)
+        print(f"   Leído: {datos['bytes_entrada'] / 1024 ** 2:.1f} MB | Escrito: {datos['bytes_salida'] / 1024 ** 2:.1f} MB"
+              f" | {datos['pixeles'] / 1e6 / reloj:.1f} MP/s")
+
+    def cerrar(self):
+        """Termina la exportación (línea de resumen o archivo de Prometheus)"""
+        if self._lineas is not None:
+            self._lineas.write(json.dumps({"resumen": self.resumen()}, ensure_ascii=False) + "\n")
+            self._lineas.close()
+            self._lineas = None
+        elif self.ruta_exportacion:
+            # Escritura atómica: Prometheus no debe leer un archivo a medias
+            temporal = ruta_parcial(self.ruta_exportacion)
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                archivo.write(self.texto_prometheus())
+            os.replace(temporal, self.ruta_exportacion)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
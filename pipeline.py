@@ -0,0 +1,270 @@
+# Pipeline de procesamiento por etapas - Lectura, transformación y escritura solapadas
+# Julio 2025 - Compartido por convertir_a_png.py, Cambiar_dimenciones.py y quitar_fondo_lento.py
+#
+# Cada archivo pasa por tres etapas que trabajan a la vez sobre archivos distintos:
+#   1. Lectura (hilos de E/S): lee los bytes del origen, útil en carpetas de red lentas.
+#   2. Transformación (procesos o hilos de CPU): decodifica, procesa y codifica.
+#   3. Escritura (hilos de E/S): guarda el resultado en disco.
+#
+# Como mucho hay 'max_en_vuelo' archivos entre la lectura y la entrega del resultado,
+# así la memoria se mantiene estable aunque la carpeta tenga millones de archivos.
+# Con 'presupuesto' además se limita la suma del costo (p. ej. píxeles) de las tareas
+# que están entre la lectura y el final de la escritura, para imágenes muy grandes.
+# Los resultados se entregan en el mismo orden que las tareas, o según terminan con
+# en_orden=False (así una tarea muy larga al principio no retiene en el búfer las
+# que terminan detrás de ella; lo usa el orden de mayor a menor de planificador.py).
+#
+# En carpetas de red con mucha latencia lo que limita es el tiempo de abrir y leer
+# cada archivo, no la CPU: con más hilos de lectura (--lecturas en los scripts) se
+# leen por adelantado varios archivos a la vez, y con más hilos de escritura
+# (--escrituras) se escriben varios a la vez. Con SincronizacionEnGrupo las salidas
+# además se confirman en disco (fsync) y el fsync de cada carpeta se comparte entre
+# todas las escrituras que terminan a la vez, en lugar de uno por archivo.
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from manifiesto import ruta_parcial
+
+# Marca de fin entre etapas
+_FIN = object()
+
+def leer_bytes(ruta):
+    """Lee un archivo completo (etapa de lectura típica)"""
+    with open(ruta, 'rb') as archivo:
+        return archivo.read()
+
+def escribir_bytes(ruta_salida, datos, sincronizacion=None):
+    """Escribe un archivo completo en '<salida>.parcial' y lo renombra al terminar
+
+    Con 'sincronizacion' (SincronizacionEnGrupo) el archivo y su carpeta quedan en
+    disco antes de volver, así la salida sobrevive a un corte de luz.
+    """
+    temporal = ruta_parcial(ruta_salida)
+    with open(temporal, 'wb') as archivo:
+        archivo.write(datos)
+        if sincronizacion is not None:
+            archivo.flush()
+            os.fsync(archivo.fileno())
+    os.replace(temporal, ruta_salida)
+    if sincronizacion is not None:
+        sincronizacion.confirmar(os.path.dirname(os.path.abspath(ruta_salida)))
+
+class SincronizacionEnGrupo:
+    """fsync de carpetas compartido entre los hilos de escritura ("group commit")
+
+    Para que un renombrado sobreviva a un corte hay que hacer fsync de la carpeta.
+    El primer hilo que lo pide sincroniza todas las carpetas pendientes; los que
+    llegan mientras tanto esperan y se sincronizan juntos en la siguiente ronda.
+    Con N escrituras a la vez en una carpeta, hay un fsync de carpeta por ronda y
+    no uno por archivo.
+    """
+
+    def __init__(self):
+        self.sincronizaciones = 0
+        self._condicion = threading.Condition()
+        self._pendientes = set()
+        self._ronda = 0
+        self._confirmada = -1
+        self._lider = False
+
+    def confirmar(self, carpeta):
+        """Vuelve cuando la carpeta (con los renombrados ya hechos) está en disco"""
+        with self._condicion:
+            self._pendientes.add(carpeta)
+            ronda = self._ronda
+            while self._confirmada < ronda:
+                if not self._lider:
+                    # Nadie está sincronizando: este hilo lo hace por todos
+                    self._lider = True
+                    break
+                self._condicion.wait()
+            else:
+                return
+            carpetas, self._pendientes = self._pendientes, set()
+            ronda = self._ronda
+            self._ronda += 1
+        try:
+            for pendiente in carpetas:
+                self._sincronizar_carpeta(pendiente)
+        finally:
+            with self._condicion:
+                self._confirmada = ronda
+                self.sincronizaciones += len(carpetas)
+                self._lider = False
+                self._condicion.notify_all()
+
+    def _sincronizar_carpeta(self, carpeta):
+        """fsync de una carpeta (no existe en Windows ni en algunos montajes de red)"""
+        try:
+            descriptor = os.open(carpeta, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(descriptor)
+        except OSError:
+            # Sistema de archivos sin fsync de carpetas: el del archivo ya se hizo
+            pass
+        finally:
+            os.close(descriptor)
+
+def procesar_en_pipeline(tareas, leer, transformar, escribir, ejecutor_cpu=None,
+                         hilos_lectura=4, hilos_escritura=2, max_en_vuelo=32, con_tiempos=False,
+                         costo=None, presupuesto=None, en_orden=True):
+    """Procesa las tareas en tres etapas solapadas y entrega (tarea, resultado, error) en orden
+
+    leer(tarea) -> datos, en hilos de lectura.
+    transformar(tarea, datos) -> salida, en ejecutor_cpu (debe ser una función de
+    módulo si el ejecutor usa procesos). Por defecto, un hilo por núcleo.
+    escribir(tarea, salida) -> resultado, en hilos de escritura.
+    Una excepción en cualquier etapa se entrega como 'error' de esa tarea; si falla
+    el propio iterador de tareas, se relanza aquí después de entregar las ya tomadas.
+    Con con_tiempos=True se entrega (tarea, resultado, error, tiempos), donde
+    tiempos tiene los segundos de "lectura" y "escritura" de esa tarea.
+    costo(tarea, datos) -> número, tras leer; la suma de los costos de las tareas
+    en curso no pasa de 'presupuesto' (una tarea más cara que todo el presupuesto
+    se procesa sola).
+    Con en_orden=False los resultados se entregan según terminan.
+    """
+    propio = ejecutor_cpu is None
+    if propio:
+        ejecutor_cpu = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+    iterador = enumerate(tareas)
+    candado_iterador = threading.Lock()
+    tomadas = [0]
+    # Excepción del generador de tareas: se relanza al consumidor tras entregar lo ya tomado
+    fallo_tareas = [None]
+    en_vuelo = threading.Semaphore(max_en_vuelo)
+    detener = threading.Event()
+    cola_escritura = queue.Queue()
+    cola_resultados = queue.Queue()
+    lectores_activos = [hilos_lectura]
+    candado_lectores = threading.Lock()
+    condicion_presupuesto = threading.Condition()
+    en_uso = [0]
+    costos = {}
+
+    def reservar(indice, cantidad):
+        """Espera a que quepa 'cantidad' en el presupuesto; False si se cancela"""
+        with condicion_presupuesto:
+            while en_uso[0] > 0 and en_uso[0] + cantidad > presupuesto:
+                if detener.is_set():
+                    return False
+                condicion_presupuesto.wait(0.1)
+            en_uso[0] += cantidad
+            costos[indice] = cantidad
+            return True
+
+    def liberar(indice):
+        """Devuelve al presupuesto lo reservado por una tarea"""
+        with condicion_presupuesto:
+            en_uso[0] -= costos.pop(indice, 0)
+            condicion_presupuesto.notify_all()
+
+    def entregar_a_escritura(indice, tarea, tiempos, futuro):
+        """Pasa el resultado de la CPU a la cola de escritura"""
+        try:
+            cola_escritura.put((indice, tarea, tiempos, futuro.result(), None))
+        except Exception as e:
+            cola_escritura.put((indice, tarea, tiempos, None, e))
+
+    def lector():
+        """Lee tareas pendientes y las envía a la etapa de CPU"""
+        try:
+            while not detener.is_set():
+                # Esperar hueco sin bloquearse para siempre si se cancela
+                if not en_vuelo.acquire(timeout=0.1):
+                    continue
+                with candado_iterador:
+                    siguiente = None
+                    if fallo_tareas[0] is None:
+                        try:
+                            siguiente = next(iterador, None)
+                        except Exception as e:
+                            # Sin esto el hilo moriría y el proceso acabaría "bien" con
+                            # solo parte del árbol; los demás lectores dejan de tomar tareas
+                            fallo_tareas[0] = e
+                    if siguiente is not None:
+                        tomadas[0] += 1
+                if siguiente is None:
+                    en_vuelo.release()
+                    break
+                indice, tarea = siguiente
+                inicio = time.perf_counter()
+                try:
+                    datos = leer(tarea)
+                    tiempos = {"lectura": time.perf_counter() - inicio}
+                    if presupuesto is not None and not reservar(indice, costo(tarea, datos)):
+                        break
+                    futuro = ejecutor_cpu.submit(transformar, tarea, datos)
+                except Exception as e:
+                    cola_escritura.put((indice, tarea, {"lectura": time.perf_counter() - inicio}, None, e))
+                    continue
+                futuro.add_done_callback(
+                    lambda f, indice=indice, tarea=tarea, tiempos=tiempos:
+                        entregar_a_escritura(indice, tarea, tiempos, f)
+                )
+        finally:
+            with candado_lectores:
+                lectores_activos[0] -= 1
+                ultimo = lectores_activos[0] == 0
+            if ultimo:
+                # Ya no hay más tareas: se avisa al consumidor del total
+                cola_resultados.put((tomadas[0], None, None, _FIN, None))
+
+    def escritor():
+        """Escribe los resultados de la CPU y los pasa al consumidor"""
+        while True:
+            elemento = cola_escritura.get()
+            if elemento is _FIN:
+                break
+            indice, tarea, tiempos, salida, error = elemento
+            resultado = None
+            if error is None:
+                inicio = time.perf_counter()
+                try:
+                    resultado = escribir(tarea, salida)
+                except Exception as e:
+                    error = e
+                tiempos["escritura"] = time.perf_counter() - inicio
+            if presupuesto is not None:
+                liberar(indice)
+            cola_resultados.put((indice, tarea, resultado, error, tiempos))
+
+    hilos = [threading.Thread(target=lector, daemon=True) for _ in range(hilos_lectura)]
+    hilos += [threading.Thread(target=escritor, daemon=True) for _ in range(hilos_escritura)]
+    for hilo in hilos:
+        hilo.start()
+
+    # Reordenar para entregar en el orden original; el semáforo limita este búfer
+    reordenados = {}
+    siguiente_indice = 0
+    total = None
+    try:
+        while total is None or siguiente_indice < total:
+            indice, tarea, resultado, error, tiempos = cola_resultados.get()
+            if error is _FIN:
+                total = indice
+                continue
+            entrega = (tarea, resultado, error, tiempos) if con_tiempos else (tarea, resultado, error)
+            if not en_orden:
+                yield entrega
+                siguiente_indice += 1
+                en_vuelo.release()
+                continue
+            reordenados[indice] = entrega
+            while siguiente_indice in reordenados:
+                yield reordenados.pop(siguiente_indice)
+                siguiente_indice += 1
+                en_vuelo.release()
+        if fallo_tareas[0] is not None:
+            raise fallo_tareas[0]
+    finally:
+        detener.set()
+        for _ in range(hilos_escritura):
+            cola_escritura.put(_FIN)
+        if propio:
+            ejecutor_cpu.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,103 @@
+# Planificador - Pasada previa por las cabeceras para ordenar el trabajo de mayor a menor
+# Julio 2025 - Compartido por convertir_a_png.py y Cambiar_dimenciones.py
+#
+# Sin plan, las imágenes se procesan en el orden del recorrido: si unas pocas fotos
+# enormes caen al final, los demás trabajadores terminan y se quedan esperando a la
+# última (una "cola larga"), y el tiempo restante por archivos/segundo engaña en
+# carpetas con tamaños mezclados.
+#
+# Con --planificar cada script recorre primero todo el árbol y lee solo la cabecera
+# de cada imagen (ancho, alto y formato, sin decodificar; en varios hilos, porque en
+# carpetas de red lo que cuesta es abrir cada archivo). Con eso:
+#   - estima el coste de cada archivo (megapíxeles por un factor del formato),
+#   - ordena las tareas de la más cara a la más barata (las grandes empiezan primero
+#     y las pequeñas rellenan el final), y
+#   - da a Progreso el coste de cada tarea, para calcular el tiempo restante por
+#     megapíxeles en lugar de por archivos.
+# A cambio, el proceso no empieza hasta terminar el recorrido.
+#
+# pillow-heif no expone la rejilla de mosaicos de un HEIC sin decodificar, así que
+# su coste se estima con el factor del formato (ver COSTO_POR_FORMATO).
+
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from decodificadores import registrar_decodificadores
+
+# Cabecera de una imagen: tamaño y formato de Pillow en minúsculas ('jpeg', 'heif'...)
+Cabecera = namedtuple("Cabecera", "ancho alto formato")
+
+# Coste de decodificar y procesar un megapíxel de cada formato, relativo a JPEG
+# (estimaciones; solo importa el orden y la proporción entre archivos)
+COSTO_POR_FORMATO = {
+    "jpeg": 1.0,
+    "png": 1.5,
+    "webp": 1.5,
+    "tiff": 1.0,
+    "bmp": 0.8,
+    "gif": 1.0,
+    # HEVC/AV1 por mosaicos: bastante más caro por píxel que JPEG
+    "heif": 3.0,
+    "avif": 3.5,
+}
+
+# Hilos que leen cabeceras a la vez si el script no indica otro número
+HILOS_POR_DEFECTO = 8
+
+def leer_cabecera(ruta):
+    """Lee ancho, alto y formato sin decodificar los píxeles; None si no se reconoce"""
+    registrar_decodificadores()
+    try:
+        with Image.open(ruta) as img:
+            return Cabecera(img.width, img.height, (img.format or "").lower())
+    except Exception:
+        # El error real se informa después, al procesar la imagen
+        return None
+
+def costo_estimado(cabecera):
+    """Coste relativo de una imagen: megapíxeles por el factor de su formato"""
+    if cabecera is None:
+        return 0.0
+    return cabecera.ancho * cabecera.alto / 1e6 * COSTO_POR_FORMATO.get(cabecera.formato, 1.0)
+
+class Plan:
+    """Tareas ordenadas de mayor a menor coste, con su coste"""
+
+    def __init__(self, tareas, costos, segundos, ruta_de):
+        self.tareas = tareas
+        self.costos = costos
+        self.segundos = segundos
+        # Las tareas pueden terminar en cualquier orden: coste de cada una por su archivo
+        self._costo_por_ruta = {ruta_de(tarea): costo for tarea, costo in zip(tareas, costos)}
+
+    def costo_de(self, ruta):
+        """Coste estimado de la imagen 'ruta' (0 si no está en el plan)"""
+        return self._costo_por_ruta.get(ruta, 0.0)
+
+    @property
+    def costo_total(self):
+        """Suma del coste estimado de todas las tareas"""
+        return sum(self.costos)
+
+    def imprimir_resumen(self):
+        """Muestra el tamaño del plan y cuánto tardó"""
+        print(f"🗺️  Plan: {len(self.tareas)} imágenes, {self.costo_total:.0f} MP equivalentes"
+              f" (de mayor a menor, {self.segundos:.1f} s)")
+
+def planificar(tareas, ruta_de, hilos=HILOS_POR_DEFECTO):
+    """Lee las cabeceras de todas las tareas y devuelve un Plan de la más cara a la más barata
+
+    ruta_de(tarea): archivo de la tarea cuya cabecera se lee.
+    """
+    inicio = time.perf_counter()
+    tareas = list(tareas)
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        cabeceras = list(ejecutor.map(lambda tarea: leer_cabecera(ruta_de(tarea)), tareas))
+    planificadas = [(costo_estimado(cabecera), tarea) for tarea, cabecera in zip(tareas, cabeceras)]
+    # sorted es estable: a igual coste se mantiene el orden del recorrido
+    planificadas.sort(key=lambda planificada: -planificada[0])
+    return Plan([tarea for _, tarea in planificadas], [costo for costo, _ in planificadas],
+                time.perf_counter() - inicio, ruta_de)
@@ -0,0 +1,140 @@
+# Progreso en consola - Barra con archivos/seg y tiempo restante, sin una línea por archivo
+# Julio 2025 - Compartido por convertir_a_png.py, Cambiar_dimenciones.py y quitar_fondo_lento.py
+#
+# Escribir en la consola una o dos líneas por archivo es lento (sobre todo en la
+# consola de Windows) y llena los registros de las tareas programadas. En su lugar
+# se muestra una sola línea que se refresca como mucho cada 'intervalo' segundos.
+#
+# Modos:
+#   "barra"    una línea de progreso (por defecto)
+#   "detalle"  una línea por archivo, como antes
+#   "silencio" nada por archivo ni barra; solo el resumen final
+#
+# El total (para el % y el tiempo restante) se cuenta sobre las carpetas que va
+# entregando el propio recorrido, sin recorrer el árbol una segunda vez: mientras
+# el recorrido no termina se muestra lo visto hasta ahora ("120/340+ archivos"),
+# sin % ni tiempo restante.
+# Con un plan (ver planificador.py) se conoce además el coste de cada archivo, y el
+# tiempo restante se calcula por coste: con las fotos grandes primero, contar
+# archivos por segundo daría un tiempo restante muy por encima del real.
+
+import sys
+import time
+import threading
+
+MODOS = ("barra", "detalle", "silencio")
+
+# Sin terminal (registros, CI) la línea no se puede sobrescribir: se escribe con menos frecuencia
+INTERVALO_SIN_TERMINAL = 10.0
+
+def formatear_duracion(segundos):
+    """Convierte segundos en 'h:mm:ss' o 'mm:ss'"""
+    minutos, segundos = divmod(int(segundos), 60)
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas}:{minutos:02d}:{segundos:02d}" if horas else f"{minutos:02d}:{segundos:02d}"
+
+class Progreso:
+    """Informa del avance de un recorrido sin escribir una línea por archivo"""
+
+    def __init__(self, modo="barra", intervalo=0.5, flujo=None):
+        self.modo = modo
+        self.flujo = flujo or sys.stdout
+        self.en_terminal = hasattr(self.flujo, "isatty") and self.flujo.isatty()
+        self.intervalo = intervalo if self.en_terminal else max(intervalo, INTERVALO_SIN_TERMINAL)
+        self.total = None
+        self.contando = False
+        self.hechos = 0
+        # Con plan: coste estimado de todo el trabajo y de lo terminado
+        self._costo_total = 0.0
+        self._costo_hecho = 0.0
+        self._inicio = self._inicio_plan = time.perf_counter()
+        self._ultimo_refresco = 0.0
+        self._linea_abierta = False
+        self._candado = threading.Lock()
+
+    def contar(self, carpetas, es_candidato):
+        """Entrega las carpetas del recorrido sin cambiarlas y suma al total sus archivos candidatos
+
+        carpetas: (carpeta, archivos DirEntry, nombres), como las entrega el escáner.
+        es_candidato(nombre, nombres): debe descartar lo mismo que el recorrido omite
+        sin avanzar la barra. El total es definitivo cuando el recorrido termina.
+        """
+        if self.modo != "barra":
+            yield from carpetas
+            return
+        self.total = 0
+        self.contando = True
+        for carpeta in carpetas:
+            candidatos = sum(1 for entrada in carpeta[1] if es_candidato(entrada.name, carpeta[2]))
+            with self._candado:
+                self.total += candidatos
+            yield carpeta
+        self.contando = False
+
+    def planificar(self, costos):
+        """Fija el total y el coste de los archivos que quedan (cada uno se descuenta en avanzar)"""
+        with self._candado:
+            self.total = self.hechos + len(costos)
+            self._costo_total = sum(costos)
+            self._costo_hecho = 0.0
+            # La velocidad se mide desde aquí: el tiempo de planificar no es proceso
+            self._inicio_plan = time.perf_counter()
+
+    def detalle(self, mensaje):
+        """Escribe un mensaje por archivo (solo en modo detalle)"""
+        if self.modo == "detalle":
+            print(mensaje, file=self.flujo)
+
+    def avanzar(self, cantidad=1, costo=0.0):
+        """Cuenta archivos terminados (procesados, omitidos o con error) y refresca la barra
+
+        costo: coste estimado de los archivos terminados, si hay plan (ver planificar).
+        """
+        with self._candado:
+            self.hechos += cantidad
+            self._costo_hecho += costo
+            if self.modo != "barra":
+                return
+            ahora = time.perf_counter()
+            if ahora - self._ultimo_refresco >= self.intervalo:
+                self._ultimo_refresco = ahora
+                self._escribir(ahora)
+
+    def terminar(self):
+        """Muestra el estado final y deja la consola en una línea nueva"""
+        with self._candado:
+            if self.modo != "barra":
+                return
+            if self.hechos:
+                self._escribir(time.perf_counter())
+            if self._linea_abierta:
+                print(file=self.flujo)
+                self._linea_abierta = False
+
+    def _escribir(self, ahora):
+        """Escribe la línea de progreso (llamar con el candado)"""
+        transcurrido = max(ahora - self._inicio, 1e-9)
+        velocidad = self.hechos / transcurrido
+        if self._costo_total:
+            fraccion = min(self._costo_hecho / self._costo_total, 1)
+            ritmo = self._costo_hecho / max(ahora - self._inicio_plan, 1e-9)
+            eta = formatear_duracion((self._costo_total - self._costo_hecho) / ritmo) if ritmo else "--:--"
+            texto = (f"⏳ {self.hechos}/{self.total} archivos ({fraccion:.0%} del trabajo)"
+                     f" | {velocidad:.1f} arch/s | restante {eta}")
+        elif self.contando:
+            texto = (f"⏳ {self.hechos}/{self.total}+ archivos | {velocidad:.1f} arch/s"
+                     " | recorriendo...")
+        elif self.total:
+            restantes = max(self.total - self.hechos, 0)
+            eta = formatear_duracion(restantes / velocidad) if velocidad else "--:--"
+            texto = (f"⏳ {self.hechos}/{self.total} archivos ({min(self.hechos / self.total, 1):.0%})"
+                     f" | {velocidad:.1f} arch/s | restante {eta}")
+        else:
+            texto = f"⏳ {self.hechos} archivos | {velocidad:.1f} arch/s"
+        if self.en_terminal:
+            # Sobrescribir la misma línea; los espacios borran restos de una línea más larga
+            self.flujo.write("\r" + texto.ljust(79))
+            self._linea_abierta = True
+        else:
+            self.flujo.write(texto + "\n")
+        self.flujo.flush()
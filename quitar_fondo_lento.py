@@ -5,6 +5,7 @@
 # 1. Asegúrate de tener Python instalado en tu sistema.
 # 2. Instala las librerías necesarias ejecutando en la terminal:
 #    >>> pip install rembg pillow
+#    (opcional, para leer fotos HEIC/AVIF directamente) >>> pip install pillow-heif
 #    >>> pip install onnxruntime
 #    >>> pip list | findstr -i "rembg onnxruntime pillow"
 #    >>> pip install rembg[gpu] pillow onnxruntime
@@ -16,13 +17,77 @@
 # 4. Selecciona la carpeta donde están tus imágenes o usa la carpeta por defecto
 # 5. El programa procesará todas las imágenes y les quitará el fondo
 # 6. Una vez finalizado, verás un resumen del total de imágenes procesadas
+#
+# USO SIN MENÚS (cron, tareas programadas):
+#    >>> python quitar_fondo_lento.py RUTA [--modelo u2net] [--prueba IMAGEN]
+#                                     [--lote N] [--eliminar-originales si|no] [--manifiesto] [--yes]
+#                                     [--cache [CARPETA]] [--cache-max-mb MB] [--cache-enlazar]
+#                                     [--metricas ARCHIVO.jsonl|ARCHIVO.prom]
+#                                     [--consola barra|detalle|silencio] [-q] [--memoria-mb MB]
+#                                     [--mascara-rapida] [--formato png|webp|webp_perdida|avif] [--calidad N]
+#                                     [--lecturas K] [--escrituras N] [--sincronizar] [--papelera CARPETA]
+#                                     [--reparto RONDA] [--nodo NOMBRE] [--vencimiento SEGUNDOS]
+#                                     [--duplicados informe|representante] [--distancia-duplicados N]
+#                                     [--huella phash|dhash] [--informe-duplicados ARCHIVO.json]
+#    Con una ruta o con --yes no se hace ninguna pregunta ni pausa final.
+#    Código de salida: 0 si todo fue bien, 1 si hubo errores, 130 si se canceló.
+#    Con --cache las fotos repetidas (mismo contenido y modelo, en cualquier carpeta
+#    o ejecución) no vuelven a pasar por el modelo: se enlazan desde la caché.
 
 import os
 import sys
-from PIL import Image
-import tkinter as tk
-from tkinter import filedialog, messagebox
-from rembg import remove
+import argparse
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image, ImageChops, ImageOps
+from rembg import remove, new_session
+from manifiesto import Manifiesto
+from pipeline import procesar_en_pipeline, leer_bytes, escribir_bytes, SincronizacionEnGrupo
+from escaner import recorrer_carpetas, existe
+from cache_resultados import CacheResultados, CARPETA_POR_DEFECTO as CARPETA_CACHE
+from metricas import Metricas, cronometrar
+from progreso import Progreso, MODOS as MODOS_CONSOLA
+from memoria import pixeles_en_cabecera, presupuesto_pixeles
+from decodificadores import EXTENSIONES_IMAGEN, abrir_imagen, registrar_decodificadores, tiene_convertida
+from formatos_salida import FORMATOS_SALIDA, comprobar_formato, opciones_formato, codificar
+from retiro_originales import RetiroOriginales, comprobar_papelera
+from reparto import Reparto, MAX_INTENTOS, VENCIMIENTO as VENCIMIENTO_REPARTO
+from duplicados import Duplicados, MODOS as MODOS_DUPLICADOS, MINIATURAS, DISTANCIA_POR_DEFECTO
+
+# Sesiones de rembg (ONNX) ya creadas, una por modelo. Crear una sesión
+# carga el modelo completo, así que se hace una sola vez por proceso.
+_sesiones = {}
+_candado_sesiones = threading.Lock()
+
+# Carpeta usada por la opción "por defecto" del menú y por --yes sin ruta
+RUTA_POR_DEFECTO = os.path.join(os.path.expanduser("~"), "Downloads", "IMAGENES_FONDO")
+
+# Modelos ofrecidos en el menú, en el mismo orden
+MODELOS = ["u2net", "u2net_human_seg", "u2net_cloth_seg", "isnet-general-use", "silueta"]
+
+# Preprocesado (media, desviación, tamaño de entrada) de los modelos que admiten
+# inferencia por lotes; son los mismos valores que usa rembg internamente.
+# u2net_cloth_seg devuelve varias máscaras por imagen y se procesa de una en una.
+PREPROCESADO_LOTES = {
+    "u2net": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "u2net_human_seg": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "silueta": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "isnet-general-use": ((0.485, 0.456, 0.406), (1.0, 1.0, 1.0), (1024, 1024)),
+}
+
+# Modelos cuyo ONNX resultó tener el tamaño de lote fijo en 1
+_sin_lotes = set()
+
+# Máscara rápida: la inferencia y el filtro guiado trabajan sobre una copia reducida
+# (lado mayor de entre LADO_GUIA y el doble) y a resolución completa solo se amplía
+# la máscara. EPSILON_GUIADO controla cuánto sigue la máscara los bordes de la foto.
+LADO_GUIA = 1024
+EPSILON_GUIADO = 1e-4
+
+# Salida de una imagen cuando se usa la caché: png=None significa que ya estaba en ella
+DesdeCache = namedtuple("DesdeCache", "clave png")
 
 def verificar_dependencias():
     """Verifica que las librerías necesarias estén instaladas"""
@@ -40,7 +105,7 @@ def verificar_dependencias():
 def obtener_ruta_base():
     """Obtiene la ruta base donde buscar imágenes"""
     # Opción 1: Carpeta por defecto en Descargas
-    ruta_por_defecto = os.path.join(os.path.expanduser("~"), "Downloads", "IMAGENES_FONDO")
+    ruta_por_defecto = RUTA_POR_DEFECTO
     
     print("🔍 Opciones para seleccionar carpeta:")
     print("1. Usar carpeta por defecto (Descargas/IMAGENES_FONDO)")
@@ -70,6 +135,10 @@ def obtener_ruta_base():
         
         elif opcion == "2":
             try:
+                # tkinter solo se importa cuando de verdad se abre el diálogo
+                import tkinter as tk
+                from tkinter import filedialog
+                
                 # Crear ventana de diálogo para seleccionar carpeta
                 root = tk.Tk()
                 root.withdraw()  # Ocultar ventana principal
@@ -99,6 +168,254 @@ def obtener_ruta_base():
         else:
             print("❌ Opción inválida. Elige 1, 2, 3 o 4.")
 
+def obtener_sesion(modelo="u2net"):
+    """Devuelve la sesión del modelo indicado, creándola solo la primera vez"""
+    with _candado_sesiones:
+        sesion = _sesiones.get(modelo)
+        if sesion is None:
+            print(f"⏳ Cargando modelo '{modelo}'...")
+            sesion = new_session(modelo)
+            _sesiones[modelo] = sesion
+        return sesion
+
+def preparar_entrada(img, media, desviacion, tamano):
+    """Normaliza una imagen al formato de entrada del modelo (1, 3, alto, ancho)"""
+    arreglo = np.asarray(img.convert("RGB").resize(tamano, Image.Resampling.LANCZOS), dtype=np.float32)
+    arreglo /= max(float(arreglo.max()), 1e-6)
+    arreglo = (arreglo - np.array(media, dtype=np.float32)) / np.array(desviacion, dtype=np.float32)
+    return arreglo.transpose((2, 0, 1))[np.newaxis]
+
+def inferir_lote(sesion, modelo, entrada):
+    """Ejecuta el modelo ONNX sobre un lote; si el modelo no admite lotes, va de uno en uno"""
+    onnx = sesion.inner_session
+    nombre_entrada = onnx.get_inputs()[0].name
+    if modelo not in _sin_lotes and len(entrada) > 1:
+        try:
+            return onnx.run(None, {nombre_entrada: entrada})[0]
+        except Exception:
+            # Dimensión de lote fija en el ONNX: recordar y seguir sin lotes
+            _sin_lotes.add(modelo)
+    return np.concatenate([onnx.run(None, {nombre_entrada: fila[np.newaxis]})[0] for fila in entrada])
+
+def filtro_caja(arreglo, radio):
+    """Media de cada píxel en una ventana de (2*radio+1)^2, recortada en los bordes"""
+    suma = arreglo
+    cuentas = []
+    for eje in (0, 1):
+        largo = arreglo.shape[eje]
+        acumulado = np.cumsum(suma, axis=eje, dtype=np.float64)
+        acumulado = np.insert(acumulado, 0, 0.0, axis=eje)
+        posiciones = np.arange(largo)
+        hasta = np.minimum(posiciones + radio + 1, largo)
+        desde = np.maximum(posiciones - radio, 0)
+        suma = np.take(acumulado, hasta, axis=eje) - np.take(acumulado, desde, axis=eje)
+        cuentas.append(hasta - desde)
+    return (suma / np.outer(cuentas[0], cuentas[1])).astype(np.float32)
+
+def ampliar_mascara(mascara, guia, img):
+    """Lleva la máscara del modelo al tamaño de 'img' ajustada a los bordes de la foto
+
+    La máscara se refina con un filtro guiado (He et al.) usando como guía la copia
+    reducida de la foto, así sigue sus bordes reales en lugar de los de la salida
+    de 320x320 del modelo; después solo se amplía un canal (BILINEAR) al tamaño
+    completo, sin tocar los píxeles de la foto a resolución completa.
+    """
+    gris = np.asarray(guia.convert("L"), dtype=np.float32) / 255
+    entrada = np.asarray(mascara.resize(guia.size, Image.Resampling.BILINEAR), dtype=np.float32) / 255
+    radio = max(2, max(guia.size) // 256)
+    media_gris = filtro_caja(gris, radio)
+    media_entrada = filtro_caja(entrada, radio)
+    covarianza = filtro_caja(gris * entrada, radio) - media_gris * media_entrada
+    varianza = filtro_caja(gris * gris, radio) - media_gris * media_gris
+    a = covarianza / (varianza + EPSILON_GUIADO)
+    b = media_entrada - a * media_gris
+    refinada = filtro_caja(a, radio) * gris + filtro_caja(b, radio)
+    refinada = Image.fromarray((np.clip(refinada, 0, 1) * 255 + 0.5).astype(np.uint8), mode="L")
+    return refinada.resize(img.size, Image.Resampling.BILINEAR)
+
+def quitar_fondo_lote(sesion, modelo, contenidos, tiempos=None, mascara_rapida=False):
+    """Quita el fondo de varias imágenes (bytes ya leídos) con una sola inferencia
+
+    Devuelve, en el mismo orden, una imagen RGBA o la excepción de cada archivo.
+    Si un elemento de 'contenidos' ya es una excepción (p. ej. error de lectura), se conserva;
+    si ya es una imagen de Pillow, se usa tal cual sin volver a decodificar.
+    Si se pasa 'tiempos', se le suman los segundos de cada etapa y los píxeles.
+    Con 'mascara_rapida' el modelo y el posprocesado trabajan sobre una copia
+    reducida y la máscara se amplía con ampliar_mascara() en vez de LANCZOS.
+    """
+    if tiempos is None:
+        tiempos = {}
+    media, desviacion, tamano = PREPROCESADO_LOTES[modelo]
+    resultados = [None] * len(contenidos)
+    imagenes = []
+    # Decodificar (corrigiendo la orientación EXIF como hace rembg)
+    with cronometrar(tiempos, "decodificacion"):
+        for indice, datos in enumerate(contenidos):
+            if isinstance(datos, Exception):
+                resultados[indice] = datos
+                continue
+            try:
+                if isinstance(datos, Image.Image):
+                    # Ya decodificada por otra etapa (flujo_completo.py)
+                    imagenes.append((indice, datos if datos.mode == "RGB" else datos.convert("RGB")))
+                    continue
+                with abrir_imagen(datos) as img:
+                    imagenes.append((indice, ImageOps.exif_transpose(img).convert("RGB")))
+            except Exception as e:
+                resultados[indice] = e
+    if not imagenes:
+        return resultados
+    tiempos["pixeles"] = tiempos.get("pixeles", 0) + sum(img.width * img.height for _, img in imagenes)
+    with cronometrar(tiempos, "transformacion"):
+        if mascara_rapida:
+            # reduce() promedia bloques: mucho más barato que LANCZOS sobre la foto completa
+            guias = [img.reduce(max(1, max(img.size) // LADO_GUIA)) for _, img in imagenes]
+        else:
+            guias = [img for _, img in imagenes]
+        try:
+            entrada = np.concatenate([preparar_entrada(guia, media, desviacion, tamano) for guia in guias])
+            predicciones = inferir_lote(sesion, modelo, entrada)[:, 0, :, :]
+        except Exception as e:
+            for indice, _ in imagenes:
+                resultados[indice] = e
+            return resultados
+        # Postprocesar cada máscara y aplicarla a la imagen a resolución completa
+        for (indice, img), guia, prediccion in zip(imagenes, guias, predicciones):
+            minimo, maximo = prediccion.min(), prediccion.max()
+            prediccion = (prediccion - minimo) / max(maximo - minimo, 1e-6)
+            mascara = Image.fromarray((prediccion * 255).astype(np.uint8), mode="L")
+            if mascara_rapida:
+                mascara = ampliar_mascara(mascara, guia, img)
+            else:
+                mascara = mascara.resize(img.size, Image.Resampling.LANCZOS)
+            # Igual que componer sobre una imagen vacía (color y alfa por la máscara),
+            # pero sin crear dos RGBA más
+            recortada = ImageChops.multiply(img, Image.merge("RGB", (mascara, mascara, mascara)))
+            recortada.putalpha(mascara)
+            resultados[indice] = recortada
+    return resultados
+
+def leer_lote(lote, leer=leer_bytes):
+    """Lee los bytes de cada imagen del lote con leer(ruta); un error de lectura queda en su posición"""
+    contenidos = []
+    for _, ruta_completa, _ in lote:
+        try:
+            contenidos.append(leer(ruta_completa))
+        except Exception as e:
+            contenidos.append(e)
+    return contenidos
+
+def quitar_fondo_contenidos(sesion, modelo, contenidos, tamano_lote=1, cache=None, mascara_rapida=False,
+                            formato="png", opciones=None):
+    """Quita el fondo de imágenes ya leídas; devuelve (bytes o excepción de cada una, métricas)
+
+    Con 'cache' solo se infieren las imágenes que no están en ella, y cada salida
+    correcta se devuelve como DesdeCache (con png=None si ya estaba guardada).
+    Con 'mascara_rapida' (o lotes) se usa quitar_fondo_lote() en lugar de rembg.
+    Las salidas se codifican en 'formato' con 'opciones' (ver formatos_salida.py).
+    """
+    tiempos = {"bytes_entrada": sum(len(datos) for datos in contenidos if not isinstance(datos, Exception))}
+    if cache is not None:
+        # El modo entra en la clave: lotes y rembg no dan exactamente los mismos píxeles
+        modo = "rapida" if mascara_rapida else "lotes" if tamano_lote > 1 else "rembg"
+        claves = [None] * len(contenidos)
+        salidas = list(contenidos)
+        pendientes = []
+        for indice, datos in enumerate(contenidos):
+            if isinstance(datos, Exception):
+                continue
+            if formato == "png":
+                claves[indice] = cache.clave(datos, modelo, modo)
+            else:
+                claves[indice] = cache.clave(datos, modelo, modo, formato, sorted(opciones.items()))
+            if cache.contiene(claves[indice]):
+                salidas[indice] = DesdeCache(claves[indice], None)
+            else:
+                pendientes.append(indice)
+        if pendientes:
+            nuevas, tiempos_inferencia = quitar_fondo_contenidos(
+                sesion, modelo, [contenidos[indice] for indice in pendientes], tamano_lote,
+                mascara_rapida=mascara_rapida, formato=formato, opciones=opciones)
+            tiempos_inferencia.pop("bytes_entrada")
+            tiempos.update(tiempos_inferencia)
+            for indice, salida in zip(pendientes, nuevas):
+                salidas[indice] = salida if isinstance(salida, Exception) else DesdeCache(claves[indice], salida)
+        return salidas, tiempos
+    salidas = []
+    if tamano_lote > 1 or mascara_rapida:
+        for resultado in quitar_fondo_lote(sesion, modelo, contenidos, tiempos, mascara_rapida):
+            if isinstance(resultado, Exception):
+                salidas.append(resultado)
+                continue
+            with cronometrar(tiempos, "codificacion"):
+                salidas.append(codificar(resultado, formato, opciones))
+    else:
+        for datos in contenidos:
+            try:
+                if isinstance(datos, Exception):
+                    raise datos
+                # Solo la cabecera, para contar píxeles sin decodificar dos veces
+                with abrir_imagen(datos) as img:
+                    tiempos["pixeles"] = tiempos.get("pixeles", 0) + img.width * img.height
+                # Quitar fondo usando rembg con la sesión ya cargada (decodifica, infiere y codifica)
+                with cronometrar(tiempos, "transformacion"):
+                    if formato == "png":
+                        salidas.append(remove(datos, session=sesion))
+                        continue
+                    # Otro formato: rembg devuelve la imagen y se codifica aquí
+                    with abrir_imagen(datos) as img:
+                        recortada = remove(img, session=sesion)
+                with cronometrar(tiempos, "codificacion"):
+                    salidas.append(codificar(recortada, formato, opciones))
+            except Exception as e:
+                salidas.append(e)
+    tiempos["bytes_salida"] = sum(len(salida) for salida in salidas if isinstance(salida, bytes))
+    return salidas, tiempos
+
+def recalcular_salida(sesion, modelo, ruta_completa, tamano_lote=1, mascara_rapida=False, formato="png",
+                      opciones=None):
+    """Vuelve a leer e inferir una imagen; devuelve los bytes de la salida"""
+    salida = quitar_fondo_contenidos(sesion, modelo, [leer_bytes(ruta_completa)], tamano_lote,
+                                     mascara_rapida=mascara_rapida, formato=formato, opciones=opciones)[0][0]
+    if isinstance(salida, Exception):
+        raise salida
+    return salida
+
+def escribir_lote(lote, salida_lote, cache=None, sincronizacion=None, recalcular=None):
+    """Guarda las salidas del lote; devuelve (error o None de cada imagen, métricas del lote)
+
+    recalcular(ruta) -> bytes: si otra ejecución borró de la caché un resultado
+    después de encontrarlo, se infiere de nuevo en lugar de dar un error.
+    """
+    salidas, tiempos = salida_lote
+    errores = []
+    for (_, ruta_completa, salida_sin_fondo), salida in zip(lote, salidas):
+        try:
+            if isinstance(salida, Exception):
+                raise salida
+            if isinstance(salida, DesdeCache) and salida.png is None:
+                try:
+                    # Ya calculada antes: enlace duro (o copia) desde la caché
+                    cache.servir(salida.clave, salida_sin_fondo, sincronizacion)
+                except FileNotFoundError:
+                    if recalcular is None:
+                        raise
+                    salida = DesdeCache(salida.clave, recalcular(ruta_completa))
+            if isinstance(salida, DesdeCache):
+                if salida.png is not None:
+                    escribir_bytes(salida_sin_fondo, salida.png, sincronizacion)
+                    try:
+                        cache.guardar(salida.clave, salida.png)
+                    except OSError as e:
+                        # La salida ya está escrita: un fallo de la caché no es un error
+                        print(f"⚠️  No se pudo guardar en la caché: {e}")
+            else:
+                escribir_bytes(salida_sin_fondo, salida, sincronizacion)
+            errores.append(None)
+        except Exception as e:
+            errores.append(e)
+    return errores, tiempos
+
 def seleccionar_modelo():
     """Permite al usuario elegir el modelo de eliminación de fondo"""
     print("\n🤖 Modelos disponibles para eliminar fondo:")
@@ -108,13 +425,7 @@ def seleccionar_modelo():
     print("4. isnet-general-use - Modelo mejorado (más lento pero mejor calidad)")
     print("5. silueta - Para crear siluetas")
     
-    modelos = {
-        "1": "u2net",
-        "2": "u2net_human_seg", 
-        "3": "u2net_cloth_seg",
-        "4": "isnet-general-use",
-        "5": "silueta"
-    }
+    modelos = {str(numero): modelo for numero, modelo in enumerate(MODELOS, start=1)}
     
     while True:
         opcion = input("\nElige un modelo (1-5, recomendado: 1): ").strip()
@@ -124,72 +435,239 @@ def seleccionar_modelo():
         else:
             print("❌ Opción inválida. Elige 1, 2, 3, 4 o 5.")
 
-def quitar_fondo_imagenes(ruta_base, modelo="u2net"):
-    """Quita el fondo de todas las imágenes en la ruta especificada"""
+def quitar_fondo_imagenes(ruta_base, modelo="u2net", eliminar_originales=None,
+                          usar_manifiesto=False, tamano_lote=1, cache=None, ruta_metricas=None,
+                          consola="barra", memoria_mb=None, mascara_rapida=False, formato="png",
+                          calidad=None, lecturas=4, escrituras=2, sincronizar=False, papelera=None,
+                          reparto=None, duplicados=None, informe_duplicados=None):
+    """Quita el fondo de todas las imágenes en la ruta especificada
     
-    # Extensiones de imagen soportadas
-    extensiones_validas = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'}
+    eliminar_originales: None pregunta al usuario, True/False decide sin preguntar.
+    Cada original se retira en cuanto sus salidas están escritas y verificadas; con
+    'papelera' se mueve a esa carpeta (conservando las subcarpetas) en vez de borrarse.
+    reparto: Reparto opcional (ver reparto.py) para repartir el árbol entre varios
+    nodos; este nodo solo procesa las carpetas que alquila. Se cierra al terminar.
+    duplicados: Duplicados opcional (ver duplicados.py) que agrupa las casi
+    duplicadas de cada carpeta; en modo "representante" solo pasa por el modelo la
+    primera de cada grupo. informe_duplicados: archivo JSON donde guardar los grupos.
+    tamano_lote: imágenes por inferencia; con más de 1 se agrupan en una sola
+    llamada al modelo (solo en los modelos de PREPROCESADO_LOTES).
+    usar_manifiesto: decide qué procesar según el manifiesto de la carpeta
+    (archivos nuevos o modificados) en lugar de mirar si ya existe la salida.
+    cache: CacheResultados opcional; las imágenes repetidas (mismo contenido y
+    modelo) se sirven desde ella sin volver a ejecutar el modelo.
+    ruta_metricas: archivo donde exportar los tiempos por etapa (.prom para
+    Prometheus, cualquier otro nombre para líneas JSON).
+    consola: "barra" (progreso en una línea), "detalle" (una línea por archivo)
+    o "silencio" (solo el resumen).
+    memoria_mb: si se indica, limita los píxeles que se procesan a la vez
+    (ver memoria.py) para que el pico de memoria no dependa del tamaño de las fotos.
+    mascara_rapida: infiere sobre una copia reducida y amplía solo la máscara con
+    un filtro guiado (ver ampliar_mascara); solo en los modelos de PREPROCESADO_LOTES.
+    formato: formato de salida con transparencia (ver formatos_salida.py); calidad:
+    la del codificador (por defecto, la del formato).
+    lecturas, escrituras: archivos que se leen y se escriben a la vez (súbelos en
+    carpetas de red con mucha latencia). sincronizar: confirma cada salida en disco
+    (fsync) antes de darla por hecha.
+    Devuelve un diccionario con los contadores del proceso.
+    """
+    
+    # HEIC/AVIF se leen directamente si está pillow-heif (rembg usa los mismos decodificadores de Pillow)
+    registrar_decodificadores()
     
     # Contadores para estadísticas
     contador_procesadas = 0
     contador_errores = 0
     contador_omitidas = 0
+    contador_duplicadas = 0
     errores_detallados = []
+    metricas = Metricas("quitar_fondo_lento", ruta_metricas)
+    
+    # Preguntar antes de empezar si eliminar los originales (solo en modo interactivo)
+    if eliminar_originales is None:
+        eliminar = input("\n¿Deseas eliminar las imágenes originales a medida que se procesen? (s/n): ").strip().lower()
+        eliminar_originales = eliminar in ['s', 'sí', 'si', 'SI', 'Si', 'Sí', 'yes', 'y']
     
     print(f"\n🔄 Iniciando eliminación de fondos con modelo '{modelo}' en: {ruta_base}")
     print("⏳ Nota: La primera vez puede tardar más porque descarga el modelo...")
     print("=" * 60)
     
-    # Recorrer todas las carpetas y subcarpetas
-    for carpeta_actual, subcarpetas, archivos in os.walk(ruta_base):
-        
-        # Filtrar solo archivos de imagen
-        archivos_imagen = [archivo for archivo in archivos 
-            if os.path.splitext(archivo.lower())[1] in extensiones_validas]
-        
-        if archivos_imagen:
-            print(f"\n📁 Procesando carpeta: {carpeta_actual}")
-            print(f"   Imágenes encontradas: {len(archivos_imagen)}")
+    # Cargar el modelo una sola vez para todo el recorrido
+    sesion = obtener_sesion(modelo)
+    
+    progreso = Progreso(consola)
+    
+    # Los lotes solo aplican a modelos con preprocesado conocido
+    if tamano_lote > 1 and modelo not in PREPROCESADO_LOTES:
+        print(f"⚠️  El modelo '{modelo}' no admite lotes; se procesará de una en una")
+        tamano_lote = 1
+    if mascara_rapida and modelo not in PREPROCESADO_LOTES:
+        print(f"⚠️  El modelo '{modelo}' no admite la máscara rápida; se usa rembg")
+        mascara_rapida = False
+    
+    # Manifiesto opcional para re-ejecuciones incrementales
+    parametros = {"modelo": modelo}
+    if mascara_rapida:
+        parametros["mascara"] = "rapida"
+    opciones = opciones_formato(formato, calidad)
+    extension = FORMATOS_SALIDA[formato].extension
+    if formato != "png":
+        parametros["formato"] = formato
+        parametros["opciones"] = opciones
+    manifiesto = Manifiesto(ruta_base, "quitar_fondo_lento", reparto is not None) if usar_manifiesto else None
+    retiro = RetiroOriginales(ruta_base, papelera, progreso.detalle) if eliminar_originales else None
+    # Un original solo se retira cuando sus salidas ya están en disco
+    sincronizacion = SincronizacionEnGrupo() if sincronizar or retiro is not None else None
+    
+    # La inferencia usa la sesión compartida y ONNX ya reparte cada inferencia entre
+    # los núcleos, así que bastan 2 hilos; buscar_lotes() también los usa para las
+    # huellas de duplicados
+    ejecutor = ThreadPoolExecutor(max_workers=2)
+    
+    def buscar_lotes():
+        """Genera lotes de imágenes pendientes a medida que se recorre el árbol"""
+        nonlocal contador_omitidas, contador_duplicadas
+        lote = []
         
-        for archivo in archivos_imagen:
-            # Omitir archivos que ya tienen el fondo removido
-            if "_sin_fondo" in archivo:
-                continue
-                
-            ruta_completa = os.path.join(carpeta_actual, archivo)
-            nombre_base, extension = os.path.splitext(archivo)
+        # Recorrer todas las carpetas y subcarpetas
+        carpetas = recorrer_carpetas(ruta_base) if reparto is None else reparto.recorrer()
+        if reparto is None:
+            # Con reparto este nodo solo hace una parte: el total del árbol no serviría
+            carpetas = progreso.contar(carpetas, lambda nombre, nombres: os.path.splitext(nombre.lower())[1]
+                                       in EXTENSIONES_IMAGEN and "_sin_fondo" not in nombre
+                                       and not tiene_convertida(nombres, nombre))
+        for carpeta_actual, archivos, nombres in metricas.escaneo(carpetas):
             
-            # Siempre guardar como PNG para mantener transparencia
-            salida_sin_fondo = os.path.join(carpeta_actual, f"{nombre_base}_sin_fondo.png")
+            # Filtrar solo archivos de imagen
+            archivos_imagen = [entrada for entrada in archivos 
+                if os.path.splitext(entrada.name.lower())[1] in EXTENSIONES_IMAGEN]
             
-            # Verificar si ya existe el archivo sin fondo
-            if os.path.exists(salida_sin_fondo):
-                print(f"⚠️  Ya existe: {nombre_base}_sin_fondo.png (omitiendo)")
-                contador_omitidas += 1
-                continue
+            if archivos_imagen:
+                progreso.detalle(f"\n📁 Procesando carpeta: {carpeta_actual}")
+                progreso.detalle(f"   Imágenes encontradas: {len(archivos_imagen)}")
             
-            try:
-                print(f"🔄 Procesando: {archivo}...")
+            candidatas = []
+            pendientes = []
+            for entrada in archivos_imagen:
+                archivo = entrada.name
+                
+                # Omitir archivos que ya tienen el fondo removido
+                if "_sin_fondo" in archivo:
+                    continue
                 
-                # Leer imagen
-                with open(ruta_completa, 'rb') as input_file:
-                    input_data = input_file.read()
+                # Un HEIC ya convertido se procesa a través de su versión convertida
+                if tiene_convertida(nombres, archivo):
+                    continue
+                candidatas.append(entrada.path)
+                    
+                nombre_base = os.path.splitext(archivo)[0]
                 
-                # Quitar fondo usando rembg
-                output_data = remove(input_data)
+                # Siempre en un formato con transparencia (PNG por defecto)
+                nombre_salida = f"{nombre_base}_sin_fondo{extension}"
                 
-                # Guardar imagen sin fondo
-                with open(salida_sin_fondo, 'wb') as output_file:
-                    output_file.write(output_data)
+                if manifiesto is not None:
+                    # Omitir solo si el manifiesto dice que no cambió
+                    if not manifiesto.necesita_proceso(entrada.path, parametros, entrada, nombres):
+                        progreso.detalle(f"⚠️  Sin cambios: {archivo} (omitiendo)")
+                        progreso.avanzar()
+                        contador_omitidas += 1
+                        continue
                 
-                contador_procesadas += 1
-                print(f"✅ {archivo} → {nombre_base}_sin_fondo.png")
+                # Verificar si ya existe el archivo sin fondo (sin consultar al disco)
+                elif existe(nombres, nombre_salida):
+                    progreso.detalle(f"⚠️  Ya existe: {nombre_salida} (omitiendo)")
+                    progreso.avanzar()
+                    contador_omitidas += 1
+                    continue
                 
-            except Exception as e:
+                pendientes.append((archivo, entrada.path, os.path.join(carpeta_actual, nombre_salida)))
+            
+            # Huellas de toda la carpeta (también de las ya hechas, para que los grupos no cambien)
+            copias = duplicados.agrupar(candidatas, ejecutor) if duplicados is not None and pendientes else {}
+            for imagen in pendientes:
+                if imagen[1] in copias:
+                    progreso.detalle(f"🔁 {imagen[0]} es casi igual a {os.path.basename(copias[imagen[1]])}")
+                    if duplicados.solo_representantes:
+                        progreso.avanzar()
+                        contador_duplicadas += 1
+                        continue
+                lote.append(imagen)
+                if len(lote) == tamano_lote:
+                    yield lote
+                    lote = []
+            
+            # Con reparto cada lote de imágenes es de una sola carpeta (ver Reparto.tareas)
+            if reparto is not None and lote:
+                yield lote
+                lote = []
+        
+        if lote:
+            yield lote
+    
+    # Procesar en lotes (tamano_lote=1 es el modo de siempre) a medida que se
+    # encuentran. La lectura y la escritura van en hilos aparte
+    resultados = procesar_en_pipeline(
+        buscar_lotes() if reparto is None else reparto.tareas(buscar_lotes()),
+        # Con manifiesto la lectura también calcula el hash de lo que se procesa
+        leer=leer_lote if manifiesto is None else lambda lote: leer_lote(lote, manifiesto.leer_origen),
+        transformar=lambda lote, contenidos: quitar_fondo_contenidos(
+            sesion, modelo, contenidos, tamano_lote, cache, mascara_rapida, formato, opciones),
+        escribir=lambda lote, salidas: escribir_lote(
+            lote, salidas, cache, sincronizacion,
+            recalcular=lambda ruta: recalcular_salida(sesion, modelo, ruta, tamano_lote, mascara_rapida,
+                                                      formato, opciones)),
+        ejecutor_cpu=ejecutor,
+        hilos_lectura=lecturas,
+        hilos_escritura=escrituras,
+        max_en_vuelo=max(4, lecturas),
+        con_tiempos=True,
+        costo=lambda lote, contenidos: sum(pixeles_en_cabecera(datos) for datos in contenidos
+                                           if not isinstance(datos, Exception)),
+        presupuesto=presupuesto_pixeles(memoria_mb, "quitar_fondo_lento") if memoria_mb else None,
+    )
+    try:
+        for lote, resultado_lote, error, tiempos in resultados:
+            if resultado_lote is None:
+                resultado_lote = ([error] * len(lote), {})
+            errores_lote, tiempos_lote = resultado_lote
+            # Un registro por lote (con tamano_lote=1, uno por imagen)
+            metricas.registrar(lote[0][1], dict(tiempos, **tiempos_lote), archivos=len(lote))
+            for (archivo, ruta_completa, salida_sin_fondo), error_imagen in zip(lote, errores_lote):
+                if manifiesto is not None:
+                    estado, hash_origen = manifiesto.tomar_lectura(ruta_completa)
+                if error_imagen is None:
+                    if manifiesto is not None:
+                        manifiesto.registrar(ruta_completa, salida_sin_fondo, parametros, hash_origen, estado)
+                    
+                    contador_procesadas += 1
+                    progreso.detalle(f"✅ {archivo} → {os.path.basename(salida_sin_fondo)}")
+                    if retiro is not None:
+                        retiro.retirar(ruta_completa, [salida_sin_fondo])
+                else:
+                    contador_errores += 1
+                    error_msg = f"❌ Error con {archivo}: {str(error_imagen)}"
+                    progreso.detalle(error_msg)
+                    errores_detallados.append(error_msg)
+            if reparto is not None:
+                reparto.procesado()
+            progreso.avanzar(len(lote))
+    finally:
+        progreso.terminar()
+        resultados.close()
+        ejecutor.shutdown(cancel_futures=True)
+        if retiro is not None:
+            retiro.vaciar()
+        if reparto is not None:
+            reparto.cerrar()
+            for carpeta in reparto.carpetas_con_error:
                 contador_errores += 1
-                error_msg = f"❌ Error con {archivo}: {str(e)}"
-                print(error_msg)
-                errores_detallados.append(error_msg)
+                errores_detallados.append(f"❌ Carpeta abandonada en el reparto tras {MAX_INTENTOS} intentos: {carpeta}")
+        if duplicados is not None:
+            duplicados.cerrar()
+        metricas.cerrar()
+    
+    if manifiesto is not None:
+        manifiesto.cerrar()
     
     # Mostrar resumen final
     print("\n" + "=" * 60)
@@ -199,7 +677,20 @@ def quitar_fondo_imagenes(ruta_base, modelo="u2net"):
     print(f"⚠️  Imágenes omitidas (ya existían): {contador_omitidas}")
     print(f"❌ Errores encontrados: {contador_errores}")
     print(f"📁 Carpeta procesada: {ruta_base}")
+    if retiro is not None:
+        retiro.imprimir_resumen()
+    if reparto is not None:
+        print(f"🖧  Nodo {reparto.nodo}: {reparto.lotes_tomados} carpetas de la ronda '{reparto.ronda}'")
+    if duplicados is not None:
+        duplicados.imprimir_resumen(ruta_base)
+        if informe_duplicados:
+            duplicados.guardar_informe(informe_duplicados, ruta_base)
+            print(f"📝 Grupos guardados en: {informe_duplicados}")
     print(f"🤖 Modelo usado: {modelo}")
+    if cache is not None:
+        print(f"💾 Caché: {cache.aciertos} aciertos, {cache.fallos} fallos ({cache.carpeta})")
+    if contador_procesadas > 0:
+        metricas.imprimir_resumen()
     
     if errores_detallados:
         print("\n📋 DETALLES DE ERRORES:")
@@ -208,38 +699,34 @@ def quitar_fondo_imagenes(ruta_base, modelo="u2net"):
     
     if contador_procesadas > 0:
         print(f"\n🎉 ¡Proceso completado exitosamente!")
-        print(f"💡 Las imágenes sin fondo se guardaron en formato PNG para mantener la transparencia")
-        
-        # Preguntar si eliminar archivos originales
-        eliminar = input("\n¿Deseas eliminar las imágenes originales? (s/n): ").strip().lower()
-        if eliminar in ['s', 'sí', 'si', 'SI', 'Si', 'Sí', 'yes', 'y']:
-            eliminar_imagenes_originales(ruta_base)
+        print(f"💡 Las imágenes sin fondo se guardaron en formato {formato.upper()} para mantener la transparencia")
     else:
         print("\n🤷 No se encontraron imágenes para procesar.")
+    
+    return {"procesadas": contador_procesadas, "omitidas": contador_omitidas,
+            "duplicadas": contador_duplicadas, "errores": contador_errores}
 
-def eliminar_imagenes_originales(ruta_base):
-    """Elimina todas las imágenes originales después de quitar el fondo"""
-    contador_eliminadas = 0
-    extensiones_validas = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'}
+def procesar_imagen_prueba(archivo_prueba, modelo="u2net"):
+    """Quita el fondo de una sola imagen y devuelve la ruta del resultado"""
+    print(f"🔄 Procesando imagen de prueba: {os.path.basename(archivo_prueba)}")
     
-    print(f"\n🗑️  Eliminando imágenes originales...")
+    with open(archivo_prueba, 'rb') as input_file:
+        input_data = input_file.read()
     
-    for carpeta_actual, subcarpetas, archivos in os.walk(ruta_base):
-        for archivo in archivos:
-            if os.path.splitext(archivo.lower())[1] in extensiones_validas:
-                # Verificar que NO sea una imagen sin fondo
-                if "_sin_fondo" not in archivo:
-                    ruta_completa = os.path.join(carpeta_actual, archivo)
-                    try:
-                        os.remove(ruta_completa)
-                        contador_eliminadas += 1
-                        print(f"🗑️  Eliminado: {archivo}")
-                    except Exception as e:
-                        print(f"❌ Error al eliminar {archivo}: {e}")
+    registrar_decodificadores()
+    output_data = remove(input_data, session=obtener_sesion(modelo))
     
-    print(f"\n✅ Imágenes originales eliminadas: {contador_eliminadas}")
+    carpeta_original = os.path.dirname(archivo_prueba)
+    nombre_base = os.path.splitext(os.path.basename(archivo_prueba))[0]
+    salida_prueba = os.path.join(carpeta_original, f"{nombre_base}_PRUEBA_sin_fondo.png")
+    
+    with open(salida_prueba, 'wb') as output_file:
+        output_file.write(output_data)
+    
+    print(f"✅ Imagen de prueba creada: {salida_prueba}")
+    return salida_prueba
 
-def crear_imagen_prueba():
+def crear_imagen_prueba(modelo="u2net"):
     """Crea una imagen de prueba para verificar que funciona"""
     print("\n🧪 ¿Deseas crear una imagen de prueba primero?")
     print("Esto te permitirá ver cómo funciona antes de procesar todas tus imágenes.")
@@ -247,6 +734,10 @@ def crear_imagen_prueba():
     crear = input("¿Crear imagen de prueba? (s/n): ").strip().lower()
     if crear in ['s', 'sí', 'si', 'SI', 'Si', 'Sí', 'yes', 'y']:
         try:
+            # tkinter solo se importa cuando de verdad se abre el diálogo
+            import tkinter as tk
+            from tkinter import filedialog
+            
             root = tk.Tk()
             root.withdraw()
             
@@ -258,21 +749,7 @@ def crear_imagen_prueba():
             root.destroy()
             
             if archivo_prueba:
-                print(f"🔄 Procesando imagen de prueba: {os.path.basename(archivo_prueba)}")
-                
-                with open(archivo_prueba, 'rb') as input_file:
-                    input_data = input_file.read()
-                
-                output_data = remove(input_data)
-                
-                carpeta_original = os.path.dirname(archivo_prueba)
-                nombre_base = os.path.splitext(os.path.basename(archivo_prueba))[0]
-                salida_prueba = os.path.join(carpeta_original, f"{nombre_base}_PRUEBA_sin_fondo.png")
-                
-                with open(salida_prueba, 'wb') as output_file:
-                    output_file.write(output_data)
-                
-                print(f"✅ Imagen de prueba creada: {salida_prueba}")
+                procesar_imagen_prueba(archivo_prueba, modelo)
                 print(f"💡 Abre el archivo para ver el resultado antes de continuar")
                 
                 continuar = input("\n¿Continuar con el procesamiento masivo? (s/n): ").strip().lower()
@@ -287,44 +764,244 @@ def crear_imagen_prueba():
     
     return True
 
-def main():
-    """Función principal"""
+def construir_parser():
+    """Define los argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Quita el fondo de todas las imágenes de una carpeta (incluye subcarpetas)."
+    )
+    parser.add_argument(
+        "ruta", nargs="?",
+        help="Carpeta raíz a procesar. Si se omite (y no se usa --yes) se muestra el menú."
+    )
+    parser.add_argument(
+        "-m", "--modelo", choices=MODELOS, default=None,
+        help="Modelo de rembg a usar (por defecto sin menú: u2net)."
+    )
+    parser.add_argument(
+        "-l", "--lote", type=int, default=1,
+        help="Imágenes por inferencia del modelo (por defecto: 1, sin lotes)."
+    )
+    parser.add_argument(
+        "--mascara-rapida", action="store_true",
+        help="Infiere sobre una copia reducida y amplía solo la máscara siguiendo los bordes (más rápido en fotos grandes)."
+    )
+    parser.add_argument(
+        "--formato", choices=sorted(nombre for nombre, formato in FORMATOS_SALIDA.items() if formato.transparencia),
+        default="png",
+        help="Formato de las imágenes sin fondo: 'webp' (sin pérdida) suele ocupar mucho menos que PNG."
+    )
+    parser.add_argument(
+        "--calidad", type=int, choices=range(0, 101), default=None, metavar="0-100",
+        help="Calidad del codificador en webp_perdida y avif (en webp sin pérdida, el esfuerzo)."
+    )
+    parser.add_argument(
+        "--prueba", metavar="IMAGEN", default=None,
+        help="Procesa primero esta imagen de prueba (sin diálogo) antes del lote."
+    )
+    parser.add_argument(
+        "--eliminar-originales", choices=["si", "no", "preguntar"], default=None,
+        help="Eliminar cada original en cuanto sus salidas están escritas y verificadas (por defecto: 'no' sin menú, 'preguntar' con menú)."
+    )
+    parser.add_argument(
+        "--papelera", metavar="CARPETA", default=None,
+        help="Con --eliminar-originales, mueve los originales a esta carpeta (fuera de RUTA) en lugar de borrarlos."
+    )
+    parser.add_argument(
+        "--manifiesto", action="store_true",
+        help="Usa el manifiesto de la carpeta para procesar solo imágenes nuevas o modificadas."
+    )
+    parser.add_argument(
+        "--cache", nargs="?", const=CARPETA_CACHE, default=None, metavar="CARPETA",
+        help=f"Reutiliza resultados de imágenes repetidas guardados en CARPETA (por defecto: {CARPETA_CACHE})."
+    )
+    parser.add_argument(
+        "--cache-max-mb", type=int, default=5 * 1024,
+        help="Tamaño máximo de la caché; se borran los resultados usados hace más tiempo (por defecto: 5120)."
+    )
+    parser.add_argument(
+        "--cache-enlazar", action="store_true",
+        help="Sirve los resultados de la caché con enlaces duros en lugar de copias: ahorra espacio, "
+             "pero cada salida comparte el archivo con la caché y editarla cambia el resultado guardado."
+    )
+    parser.add_argument(
+        "--metricas", metavar="ARCHIVO", default=None,
+        help="Exporta los tiempos por etapa: ARCHIVO.prom para Prometheus, otro nombre para líneas JSON."
+    )
+    parser.add_argument(
+        "--memoria-mb", type=int, default=None,
+        help="Memoria aproximada para imágenes en curso; limita cuántas fotos grandes se procesan a la vez."
+    )
+    parser.add_argument(
+        "--lecturas", type=int, default=4,
+        help="Archivos que se leen por adelantado a la vez; súbelo (16-64) en carpetas de red con mucha latencia."
+    )
+    parser.add_argument(
+        "--escrituras", type=int, default=2,
+        help="Salidas que se escriben a la vez; súbelo en carpetas de red con mucha latencia."
+    )
+    parser.add_argument(
+        "--sincronizar", action="store_true",
+        help="Confirma cada salida en disco (fsync) antes de darla por hecha; los fsync de carpeta se agrupan."
+    )
+    parser.add_argument(
+        "--reparto", metavar="RONDA", default=None,
+        help="Reparte el árbol entre varias máquinas: las que usan la misma RONDA sobre la misma carpeta se dividen las carpetas."
+    )
+    parser.add_argument(
+        "--nodo", default=None,
+        help="Nombre de esta máquina en el reparto (por defecto: nombre del equipo y número de proceso)."
+    )
+    parser.add_argument(
+        "--vencimiento", type=int, default=VENCIMIENTO_REPARTO, metavar="SEGUNDOS",
+        help="Segundos sin noticias tras los que las carpetas de una máquina caída pasan a otra."
+    )
+    parser.add_argument(
+        "--duplicados", choices=MODOS_DUPLICADOS, default=None,
+        help="Agrupa las fotos casi iguales de cada carpeta: 'informe' solo las cuenta, 'representante' pasa una por grupo por el modelo."
+    )
+    parser.add_argument(
+        "--distancia-duplicados", type=int, choices=range(0, 33), default=DISTANCIA_POR_DEFECTO, metavar="0-32",
+        help=f"Bits distintos (de 64) hasta los que dos fotos son casi iguales (por defecto: {DISTANCIA_POR_DEFECTO})."
+    )
+    parser.add_argument(
+        "--huella", choices=sorted(MINIATURAS), default="phash",
+        help="Huella perceptual: 'phash' (más robusta) o 'dhash' (más barata)."
+    )
+    parser.add_argument(
+        "--informe-duplicados", metavar="ARCHIVO", default=None,
+        help="Con --duplicados, guarda los grupos encontrados en este archivo JSON."
+    )
+    parser.add_argument(
+        "--consola", choices=MODOS_CONSOLA, default="barra",
+        help="Salida por archivo: 'barra' (progreso y tiempo restante), 'detalle' (una línea por archivo) o 'silencio'."
+    )
+    parser.add_argument(
+        "-q", "--silencioso", dest="consola", action="store_const", const="silencio",
+        help="Igual que --consola silencio: sin barra ni líneas por archivo, solo el resumen."
+    )
+    parser.add_argument(
+        "-y", "--yes", action="store_true",
+        help="No preguntar nada: usa la carpeta por defecto si no hay ruta y la crea si no existe."
+    )
+    return parser
+
+def main(argv=None):
+    """Función principal; devuelve el código de salida"""
+    args = construir_parser().parse_args(argv)
+    
+    # Sin ruta ni --yes se mantiene el comportamiento interactivo de siempre
+    interactivo = args.ruta is None and not args.yes
+    if args.lote < 1:
+        print("❌ --lote debe ser 1 o mayor")
+        return 2
+    if args.cache_max_mb < 1:
+        print("❌ --cache-max-mb debe ser 1 o mayor")
+        return 2
+    if args.memoria_mb is not None and args.memoria_mb < 1:
+        print("❌ --memoria-mb debe ser 1 o mayor")
+        return 2
+    if args.lecturas < 1 or args.escrituras < 1:
+        print("❌ --lecturas y --escrituras deben ser 1 o mayor")
+        return 2
+    if args.vencimiento < 10:
+        print("❌ --vencimiento debe ser de al menos 10 segundos")
+        return 2
+    error_formato = comprobar_formato(args.formato, con_transparencia=True)
+    if error_formato:
+        print(f"❌ {error_formato}")
+        return 2
+    
     print("🎨 ELIMINADOR DE FONDOS DE IMÁGENES")
     print("=" * 45)
+    codigo_salida = 0
     
     # Verificar dependencias
     if not verificar_dependencias():
-        input("\nPresiona Enter para salir...")
-        return
+        if interactivo:
+            input("\nPresiona Enter para salir...")
+        return 1
     
     try:
-        # Crear imagen de prueba opcional
-        if not crear_imagen_prueba():
+        # Seleccionar modelo (se usa también en la imagen de prueba)
+        if args.modelo is not None:
+            modelo = args.modelo
+        elif interactivo:
+            modelo = seleccionar_modelo()
+        else:
+            modelo = "u2net"
+        
+        # Crear imagen de prueba opcional con el mismo modelo
+        if args.prueba:
+            procesar_imagen_prueba(args.prueba, modelo)
+        elif interactivo and not crear_imagen_prueba(modelo):
             print("👋 Proceso cancelado por el usuario.")
-            return
+            return 0
         
         # Obtener ruta base
-        ruta_base = obtener_ruta_base()
+        if interactivo:
+            ruta_base = obtener_ruta_base()
+        else:
+            ruta_base = args.ruta or RUTA_POR_DEFECTO
+            if args.yes and not os.path.exists(ruta_base):
+                os.makedirs(ruta_base, exist_ok=True)
+                print(f"✅ Carpeta creada: {ruta_base}")
         
         # Verificar que la ruta existe
         if not os.path.exists(ruta_base):
             print(f"❌ La ruta especificada no existe: {ruta_base}")
-            return
+            return 1
+        error_papelera = comprobar_papelera(ruta_base, args.papelera) if args.papelera else None
+        if error_papelera:
+            print(f"❌ {error_papelera}")
+            return 2
+        reparto = None
+        if args.reparto:
+            reparto = Reparto(ruta_base, "quitar_fondo_lento", args.reparto, args.nodo, args.vencimiento)
+        
+        # Política de borrado de originales
+        politica = args.eliminar_originales or ("preguntar" if interactivo else "no")
+        eliminar_originales = None if politica == "preguntar" else politica == "si"
         
-        # Seleccionar modelo
-        modelo = seleccionar_modelo()
+        # Agrupación opcional de fotos casi iguales (ráfagas, re-exportaciones)
+        duplicados = None
+        if args.duplicados:
+            duplicados = Duplicados(args.duplicados, args.distancia_duplicados, args.huella, ruta_base,
+                                    compartido=reparto is not None)
+        
+        # Caché opcional de resultados por contenido
+        cache = None
+        if args.cache:
+            cache = CacheResultados(args.cache, args.cache_max_mb * 1024 ** 2,
+                                    FORMATOS_SALIDA[args.formato].extension, args.cache_enlazar)
         
         # Iniciar eliminación de fondos
-        quitar_fondo_imagenes(ruta_base, modelo)
+        resumen = quitar_fondo_imagenes(ruta_base, modelo,
+                                        eliminar_originales=eliminar_originales,
+                                        usar_manifiesto=args.manifiesto, tamano_lote=args.lote,
+                                        cache=cache, ruta_metricas=args.metricas,
+                                        consola=args.consola, memoria_mb=args.memoria_mb,
+                                        mascara_rapida=args.mascara_rapida, formato=args.formato,
+                                        calidad=args.calidad, lecturas=args.lecturas,
+                                        escrituras=args.escrituras, sincronizar=args.sincronizar,
+                                        papelera=args.papelera, reparto=reparto,
+                                        duplicados=duplicados,
+                                        informe_duplicados=args.informe_duplicados)
+        if resumen["errores"]:
+            codigo_salida = 1
         
     except KeyboardInterrupt:
         print("\n\n⚠️  Proceso cancelado por el usuario.")
+        codigo_salida = 130
     except Exception as e:
         print(f"\n❌ Error inesperado: {e}")
         import traceback
         traceback.print_exc()
+        codigo_salida = 1
     finally:
-        input("\nPresiona Enter para salir...")
+        if interactivo:
+            input("\nPresiona Enter para salir...")
+    
+    return codigo_salida
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
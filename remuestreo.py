@@ -0,0 +1,96 @@
+# Remuestreo - Filtros para reducir imágenes y la política que elige uno por variante
+# Julio 2025 - Compartido por Cambiar_dimenciones.py y flujo_completo.py
+#
+# LANCZOS (el de siempre) es el filtro más fino de Pillow y también el más caro:
+# cada píxel de salida mezcla 6 vecinos por eje a la escala de la entrada. En una
+# miniatura casi no se distingue de filtros mucho más baratos:
+#   - lanczos:  LANCZOS de Pillow (con reduce() antes si hay reducción rápida)
+#   - bilineal: reduce() por el mayor factor entero que cabe y BILINEAR para el resto
+#   - area:     media por áreas: INTER_AREA de OpenCV si está instalado, si no el
+#               filtro BOX de Pillow (calcula lo mismo, en un solo hilo)
+# Pillow-SIMD no es otro filtro sino un reemplazo de Pillow (el mismo paquete PIL)
+# que acelera todos los anteriores; pillow_simd() indica si es el instalado.
+#
+# La política (--remuestreo) elige el filtro de cada variante según cuánto se reduce
+# la imagen que recibe el filtro (la decodificada, quizá ya reducida por draft(), o
+# la variante anterior de la cascada):
+#   calidad      siempre lanczos (igual que antes)
+#   equilibrado  bilineal en la primera reducción si es de REDUCCION_BILINEAL veces o
+#                menos; lanczos en las demás
+#   rapido       bilineal hasta REDUCCION_BILINEAL veces, area en las demás
+# Desde la imagen decodificada y hasta 2x, reduce() + BILINEAR da 43 dB o más frente a
+# LANCZOS y es de 2 a 12 veces más rápido. En reducciones mayores baja a 25-37 dB
+# (aliasing; 'area' se queda en 30-37 dB, y LANCZOS con la reducción rápida ya es
+# barato). Sobre una variante ya reducida, que tiene detalle hasta el último píxel,
+# el filtro más suave se nota más: en cascada 'rapido' baja a ~31 dB en la tercera
+# variante y 'equilibrado' se mantiene por encima de 47 dB.
+# benchmarks/benchmark_remuestreo.py mide ms/MP, PSNR y SSIM de cada filtro frente a
+# LANCZOS, para cambiar de política con datos (--carpeta con fotos propias).
+
+import PIL
+from PIL import Image
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    # Sin OpenCV, 'area' usa el filtro BOX de Pillow
+    cv2 = None
+else:
+    # Cada trabajador ya es un proceso: un hilo de OpenCV por proceso, sin competir por núcleos
+    cv2.setNumThreads(1)
+
+# Políticas para elegir el filtro de cada variante
+POLITICAS = ("calidad", "equilibrado", "rapido")
+
+# Reducción máxima (lado de la fuente / lado final) en la que se usa 'bilineal'
+REDUCCION_BILINEAL = 2.0
+
+def pillow_simd():
+    """Indica si el Pillow instalado es Pillow-SIMD (sus versiones terminan en '.postN')"""
+    return ".post" in PIL.__version__
+
+def opencv_disponible():
+    """Indica si 'area' usa OpenCV (si no, el filtro BOX de Pillow)"""
+    return cv2 is not None
+
+def _lanczos(img, tamano, reducing_gap=None, caja=None):
+    """LANCZOS de Pillow; reducing_gap es el margen de la reducción rápida"""
+    return img.resize(tamano, Image.Resampling.LANCZOS, box=caja, reducing_gap=reducing_gap)
+
+def _bilineal(img, tamano, reducing_gap=None, caja=None):
+    """reduce() por el mayor factor entero y BILINEAR hasta el tamaño final"""
+    # Con reducing_gap=1.0 Pillow hace ese reduce() y además premultiplica el alfa,
+    # cosa que un reduce() suelto no hace (dejaría halos en los bordes transparentes)
+    return img.resize(tamano, Image.Resampling.BILINEAR, box=caja, reducing_gap=1.0)
+
+def _area(img, tamano, reducing_gap=None, caja=None):
+    """Media por áreas: OpenCV INTER_AREA si está, si no BOX de Pillow"""
+    # Con alfa, OpenCV no premultiplica: esas imágenes van siempre por Pillow
+    if cv2 is not None and caja is None and img.mode in ("L", "RGB"):
+        return Image.fromarray(cv2.resize(np.asarray(img), tamano, interpolation=cv2.INTER_AREA))
+    return img.resize(tamano, Image.Resampling.BOX, box=caja)
+
+# Nombre → función(img, tamaño, reducing_gap, caja) que devuelve la imagen reducida
+REMUESTREADORES = {"lanczos": _lanczos, "bilineal": _bilineal, "area": _area}
+
+def remuestrear(img, tamano, nombre="lanczos", reducing_gap=None, caja=None):
+    """Redimensiona con el filtro 'nombre' (caja: región de la fuente, como en Image.resize)"""
+    return REMUESTREADORES[nombre](img, tamano, reducing_gap, caja)
+
+def elegir_remuestreador(politica, tamano_fuente, tamano_final, en_cascada=False):
+    """Nombre del filtro para reducir de tamano_fuente a tamano_final con esa política
+
+    en_cascada: la fuente es una variante ya reducida, no la imagen decodificada.
+    """
+    if politica == "calidad" or (politica == "equilibrado" and en_cascada):
+        return "lanczos"
+    reduccion = max(tamano_fuente[0] / tamano_final[0], tamano_fuente[1] / tamano_final[1])
+    if reduccion <= REDUCCION_BILINEAL:
+        return "bilineal"
+    return "area" if politica == "rapido" else "lanczos"
+
+def describir(politica):
+    """Texto para el resumen: política, con qué se hace 'area' y si Pillow es Pillow-SIMD"""
+    area = "OpenCV" if opencv_disponible() else "Pillow BOX"
+    return f"{politica} (area con {area}{', Pillow-SIMD' if pillow_simd() else ''})"
@@ -0,0 +1,308 @@
+# Reparto entre nodos - Varias máquinas procesando el mismo árbol sin pisarse
+# Julio 2025 - Compartido por convertir_a_png.py, Cambiar_dimenciones.py y quitar_fondo_lento.py
+#
+# Cada máquina (nodo) ejecuta el script con el mismo --reparto RONDA sobre la misma
+# carpeta compartida. El trabajo se reparte por carpetas mediante una tabla de
+# "alquileres" en un SQLite dentro de la carpeta raíz:
+#   - La ronda empieza con un lote: la carpeta raíz.
+#   - Un nodo alquila el primer lote libre, lista esa carpeta y añade sus
+#     subcarpetas como lotes nuevos; así el listado del árbol también se reparte.
+#   - Una carpeta con más de ARCHIVOS_POR_LOTE archivos se parte en varios lotes
+#     por el hash del nombre de cada archivo.
+#   - Mientras trabaja, cada nodo renueva sus alquileres; si un nodo se cae, sus
+#     lotes vencen a los 'vencimiento' segundos y otro nodo los vuelve a tomar.
+#   - Un lote queda "hecho" cuando todas sus tareas pasaron por la escritura: se
+#     cuentan las tareas que salen de cada carpeta y los resultados que vuelven,
+#     que llegan en el mismo orden (ver pipeline.py).
+#   - Un lote alquilado MAX_INTENTOS veces sin terminar (una carpeta que tumba a
+#     todos los nodos) pasa a "error": no se vuelve a alquilar y se informa al final.
+#
+# SQLite en una carpeta de red solo es fiable sin WAL (necesita memoria compartida
+# entre procesos de una misma máquina), así que aquí se usa el diario clásico.
+# En una carpeta de red muy ocupada el bloqueo puede tardar más que el 'timeout'
+# de SQLite: esas escrituras se reintentan con esperas crecientes.
+# Los relojes de los nodos deben ir razonablemente en hora: el vencimiento se
+# compara con la hora de cada máquina.
+
+import os
+import time
+import zlib
+import socket
+import sqlite3
+import threading
+
+from escaner import _leer_carpeta
+
+# Nombre de la tabla de alquileres dentro de la carpeta raíz
+NOMBRE_REPARTO = ".reparto_nodos.sqlite"
+
+# Segundos sin renovar tras los que el lote de un nodo caído se puede volver a tomar
+VENCIMIENTO = 600
+
+# Archivos a partir de los cuales una carpeta se reparte en varios lotes
+ARCHIVOS_POR_LOTE = 2000
+
+# Veces que se alquila un lote sin terminarlo antes de darlo por fallido
+MAX_INTENTOS = 3
+
+# Reintentos de una escritura con la base bloqueada, y primera espera en segundos (se duplica)
+REINTENTOS_BLOQUEO = 5
+ESPERA_BLOQUEO = 2.0
+
+def base_bloqueada(error):
+    """Indica si un error de SQLite es de bloqueo (otro nodo escribiendo), no un fallo real"""
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+def reintentar_bloqueada(operacion):
+    """Ejecuta operacion(); si la base está bloqueada, la reintenta con esperas crecientes"""
+    for intento in range(REINTENTOS_BLOQUEO):
+        try:
+            return operacion()
+        except sqlite3.OperationalError as e:
+            if not base_bloqueada(e) or intento == REINTENTOS_BLOQUEO - 1:
+                raise
+            time.sleep(ESPERA_BLOQUEO * 2 ** intento)
+
+def nodo_por_defecto():
+    """Nombre de este nodo: máquina y proceso"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def parte_de(nombre, partes):
+    """Lote (de 0 a partes-1) al que pertenece un archivo de una carpeta partida"""
+    return zlib.crc32(os.path.normcase(nombre).encode("utf-8")) % partes
+
+class Reparto:
+    """Alquiler de carpetas de un árbol compartido entre varios nodos"""
+
+    def __init__(self, ruta_base, herramienta, ronda, nodo=None, vencimiento=VENCIMIENTO,
+                 archivos_por_lote=ARCHIVOS_POR_LOTE):
+        self.ruta_base = os.path.abspath(ruta_base)
+        self.herramienta = herramienta
+        self.ronda = ronda
+        self.nodo = nodo or nodo_por_defecto()
+        self.vencimiento = vencimiento
+        self.archivos_por_lote = archivos_por_lote
+        self.lotes_tomados = 0
+        # Lotes de la ronda en estado "error" (se rellena al cerrar)
+        self.carpetas_con_error = []
+        self._candado = threading.Lock()
+        # Lotes entregados al recorrido, en orden: [id, cerrado, tareas sin resultado]
+        self._entregados = []
+        self._hechos = 0
+        self._conexion = sqlite3.connect(os.path.join(self.ruta_base, NOMBRE_REPARTO),
+                                         timeout=60, isolation_level=None, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=DELETE")
+        self._conexion.execute(
+            """CREATE TABLE IF NOT EXISTS lotes (
+                id INTEGER PRIMARY KEY,
+                herramienta TEXT NOT NULL,
+                ronda TEXT NOT NULL,
+                carpeta TEXT NOT NULL,
+                parte INTEGER NOT NULL,
+                partes INTEGER NOT NULL,
+                estado TEXT NOT NULL,
+                nodo TEXT,
+                vence REAL,
+                intentos INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (herramienta, ronda, carpeta, parte)
+            )"""
+        )
+        self._anadir_lotes([(".", 0, 1)])
+        self._detener = threading.Event()
+        self._renovador = threading.Thread(target=self._renovar, daemon=True)
+        self._renovador.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def _anadir_lotes(self, lotes):
+        """Añade lotes (carpeta relativa, parte, partes) pendientes si no existen ya"""
+        def anadir():
+            with self._candado:
+                self._conexion.executemany(
+                    "INSERT OR IGNORE INTO lotes (herramienta, ronda, carpeta, parte, partes, estado) "
+                    "VALUES (?, ?, ?, ?, ?, 'pendiente')",
+                    [(self.herramienta, self.ronda, carpeta, parte, partes) for carpeta, parte, partes in lotes],
+                )
+        reintentar_bloqueada(anadir)
+
+    def _tomar_lote(self):
+        """Alquila el primer lote libre o vencido; devuelve (id, carpeta, parte, partes), False o None
+
+        False: no hay nada libre pero otros nodos siguen trabajando (sus lotes pueden vencer).
+        None: la ronda terminó.
+        """
+        return reintentar_bloqueada(self._tomar_lote_una_vez)
+
+    def _tomar_lote_una_vez(self):
+        """Un intento de _tomar_lote (puede fallar con la base bloqueada)"""
+        ahora = time.time()
+        with self._candado:
+            # BEGIN IMMEDIATE bloquea la base: dos nodos nunca toman el mismo lote
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                # Los lotes libres que ya agotaron sus intentos no se vuelven a alquilar
+                self._conexion.execute(
+                    "UPDATE lotes SET estado = 'error', nodo = NULL, vence = NULL WHERE herramienta = ? "
+                    "AND ronda = ? AND intentos >= ? AND (estado = 'pendiente' OR (estado = 'en_curso' AND vence < ?))",
+                    (self.herramienta, self.ronda, MAX_INTENTOS, ahora),
+                )
+                fila = self._conexion.execute(
+                    "SELECT id, carpeta, parte, partes FROM lotes WHERE herramienta = ? AND ronda = ? "
+                    "AND (estado = 'pendiente' OR (estado = 'en_curso' AND vence < ?)) ORDER BY id LIMIT 1",
+                    (self.herramienta, self.ronda, ahora),
+                ).fetchone()
+                if fila is not None:
+                    self._conexion.execute(
+                        "UPDATE lotes SET estado = 'en_curso', nodo = ?, vence = ?, intentos = intentos + 1 "
+                        "WHERE id = ?",
+                        (self.nodo, ahora + self.vencimiento, fila[0]),
+                    )
+                    self._conexion.execute("COMMIT")
+                    return fila
+                en_curso = self._conexion.execute(
+                    "SELECT COUNT(*) FROM lotes WHERE herramienta = ? AND ronda = ? AND estado = 'en_curso'",
+                    (self.herramienta, self.ronda),
+                ).fetchone()[0]
+                self._conexion.execute("COMMIT")
+            except BaseException:
+                self._conexion.execute("ROLLBACK")
+                raise
+        return False if en_curso else None
+
+    def recorrer(self):
+        """Como escaner.recorrer_carpetas, pero solo con las carpetas (o partes) alquiladas por este nodo"""
+        while True:
+            hechos = []
+            with self._candado:
+                if self._entregados:
+                    # El llamador pidió otra carpeta: la anterior ya no recibe más tareas
+                    self._entregados[-1][1] = True
+                    hechos = self._lotes_terminados()
+            self._marcar_hechos(hechos)
+            lote = self._tomar_lote()
+            if lote is None:
+                return
+            if lote is False:
+                # Esperar a que otro nodo termine o a que venza el lote de uno caído
+                time.sleep(min(5.0, self.vencimiento / 4))
+                continue
+            id_lote, relativa, parte, partes = lote
+            self.lotes_tomados += 1
+            carpeta, archivos, subcarpetas = _leer_carpeta(os.path.normpath(os.path.join(self.ruta_base, relativa)))
+            if parte == 0:
+                nuevos = [(os.path.relpath(subcarpeta, self.ruta_base).replace(os.sep, "/"), 0, 1)
+                          for subcarpeta in subcarpetas]
+                if partes == 1 and len(archivos) > self.archivos_por_lote:
+                    # Carpeta enorme: se parte por el hash del nombre y los demás nodos toman el resto
+                    partes = -(-len(archivos) // self.archivos_por_lote)
+                    def partir():
+                        with self._candado:
+                            self._conexion.execute("UPDATE lotes SET partes = ? WHERE id = ?", (partes, id_lote))
+                    reintentar_bloqueada(partir)
+                # También si otro nodo ya la partió y se cayó antes de añadir las demás partes
+                nuevos += [(relativa, otra, partes) for otra in range(1, partes)]
+                self._anadir_lotes(nuevos)
+            nombres = {os.path.normcase(entrada.name) for entrada in archivos}
+            if partes > 1:
+                archivos = [entrada for entrada in archivos if parte_de(entrada.name, partes) == parte]
+            with self._candado:
+                self._entregados.append([id_lote, False, 0])
+            yield carpeta, archivos, nombres
+
+    def tareas(self, tareas):
+        """Cuenta cada tarea en el lote de la carpeta de la que sale
+
+        Cada tarea debe contener solo archivos de la carpeta que se está recorriendo
+        cuando se genera (quitar_fondo_lento.py cierra sus lotes de imágenes al cambiar
+        de carpeta cuando se reparte).
+        """
+        for tarea in tareas:
+            with self._candado:
+                self._entregados[-1][2] += 1
+            yield tarea
+
+    def procesado(self):
+        """Anota el resultado de una tarea (llamar con cada resultado, en el orden del pipeline)"""
+        with self._candado:
+            for lote in self._entregados[self._hechos:]:
+                if lote[2]:
+                    lote[2] -= 1
+                    break
+            hechos = self._lotes_terminados()
+        self._marcar_hechos(hechos)
+
+    def _lotes_terminados(self):
+        """Ids de los primeros lotes cerrados y sin tareas pendientes, ya descontados (llamar con el candado)"""
+        ids = []
+        while (self._hechos < len(self._entregados) and self._entregados[self._hechos][1]
+               and not self._entregados[self._hechos][2]):
+            ids.append(self._entregados[self._hechos][0])
+            self._hechos += 1
+        return ids
+
+    def _marcar_hechos(self, ids):
+        """Marca hechos esos lotes en la base (llamar sin el candado)"""
+        if not ids:
+            return
+        def marcar():
+            # El candado solo durante cada intento: las esperas entre reintentos no
+            # bloquean a los demás hilos ni al renovador de alquileres
+            with self._candado:
+                self._conexion.executemany("UPDATE lotes SET estado = 'hecho', vence = NULL WHERE id = ?",
+                                           [(id_lote,) for id_lote in ids])
+        reintentar_bloqueada(marcar)
+
+    def _carpetas_con_error(self):
+        """Carpetas (relativas) de la ronda abandonadas tras MAX_INTENTOS alquileres"""
+        with self._candado:
+            filas = self._conexion.execute(
+                "SELECT carpeta, parte, partes FROM lotes WHERE herramienta = ? AND ronda = ? "
+                "AND estado = 'error' ORDER BY carpeta, parte",
+                (self.herramienta, self.ronda),
+            ).fetchall()
+        return [carpeta if partes == 1 else f"{carpeta} (parte {parte + 1} de {partes})"
+                for carpeta, parte, partes in filas]
+
+    def _renovar(self):
+        """Renueva en segundo plano los alquileres de este nodo"""
+        while not self._detener.wait(self.vencimiento / 3):
+            try:
+                with self._candado:
+                    self._conexion.execute(
+                        "UPDATE lotes SET vence = ? WHERE herramienta = ? AND ronda = ? "
+                        "AND nodo = ? AND estado = 'en_curso'",
+                        (time.time() + self.vencimiento, self.herramienta, self.ronda, self.nodo),
+                    )
+            except sqlite3.Error as e:
+                # Sin renovar, los lotes vencerán y otro nodo los repetirá: no se pierde nada
+                print(f"⚠️  No se pudo renovar el reparto: {e}")
+
+    def cerrar(self):
+        """Deja libres los lotes de este nodo que no se terminaron y cierra la base de datos"""
+        self._detener.set()
+        self._renovador.join()
+        with self._candado:
+            if self._conexion is None:
+                return
+        def liberar():
+            with self._candado:
+                self._conexion.execute(
+                    "UPDATE lotes SET estado = 'pendiente', nodo = NULL, vence = NULL WHERE herramienta = ? "
+                    "AND ronda = ? AND nodo = ? AND estado = 'en_curso'",
+                    (self.herramienta, self.ronda, self.nodo),
+                )
+        try:
+            reintentar_bloqueada(liberar)
+            self.carpetas_con_error = reintentar_bloqueada(self._carpetas_con_error)
+        except sqlite3.Error as e:
+            # Se llama desde los 'finally' de los scripts: no debe tapar su resultado.
+            # Sin liberar, los lotes de este nodo vencerán y otro nodo los repetirá
+            print(f"⚠️  No se pudo cerrar el reparto: {e}")
+        finally:
+            with self._candado:
+                self._conexion.close()
+                self._conexion = None
@@ -0,0 +1,124 @@
+# Retiro de originales - Borrado (o papelera) de cada original en cuanto su salida está verificada
+# Julio 2025 - Compartido por convertir_a_png.py, Cambiar_dimenciones.py y quitar_fondo_lento.py
+#
+# Antes cada script volvía a recorrer todo el árbol al terminar y borraba por
+# extensión o por nombre: una segunda pasada completa, que además borraba los
+# originales que habían fallado o que se habían omitido. Ahora se retira solo el
+# original que se acaba de procesar, y solo si sus salidas existen en disco y se
+# reconocen como imagen. Los retiros se agrupan por carpeta (el recorrido entrega
+# los archivos carpeta a carpeta) y, con 'papelera', los originales se mueven allí
+# conservando las subcarpetas en lugar de borrarse.
+#
+# Los scripts confirman las salidas en disco (fsync, ver pipeline.py) cuando hay
+# que retirar originales, así un corte de luz nunca se lleva original y salida.
+
+import os
+import shutil
+
+from decodificadores import BYTES_CABECERA, detectar_formato
+
+# Originales que se acumulan como mucho antes de retirarlos juntos
+TAMANO_LOTE = 64
+
+def comprobar_papelera(ruta_base, papelera):
+    """Devuelve un mensaje de error si la papelera no sirve para esta carpeta, o None"""
+    base = os.path.normcase(os.path.abspath(ruta_base))
+    destino = os.path.normcase(os.path.abspath(papelera))
+    if destino == base or destino.startswith(base + os.sep):
+        # El recorrido encontraría los originales movidos y los volvería a procesar
+        return "la papelera no puede estar dentro de la carpeta que se procesa"
+    return None
+
+def salida_verificada(ruta_salida):
+    """Indica si la salida existe, no está vacía y empieza como una imagen"""
+    try:
+        with open(ruta_salida, 'rb') as archivo:
+            cabecera = archivo.read(BYTES_CABECERA)
+    except OSError:
+        return False
+    return detectar_formato(cabecera) is not None
+
+def destino_libre(carpeta, archivo):
+    """Ruta en 'carpeta' para 'archivo' que no pise uno ya movido antes ('foto (1).heic', ...)"""
+    nombre_base, extension = os.path.splitext(archivo)
+    ruta = os.path.join(carpeta, archivo)
+    numero = 1
+    while os.path.lexists(ruta):
+        ruta = os.path.join(carpeta, f"{nombre_base} ({numero}){extension}")
+        numero += 1
+    return ruta
+
+class RetiroOriginales:
+    """Borra o mueve a la papelera los originales procesados, por lotes de carpeta"""
+
+    def __init__(self, ruta_base, papelera=None, avisar=print, tamano_lote=TAMANO_LOTE):
+        self.ruta_base = ruta_base
+        self.papelera = papelera
+        self.avisar = avisar
+        self.tamano_lote = tamano_lote
+        self.retirados = 0
+        self.errores = []
+        self._carpeta = None
+        self._pendientes = []
+
+    def retirar(self, ruta_original, salidas):
+        """Apunta el original para retirarlo si todas sus salidas están verificadas
+
+        Devuelve False (y el original se queda) si alguna salida falta o no es una imagen.
+        """
+        if not salidas or not all(salida_verificada(salida) for salida in salidas):
+            mensaje = f"❌ No se retira {os.path.basename(ruta_original)}: su salida no se pudo verificar"
+            self.avisar(mensaje)
+            self.errores.append(mensaje)
+            return False
+        carpeta = os.path.dirname(ruta_original)
+        if carpeta != self._carpeta or len(self._pendientes) >= self.tamano_lote:
+            self.vaciar()
+            self._carpeta = carpeta
+        self._pendientes.append(ruta_original)
+        return True
+
+    def vaciar(self):
+        """Retira los originales apuntados de la carpeta actual"""
+        if not self._pendientes:
+            return
+        destino = None
+        if self.papelera is not None:
+            relativa = os.path.relpath(self._carpeta, self.ruta_base)
+            destino = os.path.normpath(os.path.join(self.papelera, relativa))
+            try:
+                os.makedirs(destino, exist_ok=True)
+            except OSError as e:
+                # Sin carpeta en la papelera los originales se quedan donde estaban
+                for ruta_original in self._pendientes:
+                    mensaje = f"❌ Error al retirar {os.path.basename(ruta_original)}: {e}"
+                    self.avisar(mensaje)
+                    self.errores.append(mensaje)
+                self._pendientes = []
+                return
+        for ruta_original in self._pendientes:
+            archivo = os.path.basename(ruta_original)
+            try:
+                if destino is None:
+                    os.remove(ruta_original)
+                    self.avisar(f"🗑️  Eliminado: {archivo}")
+                else:
+                    # shutil.move renombra si puede y copia si la papelera está en otro disco;
+                    # un archivo con el mismo nombre de una ejecución anterior no se pisa
+                    shutil.move(ruta_original, destino_libre(destino, archivo))
+                    self.avisar(f"🗑️  A la papelera: {archivo}")
+                self.retirados += 1
+            except OSError as e:
+                mensaje = f"❌ Error al retirar {archivo}: {e}"
+                self.avisar(mensaje)
+                self.errores.append(mensaje)
+        self._pendientes = []
+
+    def imprimir_resumen(self):
+        """Muestra cuántos originales se retiraron y cómo"""
+        if self.papelera is None:
+            print(f"🗑️  Originales eliminados: {self.retirados}")
+        else:
+            print(f"🗑️  Originales movidos a la papelera: {self.retirados} ({self.papelera})")
+        if self.errores:
+            print(f"⚠️  Originales que se quedaron en su sitio: {len(self.errores)}")